@@ -1,9 +1,14 @@
 # /app/api/v1/bitcoin.py
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Literal, Optional, Union
+from app.core import http_cache
+from app.core.config import settings
+from app.core.responses import trusted_response
 from app.models import schemas
 from app.services import bitcoin as bitcoin_service # Importamos la lógica
+from app.services import bitcoin_history as history_service
 
 router = APIRouter(
     prefix="/bitcoin",
@@ -12,16 +17,56 @@ router = APIRouter(
 
 @router.get(
     "/history",
-    response_model=List[schemas.BitcoinHistoryPoint],
+    response_model=Union[List[schemas.BitcoinHistoryPoint], List[schemas.BitcoinOHLCPoint]],
     summary="Obtiene el historial de precios de Bitcoin (BTC) en USD"
 )
-async def get_bitcoin_history(days: int = Query(7, ge=1, le=30, description="Número de días de historial a obtener")):
+async def get_bitcoin_history(
+    request: Request,
+    response: Response,
+    days: int = Query(7, ge=1, le=settings.BITCOIN_HISTORY_MAX_DAYS, description="Número de días de historial a obtener"),
+    resolution: Optional[Literal["hour", "day", "week"]] = Query(None, description="Agrupa el historial en velas OHLC por hora, día o semana"),
+    max_points: Optional[int] = Query(None, ge=2, le=settings.BITCOIN_HISTORY_MAX_POINTS, description="Cantidad máxima de puntos a devolver"),
+):
     """
-    Obtiene el historial de precios de Bitcoin (BTC) en USD para los últimos 7 días.
+    Obtiene el precio diario de Bitcoin (BTC) en USD de los últimos `days` días completos.
+    La serie se guarda en MongoDB y se completa una vez por día desde CoinGecko.
+
+    - Con `resolution`, devuelve velas OHLC (apertura, máximo, mínimo, cierre) por hora, día o semana.
+    - Con `max_points`, reduce la respuesta: la serie diaria con LTTB y las velas uniendo intervalos consecutivos.
+
+    La respuesta incluye `ETag`, `Last-Modified` y `Cache-Control` (hasta el próximo
+    cierre de la serie); las peticiones condicionales reciben un 304 si no cambió.
     """
     
+    if resolution == "hour" and days > settings.BITCOIN_HISTORY_HOURLY_DAYS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"La resolución 'hour' solo está disponible para los últimos {settings.BITCOIN_HISTORY_HOURLY_DAYS} días."
+        )
+
+    # Camino rápido: el cliente ya tiene la versión vigente en la caché
+    cache_key = history_service.history_cache_key(days, resolution, max_points)
+    not_modified = http_cache.not_modified(
+        request, http_cache.cache_validators(history_service.CACHE_NAMESPACE, cache_key, fresh_only=True)
+    )
+    if not_modified is not None:
+        return not_modified
+
+    if resolution is None:
+        history = await history_service.get_bitcoin_history_data(days, max_points=max_points)
+    else:
+        history = await history_service.get_bitcoin_ohlc(days, resolution, max_points=max_points)
     
-    return await bitcoin_service.get_bitcoin_history_data(days)
+    if history is None:
+        raise HTTPException(
+            status_code=503,
+            detail="No se pudo obtener el historial de precios de BTC. La API externa no respondió correctamente."
+        )
+        
+    not_modified = http_cache.conditional_response(request, response, history_service.CACHE_NAMESPACE, cache_key)
+    if not_modified is not None:
+        return not_modified
+    return trusted_response(history, headers=response.headers)
 
 @router.post(
     "/convert", 
@@ -44,4 +89,76 @@ async def convert_btc_to_pyg(request: schemas.BitcoinConversionRequest):
             detail="Error al obtener las tasas de cambio de BTC o USD. Las APIs externas no respondieron correctamente."
         )
         
-    return conversion_result
\ No newline at end of file
+    return trusted_response(conversion_result)
+
+
+@router.get(
+    "/stream",
+    summary="Stream en vivo (Server-Sent Events) del precio de BTC en USD y PYG",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_btc_ticker(
+    min_interval: float = Query(
+        settings.BITCOIN_STREAM_MIN_INTERVAL_SECONDS, ge=1, le=3600,
+        description="Segundos mínimos entre mensajes a este cliente"
+    ),
+):
+    """
+    Envía un evento `ticker` cada vez que cambia la cotización de BTC.
+    Todos los clientes comparten un único sondeo en el servidor; los clientes
+    lentos reciben solo el valor más reciente.
+    """
+    
+    if len(bitcoin_service.ticker_broadcaster) >= settings.BITCOIN_STREAM_MAX_CLIENTS:
+        raise HTTPException(
+            status_code=503,
+            detail="Se alcanzó el máximo de clientes conectados al stream. Intente más tarde."
+        )
+
+    return StreamingResponse(
+        _sse_events(min_interval),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _sse_events(min_interval: float) -> AsyncIterator[str]:
+    # La suscripción se crea al empezar a enviar, así el `finally` siempre la libera
+    subscription = bitcoin_service.ticker_broadcaster.subscribe(min_interval)
+    try:
+        while True:
+            ticker = await subscription.next(timeout=settings.BITCOIN_STREAM_HEARTBEAT_SECONDS)
+            if ticker is None:
+                # Comentario SSE para mantener viva la conexión (proxies, balanceadores)
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: ticker\ndata: {ticker.model_dump_json()}\n\n"
+    finally:
+        bitcoin_service.ticker_broadcaster.unsubscribe(subscription)
+
+
+@router.websocket("/ws")
+async def websocket_btc_ticker(websocket: WebSocket, min_interval: float = settings.BITCOIN_STREAM_MIN_INTERVAL_SECONDS):
+    """
+    Igual que `/bitcoin/stream`, pero por WebSocket: cada mensaje es un `BitcoinTicker` en JSON.
+    """
+    
+    if len(bitcoin_service.ticker_broadcaster) >= settings.BITCOIN_STREAM_MAX_CLIENTS:
+        await websocket.close(code=1013)  # Try Again Later
+        return
+
+    await websocket.accept()
+    subscription = bitcoin_service.ticker_broadcaster.subscribe(max(min_interval, 1.0))
+    try:
+        while True:
+            ticker = await subscription.next(timeout=settings.BITCOIN_STREAM_HEARTBEAT_SECONDS)
+            if ticker is None:
+                await websocket.send_json({"type": "ping"})
+                continue
+            await websocket.send_text(ticker.model_dump_json())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        bitcoin_service.ticker_broadcaster.unsubscribe(subscription)
+
@@ -1,8 +1,20 @@
 # /app/api/v1/currency.py
 
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import CurrencyConversionRequest, CurrencyConversionResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Union
+from app.core.config import settings
+from app.core.responses import trusted_response
+from app.models.schemas import (
+    CurrencyConversionRequest,
+    CurrencyConversionResponse,
+    CurrencyBatchColumns,
+    CurrencyBatchConversionResponse,
+)
 from app.services import currency as currency_service 
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 router = APIRouter(
     prefix="/currency",
     tags=["Conversor de Moneda"]
@@ -32,4 +44,60 @@ async def convert_to_pyg(request: CurrencyConversionRequest):
             detail=f"No se pudo obtener la tasa para la moneda '{request.from_currency}'. Asegúrese de usar un código ISO 4217 válido (ej: USD)."
         )
         
-    return conversion_result
+    return trusted_response(conversion_result)
+
+
+@router.post(
+    "/convert/batch",
+    response_model=CurrencyBatchConversionResponse,
+    summary="Convierte un lote de montos en distintas monedas a Guaraníes Paraguayos (PYG)",
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def convert_batch_to_pyg(
+    http_request: Request,
+    request: Union[List[CurrencyConversionRequest], CurrencyBatchColumns],
+    stream: bool = Query(False, description="Devolver las conversiones como NDJSON (una línea por conversión)"),
+):
+    """
+    Convierte muchos montos en una sola petición, con una sola tabla de tasas.
+
+    Acepta una lista de `{from_currency, amount}` o la forma columnar
+    `{"from_currency": [...], "amount": [...]}`. Las monedas no válidas se
+    devuelven con `converted_amount` y `rate` en `null`.
+
+    Con `?stream=true` (o `Accept: application/x-ndjson`) la respuesta se envía
+    como NDJSON, útil para lotes grandes.
+    """
+    
+    if isinstance(request, CurrencyBatchColumns):
+        from_currencies, amounts = request.from_currency, request.amount
+    else:
+        from_currencies = [item.from_currency for item in request]
+        amounts = [item.amount for item in request]
+
+    if not amounts:
+        raise HTTPException(status_code=422, detail="El lote no puede estar vacío.")
+    if len(amounts) > settings.CURRENCY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {settings.CURRENCY_BATCH_MAX_ITEMS} conversiones."
+        )
+
+    if stream or NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+        lines = await currency_service.stream_currency_batch(from_currencies, amounts)
+        if lines is None:
+            raise _rates_unavailable()
+        return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+    conversion_result = await currency_service.convert_currency_batch(from_currencies, amounts)
+    if conversion_result is None:
+        raise _rates_unavailable()
+
+    return trusted_response(conversion_result)
+
+
+def _rates_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="No se pudo obtener la tabla de tasas de cambio. La API externa no respondió correctamente."
+    )
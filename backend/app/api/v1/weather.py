@@ -1,14 +1,124 @@
 # /app/api/v1/weather.py
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import List, Optional
+from app.core import http_cache
+from app.core.responses import trusted_response
 from app.models import schemas
 from app.services import weather as weather_service
+from app.services import weather_forecast as forecast_service
 
 router = APIRouter(
     prefix="/weather",
     tags=["Clima Paraguay"]
 )
 
+@router.get(
+    "",
+    response_model=List[schemas.WeatherResponse],
+    summary="Obtiene el clima actual de varios departamentos de Paraguay"
+)
+async def get_departments_weather(
+    departments: str = Query(..., description="Departamentos separados por coma (ej: ASUNCION,CENTRAL)"),
+    ):
+    """
+    Devuelve el clima de los departamentos indicados en una sola petición.
+    Los datos en caché se resuelven con una sola consulta a MongoDB y el resto
+    se consulta en paralelo a la API externa.
+    """
+    
+    department_names = [name.strip() for name in departments.split(",") if name.strip()]
+    if not department_names:
+        raise HTTPException(
+            status_code=422,
+            detail="Debe indicar al menos un departamento."
+        )
+
+    return await _get_many_or_503(department_names)
+
+
+@router.get(
+    "/all",
+    response_model=List[schemas.WeatherResponse],
+    summary="Obtiene el clima actual de todos los departamentos soportados"
+)
+async def get_all_departments_weather():
+    """
+    Devuelve el clima de todos los departamentos soportados en una sola petición.
+    """
+    
+    return await _get_many_or_503(list(weather_service.DEPARTMENTS))
+
+
+async def _get_many_or_503(department_names: List[str]) -> List[schemas.WeatherResponse]:
+    weather_results = await weather_service.get_weather_many(department_names)
+    
+    if not weather_results:
+        raise HTTPException(
+            status_code=503,
+            detail="No se pudo obtener el clima de ninguno de los departamentos solicitados."
+        )
+        
+    return trusted_response(weather_results)
+
+
+@router.get(
+    "/nearest",
+    response_model=schemas.NearestWeatherResponse,
+    summary="Obtiene el clima del lugar de Paraguay más cercano a unas coordenadas"
+)
+async def get_nearest_weather(
+    lat: float = Query(..., ge=-90, le=90, description="Latitud (ej: -25.30)"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitud (ej: -57.60)"),
+    ):
+    """
+    Busca en el gazetteer (capitales de los 17 departamentos, Asunción y
+    ciudades principales) el lugar más cercano y devuelve su clima desde la
+    caché, compartida por todas las coordenadas que caen cerca de ese lugar.
+    """
+
+    nearest = await weather_service.get_nearest_weather(lat, lon)
+
+    if nearest is None:
+        raise HTTPException(
+            status_code=503,
+            detail="No se pudo obtener el clima del lugar más cercano."
+        )
+
+    return trusted_response(nearest)
+
+
+@router.get(
+    "/{department_name}/forecast",
+    response_model=schemas.WeatherForecastResponse,
+    summary="Obtiene el pronóstico de 5 días (bloques de 3 horas) de un departamento de Paraguay"
+)
+async def get_department_forecast(
+    department_name: str,
+    hours: Optional[int] = Query(None, ge=1, le=forecast_service.FORECAST_MAX_HOURS, description="Horas de pronóstico desde ahora"),
+    days: Optional[int] = Query(None, ge=1, le=forecast_service.FORECAST_MAX_DAYS, description="Días de pronóstico desde ahora"),
+    ):
+    """
+    Devuelve el pronóstico del departamento desde el bloque en curso hasta
+    `hours` horas o `days` días (por defecto, los 5 días completos).
+
+    El pronóstico se guarda en caché hasta la próxima emisión de
+    OpenWeatherMap (`WEATHER_FORECAST_ISSUE_SECONDS`) y el recorte se hace
+    sobre la caché, así que la API externa se consulta a lo sumo una vez
+    por departamento en cada ventana.
+    """
+
+    forecast = await forecast_service.get_weather_forecast(department_name, hours=hours, days=days)
+
+    if forecast is None:
+        raise HTTPException(
+            status_code=503,
+            detail="No se pudo obtener el pronóstico del clima."
+        )
+
+    return trusted_response(forecast)
+
+
 @router.get(
     "/{department_name}", 
     response_model=schemas.WeatherResponse,
@@ -16,12 +126,26 @@ router = APIRouter(
 )
 async def get_department_weather(
     department_name: str,
+    request: Request,
+    response: Response,
     ):
     """
     Busca el clima para el departamento de Paraguay especificado. 
-    Los datos se sirven desde una caché de MongoDB con una duración de 1 hora.
+    Los datos se sirven desde una caché de MongoDB con una duración de
+    `WEATHER_CACHE_TTL_SECONDS` (1 hora por defecto).
+
+    La respuesta incluye `ETag`, `Last-Modified` y `Cache-Control`; las
+    peticiones condicionales reciben un 304 si el dato no cambió.
     """
     
+    # Camino rápido: el cliente ya tiene la versión vigente en la caché
+    cache_key = department_name.upper()
+    not_modified = http_cache.not_modified(
+        request, http_cache.cache_validators(weather_service.CACHE_NAMESPACE, cache_key, fresh_only=True)
+    )
+    if not_modified is not None:
+        return not_modified
+
     weather_result = await weather_service.get_weather_data(department_name)
     
     if weather_result is None:
@@ -32,4 +156,7 @@ async def get_department_weather(
             detail=f"Departamento '{department_name}' no soportado o error al consultar el clima. Departamentos soportados: {supported_departments}"
         )
         
-    return weather_result
\ No newline at end of file
+    not_modified = http_cache.conditional_response(request, response, weather_service.CACHE_NAMESPACE, cache_key)
+    if not_modified is not None:
+        return not_modified
+    return trusted_response(weather_result, headers=response.headers)
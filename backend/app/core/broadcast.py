@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Suscripción de un cliente a un `Broadcaster`.
+
+    Solo guarda el último valor pendiente: si el cliente es lento (backpressure)
+    o pidió un intervalo mínimo entre mensajes (throttling), los valores
+    intermedios se descartan y recibe siempre el más reciente.
+    """
+
+    def __init__(self, min_interval: float = 0.0):
+        self.min_interval = min_interval
+        self.dropped = 0
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=1)
+        self._last_sent = 0.0
+
+    def offer(self, value: Any):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(value)
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Espera el siguiente valor respetando `min_interval`.
+        Devuelve `None` si pasa `timeout` sin valores nuevos (útil para heartbeats).
+        """
+        wait = self._last_sent + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        try:
+            value = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        self._last_sent = time.monotonic()
+        return value
+
+
+class Broadcaster:
+    """
+    Un único sondeo (`poll`) cada `interval` segundos que reparte cada valor
+    nuevo a todos los suscriptores. El sondeo solo corre mientras haya al menos
+    un suscriptor, así que la carga sobre las APIs externas no depende de la
+    cantidad de clientes conectados.
+    """
+
+    def __init__(self, name: str, poll: Callable[[], Awaitable[Optional[Any]]], interval: float):
+        self.name = name
+        self.poll = poll
+        self.interval = interval
+        self.latest: Optional[Any] = None
+        self._subscribers: Set[Subscription] = set()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, min_interval: float = 0.0) -> Subscription:
+        subscription = Subscription(min_interval)
+        self._subscribers.add(subscription)
+
+        # El cliente nuevo recibe de inmediato el último valor conocido
+        if self.latest is not None:
+            subscription.offer(self.latest)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"broadcast:{self.name}")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, value: Any):
+        self.latest = value
+        for subscription in self._subscribers:
+            subscription.offer(value)
+
+    async def close(self):
+        self._subscribers.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                value = await self.poll()
+                if value is not None and value != self.latest:
+                    self.publish(value)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Error en el sondeo de '%s': %r", self.name, e)
+
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """Valor guardado en la caché junto con sus marcas de tiempo (epoch, en segundos)."""
+    value: Any
+    stored_at: float
+    expires_at: float
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now if now is not None else time.time()) < self.expires_at
+
+
+class TTLCache:
+    """
+    Caché en memoria (L1) con expiración por TTL y desalojo LRU.
+
+    No hace I/O ni usa locks: todas las operaciones son síncronas y se
+    ejecutan dentro del event loop, por lo que son seguras entre corrutinas.
+    """
+
+    def __init__(self, namespace: str, maxsize: int):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry.is_fresh()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve el valor si existe y no ha expirado; si no, `None`."""
+        entry = self._data.get(key)
+        if entry is None or not entry.is_fresh():
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def get_entry(self, key: Hashable, max_stale: float = 0) -> Optional[CacheEntry]:
+        """
+        Como `get`, pero devuelve la entrada completa y acepta entradas expiradas
+        hace menos de `max_stale` segundos (se cuentan como `stale_hits`).
+        """
+        entry = self._data.get(key)
+        now = time.time()
+        if entry is None or now >= entry.expires_at + max_stale:
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        if entry.is_fresh(now):
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def keys(self) -> Iterable[Hashable]:
+        return self._data.keys()
+
+    def peek(self, key: Hashable) -> Optional[CacheEntry]:
+        """Devuelve la entrada (aunque haya expirado) sin tocar el orden LRU ni los contadores."""
+        return self._data.get(key)
+
+    def set(self, key: Hashable, value: Any, ttl: float, stored_at: Optional[float] = None):
+        """
+        Guarda un valor durante `ttl` segundos contados desde `stored_at`
+        (por defecto, ahora). Útil para heredar la edad de un documento de MongoDB.
+        """
+        stored_at = stored_at if stored_at is not None else time.time()
+        self._data[key] = CacheEntry(value=value, stored_at=stored_at, expires_at=stored_at + ttl)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        """Vacía la caché. Los contadores se conservan (son acumulativos, como en /metrics)."""
+        self._data.clear()
+
+    def reset_stats(self):
+        self.hits = self.stale_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# --- Registro de cachés por namespace ---
+caches: Dict[str, TTLCache] = {}
+
+
+def get_cache(namespace: str) -> TTLCache:
+    """Devuelve (creándola si hace falta) la caché L1 del namespace indicado."""
+    cache = caches.get(namespace)
+    if cache is None:
+        maxsize = settings.L1_CACHE_MAX_ENTRIES.get(namespace, settings.L1_CACHE_DEFAULT_MAX_ENTRIES)
+        cache = caches[namespace] = TTLCache(namespace, maxsize)
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    return {namespace: cache.stats() for namespace, cache in caches.items()}
+
+
+def clear_caches():
+    for cache in caches.values():
+        cache.clear()
+        cache.reset_stats()
+
+
+def _cache_metrics() -> Iterable[metrics.Metric]:
+    """Expone en /metrics los contadores que cada caché ya lleva (sin costo extra al leer)."""
+    lookups = metrics.Counter("cache_lookups_total", "Consultas a la caché en memoria por resultado.", ("cache", "result"))
+    evictions = metrics.Counter("cache_evictions_total", "Entradas desalojadas por LRU.", ("cache",))
+    entries = metrics.Gauge("cache_entries", "Entradas guardadas en la caché en memoria.", ("cache",))
+    for namespace, cache in caches.items():
+        lookups.inc(namespace, "hit", amount=cache.hits)
+        lookups.inc(namespace, "stale", amount=cache.stale_hits)
+        lookups.inc(namespace, "miss", amount=cache.misses)
+        evictions.inc(namespace, amount=cache.evictions)
+        entries.inc(namespace, amount=len(cache))
+    return lookups, evictions, entries
+
+
+metrics.collectors.append(_cache_metrics)
+
+
+# --- Lectura con stale-while-revalidate ---
+# Referencias a las revalidaciones en segundo plano para que no las recolecte el GC
+_background_refreshes: Set["asyncio.Task[Any]"] = set()
+
+
+async def get_or_load(
+    cache: TTLCache,
+    key: Hashable,
+    loader: Callable[[], Awaitable[Any]],
+    flights: SingleFlight,
+) -> Any:
+    """
+    Devuelve el valor de la caché; si expiró hace menos de CACHE_MAX_STALE_SECONDS
+    lo devuelve igualmente y lo revalida en segundo plano. Si no hay nada que
+    servir, espera a `loader` (coalescido por clave en `flights`).
+    """
+    entry = await get_or_load_entry(cache, key, loader, flights)
+    return entry.value if entry is not None else None
+
+
+async def get_or_load_entry(
+    cache: TTLCache,
+    key: Hashable,
+    loader: Callable[[], Awaitable[Any]],
+    flights: SingleFlight,
+) -> Optional[CacheEntry]:
+    """
+    Como `get_or_load`, pero devuelve la entrada completa (con `is_fresh()`
+    se sabe si el valor está vencido). Si `loader` falla y queda un valor
+    anterior en la caché, por viejo que sea, se devuelve ese último valor
+    bueno conocido en lugar del error.
+    """
+    entry = cache.get_entry(key, settings.CACHE_MAX_STALE_SECONDS)
+    if entry is not None:
+        if not entry.is_fresh():
+            revalidate(key, loader, flights)
+        return entry
+
+    last_good = cache.peek(key)
+    try:
+        value = await flights.do(key, loader)
+    except Exception:
+        if last_good is None:
+            raise
+        value = None
+
+    if value is None:
+        if last_good is not None:
+            logger.warning("Se sirve el último valor conocido de '%s:%s' (falló la recarga).", cache.namespace, key)
+        return last_good
+
+    # Los loaders guardan el valor en la caché; si alguno no lo hace, el valor
+    # recién cargado se devuelve igual como vigente
+    entry = cache.peek(key)
+    if entry is None or entry.value is not value:
+        entry = CacheEntry(value=value, stored_at=time.time(), expires_at=math.inf)
+    return entry
+
+
+def revalidate(key: Hashable, loader: Callable[[], Awaitable[Any]], flights: SingleFlight):
+    """Lanza `loader` en segundo plano (una sola vez por clave)."""
+    if key in flights:
+        return
+    task = asyncio.ensure_future(flights.do(key, loader))
+    _background_refreshes.add(task)
+    task.add_done_callback(_log_background_refresh)
+
+
+def _log_background_refresh(task: "asyncio.Task[Any]"):
+    _background_refreshes.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Error al revalidar una entrada de la caché: %r", task.exception())
+
+
+# --- Refresco proactivo (usado por el planificador) ---
+def needs_refresh(entry: Optional[CacheEntry], now: Optional[float] = None) -> bool:
+    """Indica si la entrada no existe o ya entró en la ventana de refresco."""
+    if entry is None:
+        return True
+    now = now if now is not None else time.time()
+    return entry.expires_at - now <= settings.CACHE_REFRESH_LEAD_SECONDS
+
+
+async def refresh_entry(
+    cache: TTLCache,
+    key: Hashable,
+    loader: Callable[[], Awaitable[Any]],
+    flights: SingleFlight,
+) -> Optional[float]:
+    """
+    Recarga la entrada con `loader` si está por expirar y devuelve su nueva
+    expiración, o `None` si no quedó ningún valor vigente.
+    """
+    entry = cache.peek(key)
+    if needs_refresh(entry):
+        await flights.do(key, loader)
+        entry = cache.peek(key)
+    return entry.expires_at if entry is not None and entry.is_fresh() else None
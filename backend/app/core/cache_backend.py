@@ -0,0 +1,293 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import orjson
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core import database
+from app.core.cache import CacheEntry
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """
+    Caché compartida/persistente (L2) detrás de la caché en memoria.
+
+    Guarda valores JSON (dicts, listas, números) por namespace y clave de
+    texto, cada uno con su TTL. Las lecturas solo devuelven entradas vigentes.
+    """
+    name = "base"
+
+    async def get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        return (await self.get_many(namespace, [key])).get(key)
+
+    @abstractmethod
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        ...
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float, stored_at: Optional[float] = None):
+        await self.set_many(namespace, {key: value}, ttl, stored_at)
+
+    @abstractmethod
+    async def set_many(self, namespace: str, items: Dict[str, Any], ttl: float, stored_at: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str):
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """L2 en el mismo proceso: sin persistencia, útil en desarrollo y en pruebas."""
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[tuple, CacheEntry] = {}
+
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        now = time.time()
+        found = {}
+        for key in keys:
+            entry = self._data.get((namespace, key))
+            if entry is not None and entry.is_fresh(now):
+                found[key] = entry
+        return found
+
+    async def set_many(self, namespace: str, items: Dict[str, Any], ttl: float, stored_at: Optional[float] = None):
+        stored_at = stored_at if stored_at is not None else time.time()
+        for key, value in items.items():
+            self._data[namespace, key] = CacheEntry(value=value, stored_at=stored_at, expires_at=stored_at + ttl)
+
+    async def delete(self, namespace: str, key: str):
+        self._data.pop((namespace, key), None)
+
+
+class MongoBackend(CacheBackend):
+    """
+    Una colección `cache_<namespace>` por namespace, con la clave como `_id`
+    y un índice TTL sobre `expires_at` para que MongoDB borre lo expirado.
+
+    Cada documento guarda un hash del valor (`hash`). Las escrituras son
+    pipelines de actualización que lo comparan en el servidor: si el valor
+    guardado es igual al nuevo, a lo sumo se renuevan `stored_at` y
+    `expires_at` (ver `_update`); si no, o si el documento no existe, se
+    escribe el valor completo.
+
+    Usa la conexión global (`app.core.database`) o la base indicada. Mientras
+    MongoDB no está conectado las lecturas no encuentran nada y las escrituras
+    se descartan.
+    """
+    name = "mongo"
+
+    def __init__(self, db: Optional[AsyncIOMotorDatabase] = None):
+        self._db = db
+        self._indexed: Set[str] = set()
+
+    def _collection(self, namespace: str):
+        db = self._db if self._db is not None else database.database
+        return db[f"cache_{namespace}"] if db is not None else None
+
+    async def get(self, namespace: str, key: str) -> Optional[CacheEntry]:
+        collection = self._collection(namespace)
+        if collection is None:
+            return None
+        doc = await collection.find_one({"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        return _entry(doc) if doc else None
+
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        collection = self._collection(namespace)
+        keys = list(keys)
+        if collection is None or not keys:
+            return {}
+
+        # El monitor TTL de MongoDB corre cada ~60 s: también se filtra por `expires_at`
+        cursor = collection.find({"_id": {"$in": keys}, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+        docs = await cursor.to_list(length=len(keys))
+        return {doc["_id"]: _entry(doc) for doc in docs}
+
+    async def set(self, namespace: str, key: str, value: Any, ttl: float, stored_at: Optional[float] = None):
+        collection = await self._writable_collection(namespace)
+        if collection is None:
+            return
+        await collection.update_one({"_id": key}, _update(value, ttl, stored_at), upsert=True)
+
+    async def set_many(self, namespace: str, items: Dict[str, Any], ttl: float, stored_at: Optional[float] = None):
+        """Escribe todas las claves con un solo `bulk_write` desordenado."""
+        collection = await self._writable_collection(namespace)
+        if collection is None or not items:
+            return
+        await collection.bulk_write([
+            UpdateOne({"_id": key}, _update(value, ttl, stored_at), upsert=True)
+            for key, value in items.items()
+        ], ordered=False)
+
+    async def _writable_collection(self, namespace: str):
+        collection = self._collection(namespace)
+        if collection is not None and namespace not in self._indexed:
+            await collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed.add(namespace)
+        return collection
+
+    async def delete(self, namespace: str, key: str):
+        collection = self._collection(namespace)
+        if collection is not None:
+            await collection.delete_one({"_id": key})
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Archivo SQLite local en modo WAL: persistente y sin servicios externos.
+
+    Las consultas son síncronas (sqlite3 de la biblioteca estándar) y se hacen
+    dentro del event loop: con WAL y `synchronous=NORMAL` un commit no espera
+    al fsync y leer o escribir unas pocas filas por clave primaria toma
+    microsegundos.
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL,"
+                " stored_at REAL NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def get_many(self, namespace: str, keys: Iterable[str]) -> Dict[str, CacheEntry]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        rows = self._connection().execute(
+            f"SELECT key, value, stored_at, expires_at FROM cache WHERE namespace = ? AND expires_at > ? AND key IN ({placeholders})",
+            (namespace, time.time(), *keys),
+        ).fetchall()
+        return {
+            key: CacheEntry(value=orjson.loads(value), stored_at=stored_at, expires_at=expires_at)
+            for key, value, stored_at, expires_at in rows
+        }
+
+    async def set_many(self, namespace: str, items: Dict[str, Any], ttl: float, stored_at: Optional[float] = None):
+        if not items:
+            return
+        stored_at = stored_at if stored_at is not None else time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                [(namespace, key, orjson.dumps(value), stored_at, stored_at + ttl) for key, value in items.items()],
+            )
+            # Lo expirado se borra de a poco en cada escritura (hay índice sobre expires_at)
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    async def delete(self, namespace: str, key: str):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# --- Backend configurado (CACHE_BACKEND) ---
+_backend: Optional[CacheBackend] = None
+
+
+def build_backend(name: str) -> CacheBackend:
+    if name == MemoryBackend.name:
+        return MemoryBackend()
+    if name == MongoBackend.name:
+        return MongoBackend()
+    if name == SQLiteBackend.name:
+        return SQLiteBackend(settings.CACHE_SQLITE_PATH)
+    raise ValueError(f"CACHE_BACKEND no soportado: '{name}' (opciones: memory, mongo, sqlite)")
+
+
+def get_backend() -> CacheBackend:
+    """Devuelve (creándolo si hace falta) el backend L2 elegido en CACHE_BACKEND."""
+    global _backend
+    if _backend is None:
+        _backend = build_backend(settings.CACHE_BACKEND)
+        logger.info("Caché L2: backend '%s'.", _backend.name)
+    return _backend
+
+
+async def close_backend():
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+def content_hash(value: Any) -> str:
+    """Hash estable de un valor JSON (el orden de las claves no importa)."""
+    return hashlib.blake2b(orjson.dumps(value, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+
+def _update(value: Any, ttl: float, stored_at: Optional[float]) -> List[Dict[str, Any]]:
+    """
+    Pipeline de actualización: conserva el valor guardado si su `hash` coincide
+    con el del nuevo valor (`$literal` evita que los textos con `$` se lean
+    como rutas de campos). Con el mismo valor, el TTL solo se renueva cuando al
+    documento le queda menos de la mitad de su vida; si no, el documento queda
+    igual y MongoDB no escribe nada (ni entrada en el oplog). Así, cuando varios
+    procesos refrescan la misma clave en el mismo ciclo, solo el primero escribe.
+    """
+    digest = content_hash(value)
+    dates = _dates(ttl, stored_at)
+    renew_before = dates["expires_at"] - timedelta(seconds=ttl / 2)
+    # Un documento nuevo no tiene `hash` ni `expires_at` (null < fecha): siempre se escribe
+    renew = {"$or": [{"$ne": ["$hash", digest]}, {"$lte": ["$expires_at", renew_before]}]}
+    return [{"$set": {
+        "value": {"$cond": [{"$eq": ["$hash", digest]}, "$value", {"$literal": value}]},
+        "hash": digest,
+        **{field: {"$cond": [renew, date, f"${field}"]} for field, date in dates.items()},
+    }}]
+
+
+def _dates(ttl: float, stored_at: Optional[float]) -> Dict[str, datetime]:
+    stored_at = stored_at if stored_at is not None else time.time()
+    return {
+        "stored_at": datetime.fromtimestamp(stored_at, timezone.utc),
+        "expires_at": datetime.fromtimestamp(stored_at + ttl, timezone.utc),
+    }
+
+
+def _entry(doc: Dict[str, Any]) -> CacheEntry:
+    return CacheEntry(value=doc["value"], stored_at=_epoch(doc["stored_at"]), expires_at=_epoch(doc["expires_at"]))
+
+
+def _epoch(value: datetime) -> float:
+    # Motor devuelve fechas sin zona horaria (en UTC) salvo que el cliente use tz_aware
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
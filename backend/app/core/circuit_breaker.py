@@ -0,0 +1,172 @@
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Tuple
+
+import httpx
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """
+    El circuito del upstream está abierto y la petición no se envió.
+    Hereda de `httpx.TransportError` para que los servicios la traten como
+    cualquier error de red (sin esperar al timeout).
+    """
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de errores en una ventana deslizante.
+
+    - closed: todo pasa; si en los últimos `window` segundos hubo al menos
+      `minimum_calls` llamadas y la tasa de errores llega a `failure_rate`, se abre.
+    - open: se falla de inmediato durante `open_seconds`.
+    - half_open: pasa una sola petición de prueba; si sale bien se cierra,
+      si falla vuelve a abrirse.
+    """
+
+    def __init__(self, name: str, failure_rate: float, minimum_calls: int, window: float, open_seconds: float):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.minimum_calls = minimum_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        """Indica si se puede enviar una petición (y reserva la prueba en half-open)."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+            logger.info("Circuito '%s' en half-open: se envía una petición de prueba.", self.name)
+
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def is_open(self) -> bool:
+        """Indica si el circuito está abierto y todavía no toca probar (no cambia el estado)."""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.open_seconds
+
+    def release(self):
+        """Libera la petición de prueba de half-open sin registrar resultado."""
+        self._probe_in_flight = False
+
+    def record(self, success: bool):
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+            if success:
+                self._close()
+            else:
+                self._open()
+            return
+
+        now = time.monotonic()
+        self._calls.append((now, success))
+        self._failures += not success
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._failures -= not self._calls.popleft()[1]
+
+        if (
+            self.state == CLOSED
+            and len(self._calls) >= self.minimum_calls
+            and self._failures / len(self._calls) >= self.failure_rate
+        ):
+            self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(
+            "Circuito '%s' abierto: se falla de inmediato durante %ss.", self.name, self.open_seconds
+        )
+
+    def _close(self):
+        self.state = CLOSED
+        self._calls.clear()
+        self._failures = 0
+        logger.info("Circuito '%s' cerrado: el upstream volvió a responder.", self.name)
+
+
+# --- Registro por upstream ---
+breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(upstream: str) -> CircuitBreaker:
+    breaker = breakers.get(upstream)
+    if breaker is None:
+        breaker = breakers[upstream] = CircuitBreaker(
+            upstream,
+            failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+            minimum_calls=settings.CIRCUIT_BREAKER_MINIMUM_CALLS,
+            window=settings.CIRCUIT_BREAKER_WINDOW_SECONDS,
+            open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+        )
+    return breaker
+
+
+class CircuitBreakerTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte que consulta el circuit breaker del upstream antes de cada
+    petición. Cuentan como fallo los errores de red/timeout y las respuestas
+    429 y 5xx; el resto de respuestas cuentan como éxito.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str):
+        self.transport = transport
+        self.breaker = get_breaker(upstream)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuito abierto para '{self.breaker.name}'", request=request)
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TransportError:
+            self.breaker.record(False)
+            raise
+        except BaseException:
+            # Cancelaciones, etc.: no dicen nada del upstream
+            self.breaker.release()
+            raise
+
+        self.breaker.record(response.status_code != 429 and response.status_code < 500)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _breaker_metrics() -> Iterable[metrics.Metric]:
+    state = metrics.Gauge("circuit_breaker_state", "Estado del circuito por upstream (0 cerrado, 1 half-open, 2 abierto).", ("upstream",))
+    rejected = metrics.Counter("circuit_breaker_rejected_total", "Peticiones rechazadas por circuito abierto.", ("upstream",))
+    for upstream, breaker in breakers.items():
+        state.inc(upstream, amount=STATE_VALUES[breaker.state])
+        rejected.inc(upstream, amount=breaker.rejected)
+    return state, rejected
+
+
+metrics.collectors.append(_breaker_metrics)
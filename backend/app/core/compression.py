@@ -0,0 +1,94 @@
+import logging
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.http_cache import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # Paquete opcional: sin él solo se ofrece gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class BrotliResponder(IdentityResponder):
+    """Como `GZipResponder` de Starlette, pero comprime con Brotli."""
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            # En respuestas por partes (NDJSON) se envía cada parte apenas se comprime
+            return self.compressor.process(body) + self.compressor.flush()
+        return self.compressor.process(body) + self.compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Comprime las respuestas según `Accept-Encoding`: Brotli si el cliente lo
+    acepta y está disponible, si no gzip. Las respuestas más chicas que
+    `minimum_size` y los streams SSE se envían sin comprimir. Al comprimir, el
+    ETag fuerte recibe el sufijo de la codificación (ver `http_cache.encoded_etag`).
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        if brotli is None:
+            logger.warning("El paquete 'brotli' no está instalado. Las respuestas solo se comprimirán con gzip.")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+            await responder(scope, receive, send)
+            return
+
+        async def send_with_etag(message: Message):
+            # El responder agrega Content-Encoding solo si comprimió el cuerpo;
+            # las respuestas que ya venían codificadas se dejan como están
+            if message["type"] == "http.response.start" and not responder.content_encoding_set:
+                headers = MutableHeaders(raw=message["headers"])
+                if "etag" in headers and headers.get("content-encoding") == responder.content_encoding:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+            await send(message)
+
+        await responder(scope, receive, send_with_etag)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Elige "br", "gzip" o `None` a partir de `Accept-Encoding`, respetando los valores `q`."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name.strip()] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = max(candidates, key=lambda name: weights.get(name, weights.get("*", 0.0)))
+    return best if weights.get(best, weights.get("*", 0.0)) > 0 else None
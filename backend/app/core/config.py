@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 from pydantic import ConfigDict
+from typing import Dict
 
 load_dotenv()
 
@@ -18,10 +19,126 @@ class Settings(BaseSettings):
     EXCHANGE_RATE_API_KEY: str
     OPENWEATHERMAP_API_KEY: str
     COINGECKO_API_KEY: str
+
+    # --- URLs base de las APIs Externas ---
+    # Se pueden apuntar a un servidor local (ver benchmarks/fake_upstream.py)
+    OPENWEATHERMAP_BASE_URL: str = "https://api.openweathermap.org"
+    COINGECKO_BASE_URL: str = "https://api.coingecko.com/api/v3"
+    EXCHANGE_RATE_BASE_URL: str = "https://v6.exchangerate-api.com/v6"
     
     # --- Configuración del Caché de Clima ---
     # Tiempo en segundos que los datos del clima serán considerados válidos en la caché
     WEATHER_CACHE_TTL_SECONDS: int = 3600 # 1 hora
+    # Consultas simultáneas a OpenWeatherMap en los endpoints por lotes
+    WEATHER_BATCH_CONCURRENCY: int = 4
+    # Cada cuánto OpenWeatherMap emite un pronóstico nuevo (5 días en bloques de 3 h):
+    # el pronóstico en caché vence en el próximo corte
+    WEATHER_FORECAST_ISSUE_SECONDS: int = 10800 # 3 horas
+    # Distancia máxima (km) al lugar más cercano del gazetteer en /weather/nearest
+    WEATHER_NEAREST_MAX_DISTANCE_KM: float = 150.0
+
+    # --- Configuración del Caché de Monedas ---
+    CURRENCY_CACHE_TTL_SECONDS: int = 3600 # 1 hora
+    # Moneda base de la tabla de tasas que se descarga (el resto se calcula por triangulación)
+    CURRENCY_RATES_BASE: str = "USD"
+    # Máximo de conversiones aceptadas en POST /currency/convert/batch
+    CURRENCY_BATCH_MAX_ITEMS: int = 100000
+
+    # --- Configuración del Caché de Bitcoin ---
+    # Vida de la cotización consolidada (precio, máx/mín 24 h, USD→PYG)
+    BITCOIN_CACHE_TTL_SECONDS: int = 60
+    # Proporción del cupo mensual de CoinGecko para el refresco de la cotización
+    # (el resto queda para el historial). Si el cupo no alcanza para refrescar
+    # cada BITCOIN_CACHE_TTL_SECONDS, la vida de la cotización se alarga (ver
+    # bitcoin.quote_ttl): con el plan demo (10000/mes) son unos 324 s
+    BITCOIN_QUOTE_BUDGET_SHARE: float = 0.8
+
+    # --- Configuración del Historial de Bitcoin ---
+    # Días que se descargan la primera vez (el plan demo de CoinGecko permite hasta 365)
+    BITCOIN_HISTORY_BACKFILL_DAYS: int = 365
+    # Máximo de días que se pueden pedir en /bitcoin/history
+    BITCOIN_HISTORY_MAX_DAYS: int = 3650
+    # Días de la serie horaria (CoinGecko devuelve puntos horarios hasta 90 días)
+    BITCOIN_HISTORY_HOURLY_DAYS: int = 90
+    # Máximo de puntos que se pueden pedir con `max_points`
+    BITCOIN_HISTORY_MAX_POINTS: int = 5000
+
+    # --- Configuración del Stream en Vivo de Bitcoin ---
+    # Cada cuánto el sondeo único revisa la cotización en caché
+    BITCOIN_STREAM_POLL_SECONDS: float = 5.0
+    # Intervalo mínimo por defecto entre mensajes a un mismo cliente
+    BITCOIN_STREAM_MIN_INTERVAL_SECONDS: float = 5.0
+    # Comentario de keep-alive (SSE) o ping (WebSocket) cuando no hay datos nuevos
+    BITCOIN_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    BITCOIN_STREAM_MAX_CLIENTS: int = 1000
+
+    # --- Configuración del Caché en Memoria (L1) ---
+    # Capacidad máxima por namespace, ej: L1_CACHE_MAX_ENTRIES='{"weather": 64}'
+    L1_CACHE_MAX_ENTRIES: Dict[str, int] = {"weather": 64, "currency": 256, "bitcoin": 16, "bitcoin_history": 64}
+    L1_CACHE_DEFAULT_MAX_ENTRIES: int = 128
+    # Tiempo máximo que se sirve un valor expirado mientras se revalida en segundo plano
+    CACHE_MAX_STALE_SECONDS: int = 21600 # 6 horas
+
+    # --- Caché Persistente (L2) ---
+    # Backend de la caché compartida: "mongo", "sqlite" (archivo local en modo WAL) o "memory"
+    CACHE_BACKEND: str = "mongo"
+    CACHE_SQLITE_PATH: str = ".cache/l2_cache.sqlite3"
+
+    # --- Snapshot de la Caché en Disco (arranque en caliente) ---
+    # Clima, tabla de tasas y cotización de BTC se guardan periódicamente y al apagar,
+    # y se cargan al arrancar para no esperar a MongoDB ni a las APIs externas
+    CACHE_SNAPSHOT_ENABLED: bool = True
+    CACHE_SNAPSHOT_PATH: str = ".cache/l1_snapshot.json"
+    CACHE_SNAPSHOT_INTERVAL_SECONDS: int = 300
+
+    # --- Configuración del Refresco en Segundo Plano ---
+    CACHE_REFRESH_ENABLED: bool = True
+    # Se refresca cada entrada esta cantidad de segundos antes de que expire
+    CACHE_REFRESH_LEAD_SECONDS: int = 15
+    # Espera mínima entre refrescos de una misma entrada
+    CACHE_REFRESH_MIN_INTERVAL_SECONDS: int = 10
+    # Espera antes de reintentar un refresco que falló
+    CACHE_REFRESH_RETRY_SECONDS: int = 30
+
+    # --- Configuración de los Clientes HTTP (APIs Externas) ---
+    # Se crea un cliente con pool de conexiones por cada host externo
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    HTTP_TIMEOUT_SECONDS: float = 10.0
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    # Requiere el paquete opcional 'h2' (pip install httpx[http2])
+    HTTP_ENABLE_HTTP2: bool = False
+
+# --- Compresión de respuestas ---
+    # Las respuestas más chicas que esto (en bytes) se envían sin comprimir
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    # Brotli (0-11) se usa si el cliente lo acepta y el paquete 'brotli' está instalado
+    COMPRESSION_BROTLI_QUALITY: int = 5
+
+# --- Circuit breaker por upstream ---
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    # Se abre si en la ventana hubo al menos MINIMUM_CALLS llamadas y esta proporción falló
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_MINIMUM_CALLS: int = 5
+    CIRCUIT_BREAKER_WINDOW_SECONDS: float = 60.0
+    # Tiempo que se falla de inmediato antes de probar de nuevo (half-open)
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30.0
+
+# --- Presupuesto de llamadas a las APIs externas ---
+    RATE_BUDGET_ENABLED: bool = True
+    # Cuotas de cada API key (plan demo de CoinGecko, plan gratuito de exchangerate-api
+    # y de OpenWeatherMap), ej: UPSTREAM_RATE_LIMITS='{"coingecko": {"per_minute": 30, "per_month": 10000}}'
+    UPSTREAM_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+        "coingecko": {"per_minute": 30, "per_month": 10000},
+        "exchangerate": {"per_minute": 30, "per_month": 1500},
+        "openweathermap": {"per_minute": 60, "per_month": 1000000},
+    }
+
+# --- Métricas ---
+    # Expone /metrics (formato Prometheus) y mide la latencia de cada ruta
+    METRICS_ENABLED: bool = True
     
     model_config = ConfigDict(env_file=".env", extra="ignore")
 # Instancia global de configuración
@@ -26,8 +26,9 @@ async def connect_to_mongo():
     except Exception as e:
         print(f"❌ Error al conectar a MongoDB: {e}")
         # 4. Si falló después de crear el objeto cliente, lo cerramos
+        # (close() de motor es síncrono)
         if test_client:
-            await test_client.close()
+            test_client.close()
         
         # Aquí, client y database permanecen como None, lo cual es correcto.
 
@@ -36,7 +37,9 @@ async def close_mongo_connection():
     
     # 💡 La verificación que ya tienes es correcta.
     if client:
-        await client.close()
+        client.close()
+        client = None
+        database = None
         print("❌ Conexión a MongoDB cerrada.")
     else:
         # Añadir un mensaje para saber si la conexión nunca se abrió
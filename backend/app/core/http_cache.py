@@ -0,0 +1,105 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Hashable, List, Optional
+
+from fastapi import Request, Response
+
+from app.core.cache import get_cache
+
+# Sufijo del ETag de cada representación comprimida: un validador fuerte no
+# puede repetirse entre cuerpos distintos (RFC 9110 §8.8.3)
+ETAG_ENCODING_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+
+def cache_validators(namespace: str, key: Hashable, fresh_only: bool = False) -> Optional[Dict[str, str]]:
+    """
+    Cabeceras de caché HTTP derivadas de la entrada L1 `key` de `namespace`:
+    - `ETag` fuerte: cambia cada vez que la entrada se vuelve a cargar y
+      cuando expira (el cuerpo pasa a llevar `stale: true`).
+    - `Last-Modified`: momento en que se obtuvo el dato; solo en entradas
+      vigentes, porque la fecha no distingue la versión vencida.
+    - `Cache-Control: max-age`: lo que le queda de vida a la entrada.
+
+    Devuelve `None` si no hay entrada (o si expiró y `fresh_only` es True).
+    """
+    entry = get_cache(namespace).peek(key)
+    if entry is None:
+        return None
+    now = time.time()
+    fresh = entry.is_fresh(now)
+    if fresh_only and not fresh:
+        return None
+
+    version = hashlib.blake2b(repr((namespace, key, entry.stored_at, fresh)).encode(), digest_size=12).hexdigest()
+    validators = {
+        "ETag": f'"{version}"',
+        "Cache-Control": f"public, max-age={max(int(entry.expires_at - now), 0)}",
+    }
+    if fresh:
+        validators["Last-Modified"] = formatdate(entry.stored_at, usegmt=True)
+    return validators
+
+
+def not_modified(request: Request, validators: Optional[Dict[str, str]]) -> Optional[Response]:
+    """
+    Devuelve una respuesta 304 (sin cuerpo) si la petición condicional coincide
+    con `validators`; si no, `None`. `If-None-Match` tiene prioridad sobre
+    `If-Modified-Since`, como indica la RFC 9110.
+    """
+    if validators is None:
+        return None
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Comparación débil: "W/" no cambia la identidad de la versión
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        etag = validators["ETag"]
+        matched = next((variant for variant in _etag_variants(etag) if variant in tags), None)
+        if matched is None and "*" in tags:
+            matched = etag
+        if matched is not None and matched != etag:
+            # El 304 lleva el ETag de la representación que tiene el cliente
+            validators = {**validators, "ETag": matched}
+        matches = matched is not None
+    else:
+        matches = _not_modified_since(request.headers.get("if-modified-since"), validators.get("Last-Modified"))
+
+    return Response(status_code=304, headers=validators) if matches else None
+
+
+def conditional_response(request: Request, response: Response, namespace: str, key: Hashable) -> Optional[Response]:
+    """
+    Después de cargar el dato: devuelve un 304 si el cliente ya tiene la versión
+    en caché; si no, agrega los validadores a `response` y devuelve `None`.
+    """
+    validators = cache_validators(namespace, key)
+    not_modified_response = not_modified(request, validators)
+    if not_modified_response is None and validators is not None:
+        response.headers.update(validators)
+    return not_modified_response
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag de la representación comprimida con `encoding`; los ETag débiles no cambian."""
+    suffix = ETAG_ENCODING_SUFFIXES.get(encoding)
+    if suffix is None or etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}{suffix}"'
+
+
+def _etag_variants(etag: str) -> List[str]:
+    return [etag, *(encoded_etag(etag, encoding) for encoding in ETAG_ENCODING_SUFFIXES)]
+
+
+def _not_modified_since(if_modified_since: Optional[str], last_modified: Optional[str]) -> bool:
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since: datetime = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(last_modified) <= since
@@ -0,0 +1,113 @@
+import logging
+import time
+import httpx
+from typing import Dict, Optional
+from app.core import metrics
+from app.core.circuit_breaker import CircuitBreakerTransport
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Upstreams conocidos ---
+# Un cliente (y por lo tanto un pool de conexiones) por host externo.
+OPENWEATHERMAP = "openweathermap"
+COINGECKO = "coingecko"
+EXCHANGE_RATE = "exchangerate"
+
+UPSTREAMS = (OPENWEATHERMAP, COINGECKO, EXCHANGE_RATE)
+
+clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class MetricsTransport(httpx.AsyncBaseTransport):
+    """
+    Envuelve el transporte del cliente para medir cada petición al upstream:
+    latencia hasta recibir las cabeceras, peticiones en curso y errores.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, upstream: str):
+        self.transport = transport
+        self.upstream = upstream
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        metrics.upstream_requests_in_progress.inc(self.upstream)
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            metrics.upstream_errors.inc(self.upstream, "timeout")
+            raise
+        except httpx.TransportError:
+            metrics.upstream_errors.inc(self.upstream, "network")
+            raise
+        finally:
+            metrics.upstream_requests_in_progress.dec(self.upstream)
+            metrics.upstream_request_duration.observe(time.perf_counter() - start, self.upstream)
+
+        metrics.upstream_requests.inc(self.upstream, str(response.status_code))
+        if response.status_code >= 400:
+            metrics.upstream_errors.inc(self.upstream, f"http_{response.status_code // 100}xx")
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _build_client(upstream: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    timeout = httpx.Timeout(
+        settings.HTTP_TIMEOUT_SECONDS,
+        connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+    )
+
+    http2 = settings.HTTP_ENABLE_HTTP2
+    if http2 and not _http2_available():
+        logger.warning("HTTP_ENABLE_HTTP2 está activo pero el paquete 'h2' no está instalado. Se usará HTTP/1.1.")
+        http2 = False
+
+    transport: httpx.AsyncBaseTransport = MetricsTransport(httpx.AsyncHTTPTransport(limits=limits, http2=http2), upstream)
+    if settings.CIRCUIT_BREAKER_ENABLED:
+        # Por fuera de las métricas: las peticiones rechazadas no cuentan como latencia del upstream
+        transport = CircuitBreakerTransport(transport, upstream)
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+async def open_http_clients():
+    """Crea un cliente HTTP con pool de conexiones para cada upstream."""
+    for upstream in UPSTREAMS:
+        if upstream not in clients:
+            clients[upstream] = _build_client(upstream)
+    logger.info("✅ Clientes HTTP creados para: %s", ", ".join(UPSTREAMS))
+
+
+async def close_http_clients():
+    """Cierra todos los clientes HTTP y libera sus conexiones."""
+    for upstream in list(clients):
+        await clients.pop(upstream).aclose()
+    logger.info("❌ Clientes HTTP cerrados.")
+
+
+def get_http_client(upstream: str, client: Optional[httpx.AsyncClient] = None) -> httpx.AsyncClient:
+    """
+    Devuelve el cliente compartido del upstream indicado.
+
+    Si se inyecta un `client` se devuelve tal cual. Fuera del `lifespan`
+    (scripts, pruebas) el cliente se crea de forma perezosa.
+    """
+    if client is not None:
+        return client
+    if upstream not in clients:
+        clients[upstream] = _build_client(upstream)
+    return clients[upstream]
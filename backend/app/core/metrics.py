@@ -0,0 +1,198 @@
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Exposición en el formato de texto de Prometheus (versión 0.0.4)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+class Metric(ABC):
+    """Base de las métricas: nombre, ayuda y nombres de las etiquetas."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    Contador por combinación de etiquetas. Registrar es una suma en un dict:
+    todo corre en el event loop, así que no hacen falta locks.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{self._labels(labels)} {_format(value)}"
+
+
+class Gauge(Counter):
+    """Valor que sube y baja (p. ej. peticiones en curso)."""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    """Histograma con buckets fijos: cada observación es un `bisect` y dos sumas."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiquetas: [conteos por bucket (sin acumular) + bucket +Inf, suma]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> Iterable[str]:
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = 'le="%s"' % _format(bound)
+                yield f"{self.name}_bucket{self._labels(labels, le)} {cumulative}"
+            cumulative += counts[-1]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{self._labels(labels, le)} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {_format(total[0])}"
+            yield f"{self.name}_count{self._labels(labels)} {cumulative}"
+
+
+# --- Registro ---
+metrics: Dict[str, Metric] = {}
+# Funciones que arman métricas al momento de exponerlas (datos que ya se cuentan en otro lado)
+collectors: List[Callable[[], Iterable[Metric]]] = []
+
+
+def register(metric: Metric) -> Metric:
+    metrics[metric.name] = metric
+    return metric
+
+
+def render_metrics() -> str:
+    rendered = [metric.render() for metric in metrics.values()]
+    for collect in collectors:
+        rendered.extend(metric.render() for metric in collect())
+    return "\n".join(rendered) + "\n"
+
+
+# --- Métricas de la aplicación ---
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UPSTREAM_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+http_requests = register(Counter(
+    "http_requests_total", "Peticiones HTTP atendidas.", ("method", "route", "status")
+))
+http_request_duration = register(Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta.", ("method", "route"), REQUEST_BUCKETS
+))
+http_requests_in_progress = register(Gauge(
+    "http_requests_in_progress", "Peticiones HTTP en curso.", ("method",)
+))
+upstream_requests = register(Counter(
+    "upstream_requests_total", "Peticiones a las APIs externas.", ("upstream", "status")
+))
+upstream_errors = register(Counter(
+    "upstream_errors_total", "Errores de las APIs externas (red, timeout o respuesta 4xx/5xx).", ("upstream", "kind")
+))
+upstream_request_duration = register(Histogram(
+    "upstream_request_duration_seconds", "Latencia de las APIs externas (hasta recibir las cabeceras).", ("upstream",), UPSTREAM_BUCKETS
+))
+upstream_requests_in_progress = register(Gauge(
+    "upstream_requests_in_progress", "Peticiones a las APIs externas en curso.", ("upstream",)
+))
+
+
+class MetricsMiddleware:
+    """
+    Mide cada petición HTTP con la plantilla de la ruta (p. ej.
+    `/api/v1/weather/{department_name}`) como etiqueta, para no crear una
+    serie por cada valor de los parámetros. Los streams SSE no se miden:
+    su duración es la de la conexión, no la de la petición.
+    """
+
+    def __init__(self, app: ASGIApp, exclude_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        streaming = False
+
+        async def send_with_status(message: Message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(method)
+            # FastAPI deja la ruta que atendió la petición en el scope
+            route = getattr(scope.get("route"), "path_format", "unmatched")
+            http_requests.inc(method, route, status)
+            if not streaming:
+                http_request_duration.observe(time.perf_counter() - start, method, route)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
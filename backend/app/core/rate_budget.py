@@ -0,0 +1,116 @@
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from app.core import circuit_breaker, metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MONTH_SECONDS = 30 * 24 * 3600
+
+
+class TokenBucket:
+    """Token bucket clásico: `capacity` fichas que se reponen a `rate` por segundo."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def take(self, amount: float = 1.0):
+        self._refill()
+        self.tokens -= amount
+
+
+class RateBudget:
+    """
+    Presupuesto de llamadas de una API key: un bucket por minuto y otro por mes.
+
+    El cupo mensual se reparte de forma continua (per_month / 30 días) y se
+    acumula como máximo el equivalente a un día, así un pico de tráfico no
+    puede gastar en horas lo que tiene que durar todo el mes.
+    """
+
+    def __init__(self, upstream: str, per_minute: int, per_month: int):
+        self.upstream = upstream
+        self.minute = TokenBucket(per_minute, per_minute / 60)
+        self.month = TokenBucket(per_month / 30, per_month / MONTH_SECONDS)
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        """Consume una llamada si hay cupo en los dos buckets."""
+        if self.minute.available() < 1 or self.month.available() < 1:
+            self.rejected += 1
+            return False
+        self.minute.take()
+        self.month.take()
+        return True
+
+
+# --- Registro por upstream ---
+budgets: Dict[str, RateBudget] = {}
+
+
+def get_budget(upstream: str) -> Optional[RateBudget]:
+    """Presupuesto del upstream según UPSTREAM_RATE_LIMITS (`None` si no tiene límites)."""
+    budget = budgets.get(upstream)
+    if budget is None:
+        limits = settings.UPSTREAM_RATE_LIMITS.get(upstream)
+        if limits is None:
+            return None
+        budget = budgets[upstream] = RateBudget(upstream, limits["per_minute"], limits["per_month"])
+    return budget
+
+
+def try_acquire(upstream: str) -> bool:
+    """
+    Lo consultan los fetchers antes de llamar a la API externa. Si devuelve
+    False no hay que llamar: el servicio sirve el último dato en caché.
+    """
+    if not settings.RATE_BUDGET_ENABLED:
+        return True
+    # Con el circuito abierto la petición falla sin salir: no se gasta una ficha
+    breaker = circuit_breaker.breakers.get(upstream)
+    if settings.CIRCUIT_BREAKER_ENABLED and breaker is not None and breaker.is_open():
+        return True
+    budget = get_budget(upstream)
+    if budget is None or budget.try_acquire():
+        return True
+    logger.warning("Presupuesto de llamadas agotado para '%s': se usa la caché.", upstream)
+    return False
+
+
+def sustainable_interval(upstream: str, share: float = 1.0) -> float:
+    """
+    Segundos entre llamadas que el cupo mensual del upstream sostiene si una
+    tarea periódica usa la proporción `share` (0 si no hay límite).
+    """
+    limits = settings.UPSTREAM_RATE_LIMITS.get(upstream)
+    if not settings.RATE_BUDGET_ENABLED or limits is None:
+        return 0.0
+    return MONTH_SECONDS / (limits["per_month"] * share)
+
+
+def _budget_metrics() -> Iterable[metrics.Metric]:
+    remaining = metrics.Gauge("upstream_budget_remaining", "Llamadas disponibles en el presupuesto de cada API key.", ("upstream", "window"))
+    rejected = metrics.Counter("upstream_budget_rejected_total", "Llamadas no realizadas por falta de presupuesto.", ("upstream",))
+    for upstream in settings.UPSTREAM_RATE_LIMITS:
+        budget = get_budget(upstream)
+        remaining.inc(upstream, "minute", amount=int(budget.minute.available()))
+        remaining.inc(upstream, "month", amount=int(budget.month.available()))
+        rejected.inc(upstream, amount=budget.rejected)
+    return remaining, rejected
+
+
+metrics.collectors.append(_budget_metrics)
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Any, List, Mapping, Optional, Type
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson. Es la clase por defecto de la app.
+
+    Además de dicts y listas acepta directamente los modelos de `schemas` (o
+    listas de modelos): se serializan a JSON con pydantic-core en una sola
+    pasada, sin dicts intermedios ni `jsonable_encoder`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.__pydantic_serializer__.to_json(content, by_alias=True)
+        if isinstance(content, list) and content and isinstance(content[0], BaseModel):
+            model = type(content[0])
+            if all(type(item) is model for item in content):
+                return _list_adapter(model).dump_json(content, by_alias=True)
+        return orjson.dumps(content, default=_encode_model, option=ORJSON_OPTIONS)
+
+
+def trusted_response(content: Any, headers: Optional[Mapping[str, str]] = None) -> FastJSONResponse:
+    """
+    Respuesta para modelos que ya vienen validados de los servicios. Al
+    devolver una `Response`, FastAPI no vuelve a pasar el contenido por
+    `response_model` (que se mantiene en la ruta solo para OpenAPI).
+    """
+    return FastJSONResponse(content, headers=headers)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def _encode_model(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return orjson.Fragment(value.__pydantic_serializer__.to_json(value, by_alias=True))
+    raise TypeError(f"Tipo no serializable a JSON: {type(value).__name__}")
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Un refresco devuelve el momento (epoch) en que expira el dato refrescado,
+# o `None` si no se pudo refrescar.
+RefreshFn = Callable[[], Awaitable[Optional[float]]]
+
+
+@dataclass
+class RefreshJob:
+    name: str
+    refresh: RefreshFn
+
+
+class RefreshScheduler:
+    """
+    Refresca los datos en caché poco antes de que expiren
+    (CACHE_REFRESH_LEAD_SECONDS), para que ninguna petición tenga que esperar
+    a las APIs externas. Cada trabajo corre en su propia tarea.
+    """
+
+    def __init__(self):
+        self.jobs: List[RefreshJob] = []
+        self._tasks: List["asyncio.Task[None]"] = []
+
+    def add_job(self, name: str, refresh: RefreshFn):
+        # Registrar dos veces el mismo nombre reemplaza el trabajo anterior
+        self.jobs = [job for job in self.jobs if job.name != name]
+        self.jobs.append(RefreshJob(name=name, refresh=refresh))
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._run(job), name=f"refresh:{job.name}") for job in self.jobs]
+        logger.info("✅ Refresco en segundo plano iniciado (%d trabajos).", len(self._tasks))
+
+    async def stop(self):
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("❌ Refresco en segundo plano detenido.")
+
+    async def _run(self, job: RefreshJob):
+        while True:
+            try:
+                expires_at = await job.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Error al refrescar '%s': %r", job.name, e)
+                expires_at = None
+
+            await asyncio.sleep(next_refresh_delay(expires_at))
+
+
+def next_refresh_delay(expires_at: Optional[float], now: Optional[float] = None) -> float:
+    if expires_at is None:
+        return settings.CACHE_REFRESH_RETRY_SECONDS
+
+    now = now if now is not None else time.time()
+    delay = expires_at - now - settings.CACHE_REFRESH_LEAD_SECONDS
+    return max(delay, settings.CACHE_REFRESH_MIN_INTERVAL_SECONDS)
+
+
+# Instancia global del planificador (se arranca desde el `lifespan`)
+scheduler = RefreshScheduler()
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce llamadas concurrentes con la misma clave en una sola ejecución.
+
+    El primer llamador lanza la corrutina como tarea; los demás esperan esa
+    misma tarea y reciben el mismo resultado o la misma excepción. La tarea se
+    protege con `asyncio.shield`, así que si el primer llamador se cancela
+    (p. ej. el cliente HTTP se desconecta) el resto de esperas no se ven afectadas.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]"):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Marcar la excepción como consultada aunque todos los llamadores se hayan cancelado
+        if not task.cancelled():
+            task.exception()
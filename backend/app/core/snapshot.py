@@ -0,0 +1,132 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Type
+
+import orjson
+from pydantic import BaseModel
+
+from app.core.cache import get_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class SnapshotSpec:
+    namespace: str
+    # Modelo de los valores guardados (`None` si ya son JSON: dicts, listas, números)
+    model: Optional[Type[BaseModel]] = None
+
+
+# --- Registro de namespaces que se guardan en el snapshot ---
+specs: Dict[str, SnapshotSpec] = {}
+
+
+def register(namespace: str, model: Optional[Type[BaseModel]] = None):
+    """Lo llaman los servicios para que sus entradas L1 sobrevivan a un reinicio."""
+    specs[namespace] = SnapshotSpec(namespace, model)
+
+
+def _dump(spec: SnapshotSpec, value: Any) -> Any:
+    if spec.model is not None:
+        # Solo los campos del modelo registrado (sin `stale`, que se calcula al servir)
+        fields = set(spec.model.model_fields) - {"stale"}
+        return value.model_dump(mode="json", include=fields)
+    return value
+
+
+def _load(spec: SnapshotSpec, value: Any) -> Any:
+    return spec.model.model_validate(value) if spec.model is not None else value
+
+
+def build_snapshot() -> Dict[str, Any]:
+    """
+    Entradas L1 de los namespaces registrados, con sus marcas de tiempo.
+    Solo se guardan las claves de texto (las claves compuestas son datos derivados).
+    """
+    namespaces = {}
+    for namespace, spec in specs.items():
+        cache = get_cache(namespace)
+        entries = []
+        for key in list(cache.keys()):
+            entry = cache.peek(key)
+            if entry is None or not isinstance(key, str):
+                continue
+            entries.append([key, entry.stored_at, entry.expires_at, _dump(spec, entry.value)])
+        namespaces[namespace] = entries
+    return {"version": SNAPSHOT_VERSION, "saved_at": time.time(), "namespaces": namespaces}
+
+
+def save_snapshot(path: Optional[str] = None) -> int:
+    """
+    Escribe el snapshot en disco (archivo temporal + rename, así un corte a
+    mitad de camino no deja un archivo roto). Devuelve las entradas guardadas.
+    """
+    path = path or settings.CACHE_SNAPSHOT_PATH
+    snapshot = build_snapshot()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(orjson.dumps(snapshot))
+    os.replace(tmp_path, path)
+    return sum(len(entries) for entries in snapshot["namespaces"].values())
+
+
+def load_snapshot(path: Optional[str] = None) -> int:
+    """
+    Carga el snapshot en las cachés L1 con sus marcas de tiempo originales:
+    lo expirado se sirve como stale (hasta CACHE_MAX_STALE_SECONDS) mientras
+    el planificador lo refresca. Nunca pisa una entrada ya cargada.
+    Devuelve las entradas cargadas (0 si no hay snapshot o no es válido).
+    """
+    path = path or settings.CACHE_SNAPSHOT_PATH
+    try:
+        with open(path, "rb") as f:
+            snapshot = orjson.loads(f.read())
+    except FileNotFoundError:
+        return 0
+    except (OSError, orjson.JSONDecodeError) as e:
+        logger.warning("No se pudo leer el snapshot de la caché '%s': %s", path, e)
+        return 0
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        logger.warning("Snapshot de la caché con versión desconocida: se ignora.")
+        return 0
+
+    loaded = 0
+    for namespace, entries in snapshot.get("namespaces", {}).items():
+        spec = specs.get(namespace)
+        if spec is None:
+            continue
+        cache = get_cache(namespace)
+        for entry in entries:
+            # Una entrada mal formada se salta: el resto del snapshot se carga igual
+            try:
+                key, stored_at, expires_at, value = entry
+                if not isinstance(key, str):
+                    raise TypeError(f"clave no válida: {key!r}")
+                if cache.peek(key) is not None:
+                    continue
+                cache.set(key, _load(spec, value), ttl=expires_at - stored_at, stored_at=stored_at)
+            except (TypeError, ValueError) as e:
+                logger.warning("Entrada del snapshot no válida en '%s': %s", namespace, e)
+                continue
+            loaded += 1
+    return loaded
+
+
+async def snapshot_job() -> Optional[float]:
+    """Trabajo del planificador: guarda el snapshot cada CACHE_SNAPSHOT_INTERVAL_SECONDS."""
+    try:
+        save_snapshot()
+    except OSError as e:
+        logger.warning("No se pudo guardar el snapshot de la caché: %s", e)
+        return None
+    # El planificador vuelve a correr el trabajo CACHE_REFRESH_LEAD_SECONDS antes de esta marca
+    return time.time() + settings.CACHE_SNAPSHOT_INTERVAL_SECONDS + settings.CACHE_REFRESH_LEAD_SECONDS
@@ -0,0 +1,126 @@
+import math
+from collections import defaultdict
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+EARTH_RADIUS_KM = 6371.0088
+# Kilómetros por grado de latitud
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia sobre la superficie terrestre entre dos coordenadas, en km."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex(Generic[T]):
+    """
+    Índice espacial de puntos fijos en una grilla de celdas de `cell_km` km.
+
+    Las coordenadas se proyectan a un plano (equirectangular alrededor de
+    `ref_lat`), que a la escala de un país cambia las distancias en pocas
+    décimas de porcentaje. `nearest` recorre anillos de celdas alrededor del
+    punto consultado hasta que ningún anillo más lejano puede tener un punto
+    más cercano que el mejor encontrado, y confirma el resultado con la
+    distancia haversine. Con `max_km` la búsqueda se limita a los anillos que
+    alcanzan esa distancia y los puntos lejanos a todo el índice se descartan
+    sin recorrer la grilla.
+    """
+
+    def __init__(self, points: Iterable[Tuple[float, float, T]], cell_km: float = 50.0, ref_lat: Optional[float] = None):
+        points = list(points)
+        if not points:
+            raise ValueError("El índice espacial necesita al menos un punto.")
+
+        if ref_lat is None:
+            ref_lat = sum(lat for lat, _, _ in points) / len(points)
+        self.cell_km = cell_km
+        self._kx = KM_PER_DEGREE * math.cos(math.radians(ref_lat))
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, float, float, T]]] = defaultdict(list)
+
+        for lat, lon, item in points:
+            x, y = self._project(lat, lon)
+            self._cells[self._cell(x, y)].append((x, y, lat, lon, item))
+
+        columns = [cx for cx, _ in self._cells]
+        rows = [cy for _, cy in self._cells]
+        self._bounds = (min(columns), max(columns), min(rows), max(rows))
+        lats = [lat for lat, _, _ in points]
+        lons = [lon for _, lon, _ in points]
+        self._extent = (min(lats), max(lats), min(lons), max(lons))
+        self._size = len(points)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _project(self, lat: float, lon: float) -> Tuple[float, float]:
+        return lon * self._kx, lat * KM_PER_DEGREE
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_km), math.floor(y / self.cell_km)
+
+    def _ring(self, cx: int, cy: int, radius: int) -> Iterable[Tuple[int, int]]:
+        if radius == 0:
+            yield cx, cy
+            return
+        for dx in range(-radius, radius + 1):
+            yield cx + dx, cy - radius
+            yield cx + dx, cy + radius
+        for dy in range(-radius + 1, radius):
+            yield cx - radius, cy + dy
+            yield cx + radius, cy + dy
+
+    def _out_of_reach(self, lat: float, lon: float, max_km: float) -> bool:
+        """True si (lat, lon) está a más de `max_km` de la caja que contiene todos los puntos."""
+        min_lat, max_lat, min_lon, max_lon = self._extent
+        margin_lat = max_km / KM_PER_DEGREE
+        if lat < min_lat - margin_lat or lat > max_lat + margin_lat:
+            return True
+        # Un grado de longitud mide menos cuanto más lejos del ecuador: se usa la
+        # latitud más extrema de la franja para que el margen nunca quede corto
+        extreme_lat = max(abs(min_lat - margin_lat), abs(max_lat + margin_lat))
+        if extreme_lat >= 90:
+            return False
+        margin_lon = max_km / (KM_PER_DEGREE * math.cos(math.radians(extreme_lat)))
+        return lon < min_lon - margin_lon or lon > max_lon + margin_lon
+
+    def nearest(self, lat: float, lon: float, max_km: Optional[float] = None) -> Optional[Tuple[T, float]]:
+        """
+        Punto más cercano a (lat, lon) y su distancia haversine en km. Con
+        `max_km`, devuelve None si no hay ningún punto a esa distancia o menos.
+        """
+        if max_km is not None and self._out_of_reach(lat, lon, max_km):
+            return None
+
+        x, y = self._project(lat, lon)
+        cx, cy = self._cell(x, y)
+        min_cx, max_cx, min_cy, max_cy = self._bounds
+        # Anillos necesarios para llegar a la celda ocupada más alejada
+        max_radius = max(abs(cx - min_cx), abs(cx - max_cx), abs(cy - min_cy), abs(cy - max_cy))
+        if max_km is not None:
+            # Un punto a d km cae a lo sumo en el anillo floor(d / cell_km) + 1
+            max_radius = min(max_radius, math.ceil(max_km / self.cell_km) + 1)
+
+        best: Optional[Tuple[float, float, float, T]] = None  # (distancia² en el plano, lat, lon, item)
+        for radius in range(max_radius + 1):
+            # Todo punto de un anillo r está al menos a (r - 1) celdas del punto consultado
+            if best is not None and ((radius - 1) * self.cell_km) ** 2 > best[0]:
+                break
+            for cell in self._ring(cx, cy, radius):
+                for px, py, plat, plon, item in self._cells.get(cell, ()):
+                    distance = (px - x) ** 2 + (py - y) ** 2
+                    if best is None or distance < best[0]:
+                        best = (distance, plat, plon, item)
+
+        if best is None:
+            return None
+        _, plat, plon, item = best
+        distance_km = haversine_km(lat, lon, plat, plon)
+        if max_km is not None and distance_km > max_km:
+            return None
+        return item, distance_km
@@ -0,0 +1,105 @@
+import numpy as np
+from typing import Dict
+
+# Anchos de bucket en segundos
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+# Las semanas empiezan el lunes (el 1970-01-01 fue jueves; el 1970-01-05, lunes)
+WEEK_ORIGIN = 4 * DAY
+
+# Serie OHLC: arrays paralelos "ts" (inicio del bucket, epoch en segundos), "open", "high", "low", "close"
+OHLC = Dict[str, np.ndarray]
+OHLC_KEYS = ("ts", "open", "high", "low", "close")
+
+
+def as_ohlc(ts: np.ndarray, price: np.ndarray) -> OHLC:
+    """Convierte una serie de precios en velas de un solo punto (apertura = máximo = mínimo = cierre)."""
+    return {"ts": ts, "open": price, "high": price, "low": price, "close": price}
+
+
+def resample_ohlc(ohlc: OHLC, width: int, origin: int = 0) -> OHLC:
+    """
+    Agrupa una serie OHLC ordenada por tiempo en buckets de `width` segundos:
+    apertura del primero, máximo y mínimo del bucket y cierre del último,
+    calculados de forma vectorizada con `reduceat`.
+    """
+    ts = ohlc["ts"]
+    if len(ts) == 0:
+        return ohlc
+
+    buckets = (ts - origin) // width
+    # Índice donde empieza cada bucket (la serie está ordenada)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    return _reduce(ohlc, starts, ts=buckets[starts] * width + origin)
+
+
+def ohlc_buckets(ts: np.ndarray, price: np.ndarray, width: int, origin: int = 0) -> OHLC:
+    """Velas OHLC de `width` segundos a partir de una serie de precios."""
+    return resample_ohlc(as_ohlc(ts, price), width, origin)
+
+
+def merge_ohlc(ohlc: OHLC, factor: int) -> OHLC:
+    """Une cada `factor` buckets consecutivos en uno solo (para respetar un máximo de puntos)."""
+    if factor <= 1 or len(ohlc["ts"]) == 0:
+        return ohlc
+
+    starts = np.arange(0, len(ohlc["ts"]), factor)
+    return _reduce(ohlc, starts, ts=ohlc["ts"][starts])
+
+
+def concat_ohlc(*series: OHLC) -> OHLC:
+    return {key: np.concatenate([ohlc[key] for ohlc in series]) for key in OHLC_KEYS}
+
+
+def slice_range(ohlc: OHLC, start: float, end: float) -> OHLC:
+    """Recorta una serie (ordenada por "ts") al rango [start, end) con búsqueda binaria."""
+    lo, hi = np.searchsorted(ohlc["ts"], [start, end], side="left")
+    return {key: values[lo:hi] for key, values in ohlc.items()}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: elige `threshold` índices de la serie que
+    conservan su forma visual. Devuelve los índices seleccionados (ordenados).
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][-threshold:], dtype=np.int64)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    # Bordes de los buckets intermedios (el primer y el último punto se conservan)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Promedio del bucket siguiente (o el último punto)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Área del triángulo (punto anterior, candidato, promedio siguiente)
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+
+    return selected
+
+
+def _reduce(ohlc: OHLC, starts: np.ndarray, ts: np.ndarray) -> OHLC:
+    ends = np.r_[starts[1:], len(ohlc["ts"])] - 1
+    return {
+        "ts": ts,
+        "open": ohlc["open"][starts],
+        "high": np.maximum.reduceat(ohlc["high"], starts),
+        "low": np.minimum.reduceat(ohlc["low"], starts),
+        "close": ohlc["close"][ends],
+    }
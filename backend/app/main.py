@@ -1,10 +1,25 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from functools import partial
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.http_client import open_http_clients, close_http_clients
+from app.core.cache_backend import close_backend
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, render_metrics
+from app.core.responses import FastJSONResponse
 from app.api.v1 import routers as api_router
+from app.core.scheduler import scheduler
+from app.core import snapshot
+from app.services import weather as weather_service
+from app.services import gazetteer
+from app.services import currency as currency_service
+from app.services import bitcoin as bitcoin_service
+from app.services import bitcoin_history as history_service
 
 # Configuración de Logging
 logging.basicConfig(
@@ -13,11 +28,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+def register_refresh_jobs():
+    """Registra el refresco en segundo plano de todos los datos en caché."""
+    scheduler.add_job("weather:departments", weather_service.refresh_weather)
+    scheduler.add_job("currency:rates", currency_service.refresh_rate_table)
+    scheduler.add_job("bitcoin:quote", bitcoin_service.refresh_btc_quote)
+    scheduler.add_job("bitcoin:history", partial(history_service.refresh_history, history_service.DAILY))
+    scheduler.add_job("bitcoin:history:hourly", partial(history_service.refresh_history, history_service.HOURLY))
+    if settings.CACHE_SNAPSHOT_ENABLED:
+        scheduler.add_job("cache:snapshot", snapshot.snapshot_job)
+
+
+async def prepare_database():
+    """Conecta a MongoDB y prepara las colecciones (corre en segundo plano)."""
     logger.info("Conectando a MongoDB...")
     await connect_to_mongo()
+    try:
+        await history_service.ensure_history_collection(get_database())
+    except Exception as e:
+        logger.warning(f"No se pudieron preparar las colecciones de MongoDB: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Arranque en caliente: lo último que se tenía en caché se sirve (como
+    # stale si ya expiró) mientras MongoDB conecta y los refrescos corren
+    if settings.CACHE_SNAPSHOT_ENABLED:
+        loaded = snapshot.load_snapshot()
+        logger.info("Snapshot de la caché: %d entradas cargadas.", loaded)
+    logger.info("Gazetteer: %d lugares en el índice espacial.", gazetteer.load_gazetteer())
+    # Sin esperar a MongoDB: mientras no conecte los servicios funcionan sin la caché L2
+    mongo_task = asyncio.create_task(prepare_database())
+    logger.info("Creando los clientes HTTP para las APIs externas...")
+    await open_http_clients()
+    if settings.CACHE_REFRESH_ENABLED:
+        logger.info("Iniciando el refresco de la caché en segundo plano...")
+        register_refresh_jobs()
+        scheduler.start()
     yield
+    await bitcoin_service.ticker_broadcaster.close()
+    await scheduler.stop()
+    if settings.CACHE_SNAPSHOT_ENABLED:
+        try:
+            logger.info("Snapshot de la caché: %d entradas guardadas.", snapshot.save_snapshot())
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el snapshot de la caché: {e}")
+    if not mongo_task.done():
+        mongo_task.cancel()
+    await asyncio.gather(mongo_task, return_exceptions=True)
+    logger.info("Cerrando los clientes HTTP...")
+    await close_http_clients()
+    await close_backend()
     logger.info("Cerrando la conexión a MongoDB...")
     await close_mongo_connection()
 
@@ -29,6 +90,8 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     version="1.0.0",
     lifespan=lifespan,
+    # Serialización con orjson en todas las rutas
+    default_response_class=FastJSONResponse,
 )
 
 # -- Rutas de la API --
@@ -46,6 +109,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresión gzip/brotli negociada con Accept-Encoding
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Latencia y conteo de peticiones por ruta (se expone en /metrics)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Incluimos las rutas de la API 
 app.include_router(
     api_router.router,
@@ -54,4 +129,12 @@ app.include_router(
 
 @app.get("/", tags=["Health Check"], description="Endpoint de Health Check", summary="Endpoint de Health Check")
 async def root():
-    return {"message": "API de Clima y Conversión de Monedas funcionando. Visita /api/v1/docs para la documentación."}
\ No newline at end of file
+    return {"message": "API de Clima y Conversión de Monedas funcionando. Visita /api/v1/docs para la documentación."}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
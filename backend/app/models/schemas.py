@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 # --- Modelos para Conversión de Moneda ---
@@ -18,6 +18,36 @@ class CurrencyConversionResponse(BaseModel):
     converted_amount: float = Field(..., description="Monto convertido a Guaraníes.")
     rate: float = Field(..., description="Tasa de cambio aplicada.")
     timestamp: datetime = Field(..., description="Momento de la consulta.")
+    stale: bool = Field(False, description="True si la tasa es la última conocida y está vencida (la API externa no respondió).")
+
+class CurrencyBatchColumns(BaseModel):
+    """Forma columnar de la solicitud por lotes: dos listas del mismo largo."""
+    from_currency: List[str] = Field(..., description="Códigos de las monedas de origen.")
+    amount: List[float] = Field(..., description="Montos a convertir (mismo orden que from_currency).")
+
+    @model_validator(mode="after")
+    def check_columns(self):
+        if len(self.from_currency) != len(self.amount):
+            raise ValueError("Las columnas 'from_currency' y 'amount' deben tener el mismo largo.")
+        if any(len(code) != 3 for code in self.from_currency):
+            raise ValueError("Los códigos de moneda deben tener 3 letras (ISO 4217).")
+        if any(not amount > 0 for amount in self.amount):
+            raise ValueError("Todos los montos deben ser mayores a 0.")
+        return self
+
+class CurrencyBatchResult(BaseModel):
+    """Resultado de una conversión dentro de un lote."""
+    source_currency: str = Field(..., description="Moneda de origen.")
+    amount: float = Field(..., description="Monto original.")
+    converted_amount: Optional[float] = Field(None, description="Monto convertido a Guaraníes (null si la moneda no es válida).")
+    rate: Optional[float] = Field(None, description="Tasa de cambio aplicada (null si la moneda no es válida).")
+
+class CurrencyBatchConversionResponse(BaseModel):
+    """Esquema para la respuesta de la conversión por lotes."""
+    target_currency: str = Field(..., description="Moneda de destino (PYG).")
+    count: int = Field(..., description="Cantidad de conversiones.")
+    results: List[CurrencyBatchResult] = Field(..., description="Conversiones, en el mismo orden de la solicitud.")
+    timestamp: datetime = Field(..., description="Momento de la consulta.")
 
 # --- Modelos para el Clima ---
 
@@ -28,7 +58,33 @@ class WeatherResponse(BaseModel):
     description: str = Field(..., description="Descripción del clima (ej: Lluvias ligeras).")
     humidity: int = Field(..., description="Porcentaje de humedad.")
     wind_speed_kmh: float = Field(..., description="Velocidad del viento en km/h.")
+    stale: bool = Field(False, description="True si el dato es el último conocido y está vencido (la API externa no respondió).")
     
+class WeatherForecastPoint(BaseModel):
+    """Bloque de 3 horas del pronóstico."""
+    timestamp: datetime = Field(..., description="Inicio del bloque (UTC).")
+    temp_celsius: float = Field(..., description="Temperatura en grados Celsius.")
+    description: str = Field(..., description="Descripción del clima (ej: Lluvias ligeras).")
+    humidity: int = Field(..., description="Porcentaje de humedad.")
+    wind_speed_kmh: float = Field(..., description="Velocidad del viento en km/h.")
+    pop: float = Field(..., description="Probabilidad de precipitación (0 a 1).")
+
+class WeatherForecastResponse(BaseModel):
+    """Esquema para la respuesta del pronóstico de un departamento."""
+    department: str = Field(..., description="Departamento de Paraguay consultado.")
+    issued_at: datetime = Field(..., description="Momento en que se descargó el pronóstico.")
+    points: List[WeatherForecastPoint] = Field(..., description="Bloques de 3 horas, en orden cronológico.")
+    stale: bool = Field(False, description="True si el pronóstico es el último conocido y está vencido (la API externa no respondió).")
+
+class NearestWeatherResponse(BaseModel):
+    """Esquema para la respuesta del clima del lugar más cercano a unas coordenadas."""
+    place: str = Field(..., description="Lugar del gazetteer más cercano (capital departamental o ciudad).")
+    department: str = Field(..., description="Departamento al que pertenece el lugar.")
+    latitude: float = Field(..., description="Latitud del lugar.")
+    longitude: float = Field(..., description="Longitud del lugar.")
+    distance_km: float = Field(..., description="Distancia en km desde las coordenadas consultadas.")
+    weather: WeatherResponse = Field(..., description="Clima actual del lugar.")
+
 class CachedWeather(WeatherResponse):
     """Esquema para el documento de caché en MongoDB."""
     last_updated: datetime = Field(..., description="Momento en que se guardó la caché.")
@@ -54,8 +110,37 @@ class BitcoinConversionResponse(BaseModel):
     btc_low_24h: float = Field(..., description="Precio mínimo de BTC en las últimas 24 horas.")
     btc_change_24h: float = Field(..., description="Variación del precio de BTC en las últimas 24 horas.")
     timestamp: datetime = Field(..., description="Momento de la consulta.")
+    stale: bool = Field(False, description="True si la cotización es la última conocida y está vencida (la API externa no respondió).")
+
+
+class BitcoinQuote(BaseModel):
+    """Cotización consolidada de BTC que se guarda en caché y alimenta las conversiones."""
+    price_usd: float = Field(..., description="Precio actual de BTC en USD.")
+    high_24h_usd: float = Field(..., description="Precio máximo de BTC en las últimas 24 horas (USD).")
+    low_24h_usd: float = Field(..., description="Precio mínimo de BTC en las últimas 24 horas (USD).")
+    change_24h_pct: float = Field(..., description="Variación porcentual del precio en las últimas 24 horas.")
+    usd_rate_pyg: float = Field(..., description="Tasa de cambio de USD a PYG.")
+    timestamp: datetime = Field(..., description="Momento en que se armó la cotización.")
+
+
+class BitcoinTicker(BaseModel):
+    """Mensaje del stream en vivo del precio de BTC."""
+    btc_rate_usd: float = Field(..., description="Precio actual de BTC en USD.")
+    btc_rate_pyg: float = Field(..., description="Precio actual de BTC en PYG.")
+    usd_rate_pyg: float = Field(..., description="Tasa de cambio de USD a PYG.")
+    btc_change_24h: float = Field(..., description="Variación del precio de BTC en las últimas 24 horas.")
+    timestamp: datetime = Field(..., description="Momento de la cotización.")
 
 
 class BitcoinHistoryPoint(BaseModel):
     date: str
-    price_usd: float
\ No newline at end of file
+    price_usd: float
+
+
+class BitcoinOHLCPoint(BaseModel):
+    """Vela OHLC del precio de BTC en USD para una hora, un día o una semana."""
+    timestamp: datetime = Field(..., description="Inicio del intervalo (UTC).")
+    open: float = Field(..., description="Primer precio del intervalo.")
+    high: float = Field(..., description="Precio máximo del intervalo.")
+    low: float = Field(..., description="Precio mínimo del intervalo.")
+    close: float = Field(..., description="Último precio del intervalo.")
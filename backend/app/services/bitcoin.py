@@ -1,162 +1,193 @@
 import httpx
-from datetime import datetime, timedelta
-from typing import Optional, List
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
 import asyncio
 from app.core.config import settings
-from app.models.schemas import BitcoinConversionResponse
-import random
+from app.core.http_client import get_http_client, COINGECKO
+from app.core import rate_budget
+from app.core import snapshot
+from app.core.cache import CacheEntry, get_cache, get_or_load_entry, refresh_entry
+from app.core.cache_backend import get_backend
+from app.core.singleflight import SingleFlight
+from app.core.broadcast import Broadcaster
+from app.models.schemas import BitcoinConversionResponse, BitcoinQuote, BitcoinTicker
+from app.services import currency as currency_service
 
 
-BITCOIN_API_URL = "https://api.coingecko.com/api/v3"
-
-EXCHANGE_API_URL = "https://v6.exchangerate-api.com/v6/"
-EXCHANGE_API_KEY = settings.EXCHANGE_RATE_API_KEY
 TARGET_CURRENCY = "PYG"
 BASE_CURRENCY = "USD"
 API_KEY = settings.COINGECKO_API_KEY
 
 headers = {"x-cg-demo-api-key": API_KEY}
 
-async def get_btc_to_usd_rate() -> Optional[float]: 
-    
-    params = {
-        "ids": "bitcoin",
-        "vs_currencies": "usd"
-    }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(BITCOIN_API_URL+"/simple/price", params=params, timeout=10, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("bitcoin", {}).get("usd")
-        except httpx.RequestError as e:
-            print(f"Error al obtener la tasa de cambio de BTC a USD: {e}")
-            return None
-
-async def get_btc_high_low_24h() -> Optional[tuple[float, float]]: 
+CACHE_NAMESPACE = "bitcoin"
+snapshot.register(CACHE_NAMESPACE, BitcoinQuote)
+QUOTE_CACHE_KEY = "quote"
+
+# Armados de la cotización en curso (las peticiones concurrentes comparten uno)
+_inflight_quotes = SingleFlight()
+
+
+async def fetch_btc_market_data(client: Optional[httpx.AsyncClient] = None) -> Optional[dict]:
+    """
+    Obtiene precio actual, máximo/mínimo y variación de 24 h de BTC en USD
+    con una sola llamada a `/coins/markets` de CoinGecko.
+    """
     
     params = {
-        "vs_currency": "usd",
+        "vs_currency": BASE_CURRENCY.lower(),
         "ids": "bitcoin",
-        "names": "Bitcoin",
-        "symbols": "btc",
-        "category": "layer-1",
-        "price_change_percentage": "7d",
         "per_page": 1,
         "page": 1,
         "sparkline": False,
-        "locale": "en"
     }
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(BITCOIN_API_URL+"/coins/markets", params=params, timeout=10, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            return data[0].get("high_24h"), data[0].get("low_24h"), data[0].get("price_change_percentage_24h")
-        except httpx.RequestError as e:
-            print(f"Error al obtener la tasa de cambio de BTC a USD: {e}")
-            return None
-
-async def get_usd_to_pyg_rate() -> Optional[float]: 
-    
-    url = f"{EXCHANGE_API_URL}{EXCHANGE_API_KEY}/latest/{BASE_CURRENCY}"
-    
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("result") == "success":
-                rate = data["conversion_rates"][TARGET_CURRENCY]
-                return rate
-            
-        except httpx.HTTPStatusError as e:
-            print(f"Error HTTP al obtener la tasa de cambio de USD a PYG: {e}")
-            return None
-            
-        except httpx.RequestError as e:
-            print(f"Error al obtener la tasa de cambio de USD a PYG: {e}")
-            return None
-    
-async def get_btc_to_pyg_rate() -> Optional[float]: 
-    
-    url = f"{EXCHANGE_API_URL}{EXCHANGE_API_KEY}/latest/{BASE_CURRENCY}"
+    if not rate_budget.try_acquire(COINGECKO):
+        print("Presupuesto de llamadas a CoinGecko agotado: se usa la cotización en caché.")
+        return None
+
+    client = get_http_client(COINGECKO, client)
+    try:
+        response = await client.get(settings.COINGECKO_BASE_URL+"/coins/markets", params=params, headers=headers)
+        response.raise_for_status()
+        data = response.json()
+        market = data[0]
+        return {
+            "price_usd": float(market["current_price"]),
+            "high_24h_usd": float(market["high_24h"]),
+            "low_24h_usd": float(market["low_24h"]),
+            "change_24h_pct": float(market["price_change_percentage_24h"] or 0.0),
+        }
+    except httpx.HTTPError as e:
+        print(f"Error al obtener los datos de mercado de BTC: {e}")
+        return None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        print(f"Error de formato inesperado de la API de CoinGecko: {e}")
+        return None
+
+
+async def get_btc_quote(client: Optional[httpx.AsyncClient] = None) -> Optional[BitcoinQuote]:
+    """
+    Devuelve la cotización consolidada de BTC (USD y PYG) desde la caché en memoria,
+    armándola con el mínimo de llamadas externas cuando expira.
+    """
+    entry = await get_btc_quote_entry(client)
+    return entry.value if entry is not None else None
+
+
+async def get_btc_quote_entry(client: Optional[httpx.AsyncClient] = None) -> Optional[CacheEntry]:
+    """
+    Como `get_btc_quote`, pero devuelve la entrada de la caché. Si las APIs
+    externas no responden, es la última cotización conocida (vencida).
+    """
+    return await get_or_load_entry(
+        get_cache(CACHE_NAMESPACE),
+        QUOTE_CACHE_KEY,
+        lambda: _load_btc_quote(client),
+        _inflight_quotes,
+    )
 
-    async with httpx.AsyncClient() as client:
+
+def quote_ttl() -> float:
+    """
+    Vida de la cotización: BITCOIN_CACHE_TTL_SECONDS, o más si el cupo de
+    CoinGecko no alcanza para refrescarla tan seguido.
+    """
+    return max(
+        settings.BITCOIN_CACHE_TTL_SECONDS,
+        rate_budget.sustainable_interval(COINGECKO, settings.BITCOIN_QUOTE_BUDGET_SHARE),
+    )
+
+
+async def refresh_btc_quote() -> Optional[float]:
+    """Refresca la cotización de BTC antes de que expire (lo usa el planificador)."""
+    return await refresh_entry(
+        get_cache(CACHE_NAMESPACE),
+        QUOTE_CACHE_KEY,
+        lambda: _load_btc_quote(use_backend_cache=False),
+        _inflight_quotes,
+    )
+
+
+async def _load_btc_quote(client: Optional[httpx.AsyncClient] = None, use_backend_cache: bool = True) -> Optional[BitcoinQuote]:
+    memory_cache = get_cache(CACHE_NAMESPACE)
+    backend = get_backend()
+
+    # Cotización armada por otra instancia (o antes de reiniciar) en la caché L2
+    if use_backend_cache:
         try:
-            response = await client.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("result") == "success":
-                return data["conversion_rates"][TARGET_CURRENCY]
-            return None
-
-        except httpx.HTTPStatusError as e:
-            print(f"Error HTTP al obtener la tasa de cambio de BTC a PYG: {e}")
-            return None
-            
-        except httpx.RequestError as e:
-            print(f"Error al obtener la tasa de cambio de BTC a PYG: {e}")
-            return None
-            
-async def convert_bitcoin_to_pyg(amount_btc: float) -> Optional[BitcoinConversionResponse]:
+            cached = await backend.get(CACHE_NAMESPACE, QUOTE_CACHE_KEY)
+            if cached is not None:
+                quote = BitcoinQuote.model_validate(cached.value)
+                memory_cache.set(QUOTE_CACHE_KEY, quote, cached.expires_at - cached.stored_at, stored_at=cached.stored_at)
+                return quote
+        except Exception as e:
+            print(f"Error al leer la caché de la cotización de BTC: {e}")
 
-    btc_usd_rate, btc_pyg_rate, usd_pyg_rate, low_high_btc_to_usd = await asyncio.gather(
-        get_btc_to_usd_rate(),
-        get_btc_to_pyg_rate(),
-        get_usd_to_pyg_rate(),
-        get_btc_high_low_24h()
+    # 1 llamada a CoinGecko + la tabla de tasas compartida con el conversor de monedas
+    # (que normalmente ya está en caché y no genera ninguna llamada).
+    market, usd_pyg_rate = await asyncio.gather(
+        fetch_btc_market_data(client),
+        currency_service.get_conversion_rate(BASE_CURRENCY),
     )
-    
-    if btc_usd_rate is None or btc_pyg_rate is None or usd_pyg_rate is None or low_high_btc_to_usd is None:
+
+    if market is None or usd_pyg_rate is None:
+        return None
+
+    quote = BitcoinQuote(**market, usd_rate_pyg=usd_pyg_rate, timestamp=datetime.now())
+    ttl = quote_ttl()
+    memory_cache.set(QUOTE_CACHE_KEY, quote, ttl)
+    try:
+        await backend.set(CACHE_NAMESPACE, QUOTE_CACHE_KEY, quote.model_dump(mode="json"), ttl)
+    except Exception as e:
+        print(f"Error al guardar la caché de la cotización de BTC: {e}")
+    return quote
+
+
+async def convert_bitcoin_to_pyg(amount_btc: float) -> Optional[BitcoinConversionResponse]:
+
+    entry = await get_btc_quote_entry()
+    if entry is None:
         return None
     
-    converted_amount = (amount_btc * btc_usd_rate ) * usd_pyg_rate 
-    converted_usd_to_pyg = btc_usd_rate * usd_pyg_rate
-    converted_high_24h = low_high_btc_to_usd[0] * usd_pyg_rate
-    converted_low_24h = low_high_btc_to_usd[1] * usd_pyg_rate
+    quote = entry.value
+    usd_pyg_rate = quote.usd_rate_pyg
+    converted_amount = (amount_btc * quote.price_usd) * usd_pyg_rate
+    converted_usd_to_pyg = quote.price_usd * usd_pyg_rate
+    converted_high_24h = quote.high_24h_usd * usd_pyg_rate
+    converted_low_24h = quote.low_24h_usd * usd_pyg_rate
     
     return BitcoinConversionResponse(
         source_currency="BTC",
         target_currency=TARGET_CURRENCY,
         amount=amount_btc,
         converted_amount=round(converted_amount, 2),
-        btc_rate_usd=round(btc_usd_rate, 2),
+        btc_rate_usd=round(quote.price_usd, 2),
         btc_rate_pyg=round(converted_usd_to_pyg, 2),
         usd_rate_pyg=round(usd_pyg_rate, 2),
         btc_high_24h=round(converted_high_24h, 2),
         btc_low_24h=round(converted_low_24h, 2),
-        btc_change_24h=round(low_high_btc_to_usd[2], 2),
-        timestamp=datetime.now()
+        btc_change_24h=round(quote.change_24h_pct, 2),
+        timestamp=quote.timestamp,
+        stale=not entry.is_fresh(),
     )
 
 
-class BitcoinHistoryPoint(BaseModel):
-    date: str
-    price_usd: float
-    
-async def get_bitcoin_history_data(days: int = 7) -> list[BitcoinHistoryPoint]:
-    """
-    Simula la obtención de datos históricos de Bitcoin.
-    """
-    history = []
-    current_price = 65000.00 
-    
-    # Recorrer los días de forma descendente
-    for i in range(days, 0, -1):
-        date_obj = datetime.now() - timedelta(days=i)
-        
-        # Simular una variación aleatoria del precio
-        variance = 1 + (random.uniform(-0.02, 0.02) * i/days)
-        price = current_price * variance
-        
-        history.append(BitcoinHistoryPoint(
-            # ✅ ESTA ES LA LÍNEA CRÍTICA: La fecha debe ser una cadena.
-            date=date_obj.strftime("%Y-%m-%d"), 
-            price_usd=round(price, 2)
-        ))
-        
-    return history
+# --- Stream en vivo del precio ---
+
+async def get_btc_ticker() -> Optional[BitcoinTicker]:
+    """Arma el mensaje del ticker a partir de la cotización en caché."""
+    quote = await get_btc_quote()
+    if quote is None:
+        return None
+
+    return BitcoinTicker(
+        btc_rate_usd=round(quote.price_usd, 2),
+        btc_rate_pyg=round(quote.price_usd * quote.usd_rate_pyg, 2),
+        usd_rate_pyg=round(quote.usd_rate_pyg, 2),
+        btc_change_24h=round(quote.change_24h_pct, 2),
+        timestamp=quote.timestamp,
+    )
+
+
+# Un único sondeo (sobre la cotización en caché) compartido por todos los clientes del stream
+ticker_broadcaster = Broadcaster("bitcoin:ticker", get_btc_ticker, settings.BITCOIN_STREAM_POLL_SECONDS)
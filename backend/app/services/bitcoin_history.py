@@ -0,0 +1,409 @@
+import httpx
+import math
+import time
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from typing import Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core import database
+from app.core import rate_budget, timeseries
+from app.core.http_client import get_http_client, COINGECKO
+from app.core.cache import CacheEntry, get_cache
+from app.core.singleflight import SingleFlight
+from app.models.schemas import BitcoinHistoryPoint, BitcoinOHLCPoint
+from app.services.bitcoin import BASE_CURRENCY, headers
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import CollectionInvalid
+
+# Colección time-series de MongoDB con el precio de BTC en USD.
+# `resolution` distingue la serie diaria (precio de cierre) de la horaria.
+COLLECTION_NAME = "btc_price_history"
+DAILY = "1d"
+HOURLY = "1h"
+
+# Ancho de cada punto de la serie guardada y parámetro `interval` de CoinGecko
+# (sin `interval`, CoinGecko devuelve puntos horarios para rangos de 2 a 90 días)
+SERIES_STEP = {DAILY: timedelta(days=1), HOURLY: timedelta(hours=1)}
+SERIES_INTERVAL = {DAILY: "daily", HOURLY: None}
+
+# Resoluciones de velas OHLC aceptadas por /bitcoin/history: (ancho en segundos, origen)
+OHLC_RESOLUTIONS = {
+    "hour": (timeseries.HOUR, 0),
+    "day": (timeseries.DAY, 0),
+    "week": (timeseries.WEEK, timeseries.WEEK_ORIGIN),
+}
+
+CACHE_NAMESPACE = "bitcoin_history"
+
+# Punto de la serie: (inicio del intervalo en UTC, precio en USD)
+PricePoint = Tuple[datetime, float]
+# Serie en memoria: (epoch en segundos, precio en USD) como arrays de NumPy
+Series = Tuple[np.ndarray, np.ndarray]
+
+# Backfills y cargas de series en curso
+_inflight_backfills = SingleFlight()
+
+
+# --- Funciones de MongoDB ---
+async def ensure_history_collection(db: AsyncIOMotorDatabase):
+    """Crea la colección time-series del historial si todavía no existe."""
+    try:
+        await db.create_collection(
+            COLLECTION_NAME,
+            timeseries={"timeField": "ts", "metaField": "resolution", "granularity": "hours"},
+        )
+        print(f"✅ Colección time-series '{COLLECTION_NAME}' creada.")
+    except CollectionInvalid:
+        pass  # Ya existe
+
+
+async def get_latest_stored(db: AsyncIOMotorDatabase, resolution: str = DAILY) -> Optional[datetime]:
+    doc = await db[COLLECTION_NAME].find_one(
+        {"resolution": resolution},
+        {"_id": 0, "ts": 1},
+        sort=[("ts", -1)],
+    )
+    return _as_utc(doc["ts"]) if doc else None
+
+
+async def query_history_range(
+    db: AsyncIOMotorDatabase, start: datetime, end: datetime, resolution: str = DAILY
+) -> List[PricePoint]:
+    """Consulta por rango [start, end) sobre una serie guardada."""
+    cursor = db[COLLECTION_NAME].find(
+        {"resolution": resolution, "ts": {"$gte": start, "$lt": end}},
+        {"_id": 0, "ts": 1, "price_usd": 1},
+        sort=[("ts", 1)],
+    )
+    return [(_as_utc(doc["ts"]), doc["price_usd"]) async for doc in cursor]
+
+
+# --- CoinGecko ---
+async def fetch_prices(
+    days: int, resolution: str = DAILY, client: Optional[httpx.AsyncClient] = None
+) -> Optional[List[PricePoint]]:
+    """
+    Descarga el precio de BTC de los últimos `days` días desde
+    `/coins/bitcoin/market_chart`, un punto por día u hora según `resolution`.
+    Solo devuelve intervalos completos (anteriores al actual).
+    """
+
+    params = {
+        "vs_currency": BASE_CURRENCY.lower(),
+        # Con days=1 CoinGecko devuelve puntos cada 5 minutos
+        "days": days if resolution == DAILY else max(days, 2),
+    }
+    if SERIES_INTERVAL[resolution]:
+        params["interval"] = SERIES_INTERVAL[resolution]
+
+    if not rate_budget.try_acquire(COINGECKO):
+        print("Presupuesto de llamadas a CoinGecko agotado: no se descarga el historial.")
+        return None
+
+    client = get_http_client(COINGECKO, client)
+    try:
+        response = await client.get(settings.COINGECKO_BASE_URL+"/coins/bitcoin/market_chart", params=params, headers=headers)
+        response.raise_for_status()
+        prices = response.json()["prices"]
+    except httpx.HTTPError as e:
+        print(f"Error al obtener el historial de precios de BTC: {e}")
+        return None
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Error de formato inesperado en el historial de CoinGecko: {e}")
+        return None
+
+    current = _current_step(resolution)
+    by_step = {}
+    for timestamp_ms, price in prices:
+        step = _floor_step(datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc), resolution)
+        if step < current:
+            # Se queda con el último precio de cada intervalo (el cierre)
+            by_step[step] = float(price)
+
+    return sorted(by_step.items())
+
+
+# --- Backfill incremental ---
+async def backfill_history(db: Optional[AsyncIOMotorDatabase] = None, resolution: str = DAILY) -> Optional[int]:
+    """
+    Completa la serie guardada hasta el último intervalo cerrado, descargando
+    solo lo que falta. La primera vez descarga BITCOIN_HISTORY_BACKFILL_DAYS
+    días de la serie diaria o BITCOIN_HISTORY_HOURLY_DAYS de la horaria.
+    Devuelve la cantidad de puntos agregados, o `None` si falló.
+    """
+    db = _resolve_database(db)
+    if db is None:
+        return None
+
+    latest = await get_latest_stored(db, resolution)
+    current = _current_step(resolution)
+    if latest is not None and latest >= current - SERIES_STEP[resolution]:
+        return 0
+
+    days = _retention_days(resolution) if latest is None else math.ceil((current - latest) / timedelta(days=1))
+    points = await fetch_prices(days, resolution)
+    if points is None:
+        return None
+
+    new_points = [(ts, price) for ts, price in points if latest is None or ts > latest]
+    if new_points:
+        await db[COLLECTION_NAME].insert_many(
+            [{"ts": ts, "resolution": resolution, "price_usd": price} for ts, price in new_points],
+            ordered=False,
+        )
+        # Las series, rollups y rangos en caché ya no están completos
+        get_cache(CACHE_NAMESPACE).clear()
+        print(f"✅ Historial de BTC ({resolution}): {len(new_points)} puntos nuevos guardados.")
+
+    return len(new_points)
+
+
+async def refresh_history(resolution: str = DAILY) -> Optional[float]:
+    """
+    Trabajo del planificador: completa la serie una vez por intervalo.
+    Devuelve el momento del próximo backfill (poco después del cierre del intervalo actual).
+    """
+    added = await _inflight_backfills.do(resolution, lambda: backfill_history(resolution=resolution))
+    if added is None:
+        return None
+    next_step = _current_step(resolution) + SERIES_STEP[resolution]
+    return next_step.timestamp() + settings.CACHE_REFRESH_LEAD_SECONDS
+
+
+# --- Series en memoria ---
+async def get_series(resolution: str = DAILY, db: Optional[AsyncIOMotorDatabase] = None) -> Optional[CacheEntry]:
+    """
+    Devuelve la entrada de caché con la serie completa de `resolution` como
+    arrays de NumPy. Se carga con una sola consulta a MongoDB (o a CoinGecko
+    si no hay base de datos) y vive hasta el cierre del intervalo actual.
+    """
+    entry = get_cache(CACHE_NAMESPACE).get_entry(("series", resolution))
+    if entry is not None:
+        return entry
+    return await _inflight_backfills.do(("series", resolution), lambda: _load_series(resolution, db))
+
+
+async def _load_series(resolution: str, db: Optional[AsyncIOMotorDatabase]) -> Optional[CacheEntry]:
+    current = _current_step(resolution)
+    start = current - timedelta(days=_max_days(resolution))
+    db = _resolve_database(db)
+
+    points = None
+    if db is not None:
+        try:
+            points = await query_history_range(db, start, current, resolution)
+            if not _is_complete(points, resolution):
+                await _inflight_backfills.do(resolution, lambda: backfill_history(db, resolution))
+                points = await query_history_range(db, start, current, resolution)
+        except Exception as e:
+            print(f"❌ Error al consultar el historial de BTC en MongoDB: {e}")
+            points = None
+
+    if points is None:
+        # Sin MongoDB no hay serie guardada: consulta directa a CoinGecko
+        points = await fetch_prices(_retention_days(resolution), resolution)
+        if points is None:
+            return None
+
+    series = (
+        np.fromiter((ts.timestamp() for ts, _ in points), dtype=np.int64, count=len(points)),
+        np.fromiter((price for _, price in points), dtype=np.float64, count=len(points)),
+    )
+
+    # Una serie completa solo cambia al cerrar el intervalo actual; una
+    # incompleta (falló el backfill) se vuelve a intentar pronto.
+    if _is_complete(points, resolution):
+        ttl = (current + SERIES_STEP[resolution]).timestamp() - time.time()
+    else:
+        ttl = settings.CACHE_REFRESH_RETRY_SECONDS
+
+    memory_cache = get_cache(CACHE_NAMESPACE)
+    memory_cache.set(("series", resolution), series, ttl=ttl)
+    return memory_cache.peek(("series", resolution))
+
+
+# --- Rollups OHLC precalculados ---
+async def get_rollup(resolution: str, db: Optional[AsyncIOMotorDatabase] = None) -> Optional[CacheEntry]:
+    """
+    Devuelve las velas OHLC de toda la serie para `resolution` ("hour", "day"
+    o "week"). Se calculan una vez por serie cargada y se guardan en la caché
+    hasta que vence la serie de la que salen; cada consulta solo recorta el rango.
+    """
+    memory_cache = get_cache(CACHE_NAMESPACE)
+    entry = memory_cache.get_entry(("rollup", resolution))
+    if entry is not None:
+        return entry
+
+    hourly = await get_series(HOURLY, db)
+    if resolution == "hour":
+        if hourly is None:
+            return None
+        sources = [hourly]
+        rollup = timeseries.ohlc_buckets(*hourly.value, timeseries.HOUR)
+    else:
+        daily = await get_series(DAILY, db)
+        if daily is None:
+            return None
+        sources = [daily]
+        rollup = timeseries.as_ohlc(*daily.value)
+        if hourly is not None and len(hourly.value[0]):
+            # Los días cubiertos por la serie horaria tienen máximo y mínimo reales;
+            # los anteriores solo tienen el precio de cierre.
+            sources.append(hourly)
+            first_day = -(-hourly.value[0][0] // timeseries.DAY) * timeseries.DAY
+            intraday = timeseries.ohlc_buckets(*hourly.value, timeseries.DAY)
+            rollup = timeseries.concat_ohlc(
+                timeseries.slice_range(rollup, 0, first_day),
+                timeseries.slice_range(intraday, first_day, np.inf),
+            )
+        width, origin = OHLC_RESOLUTIONS[resolution]
+        rollup = timeseries.resample_ohlc(rollup, width, origin)
+
+    stored_at = max(source.stored_at for source in sources)
+    expires_at = min(source.expires_at for source in sources)
+    memory_cache.set(("rollup", resolution), rollup, ttl=expires_at - stored_at, stored_at=stored_at)
+    return memory_cache.peek(("rollup", resolution))
+
+
+# --- Consulta del historial (camino caliente) ---
+async def get_bitcoin_history_data(
+    days: int = 7,
+    db: Optional[AsyncIOMotorDatabase] = None,
+    max_points: Optional[int] = None,
+) -> Optional[List[BitcoinHistoryPoint]]:
+    """
+    Devuelve el precio diario de BTC en USD de los últimos `days` días completos.
+    Con `max_points`, la serie se reduce con LTTB conservando su forma.
+    """
+    memory_cache = get_cache(CACHE_NAMESPACE)
+    key = history_cache_key(days, None, max_points)
+    history = memory_cache.get(key)
+    if history is not None:
+        return history
+
+    series = await get_series(DAILY, db)
+    if series is None:
+        return None
+
+    today = _today_utc()
+    ts, price = series.value
+    lo, hi = np.searchsorted(ts, [(today - timedelta(days=days)).timestamp(), today.timestamp()])
+    ts, price = ts[lo:hi], price[lo:hi]
+    if max_points is not None:
+        selected = timeseries.lttb(ts, price, max_points)
+        ts, price = ts[selected], price[selected]
+
+    history = [
+        BitcoinHistoryPoint(date=_from_epoch(t).strftime("%Y-%m-%d"), price_usd=round(p, 2))
+        for t, p in zip(ts.tolist(), price.tolist())
+    ]
+    _cache_derived(key, history, series)
+    return history
+
+
+async def get_bitcoin_ohlc(
+    days: int,
+    resolution: str,
+    db: Optional[AsyncIOMotorDatabase] = None,
+    max_points: Optional[int] = None,
+) -> Optional[List[BitcoinOHLCPoint]]:
+    """
+    Devuelve velas OHLC de BTC en USD de los últimos `days` días agrupadas por
+    `resolution`. Con `max_points`, se unen velas consecutivas hasta no superarlo.
+    """
+    memory_cache = get_cache(CACHE_NAMESPACE)
+    key = history_cache_key(days, resolution, max_points)
+    candles = memory_cache.get(key)
+    if candles is not None:
+        return candles
+
+    rollup = await get_rollup(resolution, db)
+    if rollup is None:
+        return None
+
+    width, origin = OHLC_RESOLUTIONS[resolution]
+    end = _current_step(HOURLY if resolution == "hour" else DAILY).timestamp()
+    start = end - days * timeseries.DAY
+    # Incluye el bucket que contiene el inicio del rango (p. ej. la semana en curso)
+    start = (start - origin) // width * width + origin
+    ohlc = timeseries.slice_range(rollup.value, start, end)
+    if max_points is not None and len(ohlc["ts"]) > max_points:
+        ohlc = timeseries.merge_ohlc(ohlc, math.ceil(len(ohlc["ts"]) / max_points))
+
+    candles = [
+        BitcoinOHLCPoint(
+            timestamp=_from_epoch(t),
+            open=round(o, 2), high=round(h, 2), low=round(l, 2), close=round(c, 2),
+        )
+        for t, o, h, l, c in zip(*(ohlc[k].tolist() for k in timeseries.OHLC_KEYS))
+    ]
+    _cache_derived(key, candles, rollup)
+    return candles
+
+
+def history_cache_key(days: int, resolution: Optional[str] = None, max_points: Optional[int] = None) -> Hashable:
+    """Clave en la caché L1 de la respuesta de /bitcoin/history para estos parámetros."""
+    if resolution is None:
+        return ("points", days, max_points)
+    return ("ohlc", resolution, days, max_points)
+
+
+def _cache_derived(key: Hashable, value: object, source: CacheEntry):
+    """
+    Guarda un resultado calculado a partir de `source` hasta que `source` expire.
+    Hereda su `stored_at`: la versión del resultado es la de los datos de origen.
+    """
+    get_cache(CACHE_NAMESPACE).set(key, value, ttl=source.expires_at - source.stored_at, stored_at=source.stored_at)
+
+
+# --- Utilidades ---
+def _resolve_database(db: Optional[AsyncIOMotorDatabase]) -> Optional[AsyncIOMotorDatabase]:
+    if db is not None:
+        return db
+    try:
+        return database.get_database()
+    except Exception:
+        return None
+
+
+def _as_utc(value: datetime) -> datetime:
+    # MongoDB devuelve fechas "naive" en UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _day_utc(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _today_utc() -> datetime:
+    return _day_utc(datetime.now(timezone.utc))
+
+
+def _floor_step(value: datetime, resolution: str) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    return _day_utc(value) if resolution == DAILY else value
+
+
+def _current_step(resolution: str) -> datetime:
+    """Inicio del intervalo en curso (todavía incompleto) de la serie."""
+    return _floor_step(datetime.now(timezone.utc), resolution)
+
+
+def _from_epoch(value: float) -> datetime:
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def _retention_days(resolution: str) -> int:
+    """Días que se descargan la primera vez para la serie."""
+    return settings.BITCOIN_HISTORY_BACKFILL_DAYS if resolution == DAILY else settings.BITCOIN_HISTORY_HOURLY_DAYS
+
+
+def _max_days(resolution: str) -> int:
+    """Días de la serie que se cargan en memoria."""
+    return settings.BITCOIN_HISTORY_MAX_DAYS if resolution == DAILY else settings.BITCOIN_HISTORY_HOURLY_DAYS
+
+
+def _is_complete(points: List[PricePoint], resolution: str) -> bool:
+    """Indica si la serie llega hasta el último intervalo cerrado."""
+    return bool(points) and points[-1][0] >= _current_step(resolution) - SERIES_STEP[resolution]
@@ -1,38 +1,159 @@
 import httpx
+import time
+import numpy as np
+import orjson
 from datetime import datetime
 from app.core.config import settings
-from app.models.schemas import CurrencyConversionResponse
-from typing import Optional
+from app.core.http_client import get_http_client, EXCHANGE_RATE
+from app.core import rate_budget
+from app.core import snapshot
+from app.core.cache import CacheEntry, get_cache, get_or_load_entry, refresh_entry
+from app.core.cache_backend import get_backend
+from app.core.singleflight import SingleFlight
+from app.models.schemas import CurrencyConversionResponse, CurrencyBatchConversionResponse
+from typing import Dict, Iterator, Optional, Sequence, Tuple
 
-BASE_URL = "https://v6.exchangerate-api.com/v6"
 TARGET_CURRENCY = "PYG"
+CACHE_NAMESPACE = "currency"
+snapshot.register(CACHE_NAMESPACE)
 
-async def get_conversion_rate(from_currency: str) -> Optional[float]:
-    
-    url = f"{BASE_URL}/{settings.EXCHANGE_RATE_API_KEY}/latest/{from_currency.upper()}"
+# Se descarga una sola tabla con base en RATES_BASE_CURRENCY y el resto de
+# tasas X→PYG se calculan localmente por triangulación.
+RATES_BASE_CURRENCY = settings.CURRENCY_RATES_BASE
+
+# Líneas NDJSON por bloque en las respuestas por lotes en streaming
+BATCH_STREAM_CHUNK_SIZE = 1000
+
+# Descargas de la tabla de tasas en curso
+_inflight_tables = SingleFlight()
+
+
+async def get_rate_table(client: Optional[httpx.AsyncClient] = None) -> Optional[Dict[str, float]]:
+    """
+    Devuelve la tabla `conversion_rates` (1 RATES_BASE_CURRENCY = N unidades de cada moneda).
+    Se sirve desde la caché en memoria y se refresca con una sola llamada externa.
+    """
+    entry = await get_rate_table_entry(client)
+    return entry.value if entry is not None else None
+
+
+async def get_rate_table_entry(client: Optional[httpx.AsyncClient] = None) -> Optional[CacheEntry]:
+    """
+    Como `get_rate_table`, pero devuelve la entrada de la caché. Si la API
+    externa no responde, es la última tabla conocida (vencida).
+    """
+    return await get_or_load_entry(
+        get_cache(CACHE_NAMESPACE),
+        RATES_BASE_CURRENCY,
+        lambda: _load_rate_table(client),
+        _inflight_tables,
+    )
 
-    async with httpx.AsyncClient() as client:
+
+async def refresh_rate_table() -> Optional[float]:
+    """Refresca la tabla de tasas antes de que expire (lo usa el planificador)."""
+    return await refresh_entry(
+        get_cache(CACHE_NAMESPACE),
+        RATES_BASE_CURRENCY,
+        lambda: _load_rate_table(use_backend_cache=False),
+        _inflight_tables,
+    )
+
+
+async def _load_rate_table(client: Optional[httpx.AsyncClient] = None, use_backend_cache: bool = True) -> Optional[Dict[str, float]]:
+    """Carga la tabla desde la caché L2 o la API externa y rellena las cachés."""
+    memory_cache = get_cache(CACHE_NAMESPACE)
+    backend = get_backend()
+
+    if use_backend_cache:
         try:
-            response = await client.get(url, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            cached = await backend.get(CACHE_NAMESPACE, RATES_BASE_CURRENCY)
+            if cached is not None:
+                memory_cache.set(RATES_BASE_CURRENCY, cached.value, cached.expires_at - cached.stored_at, stored_at=cached.stored_at)
+                return cached.value
+        except Exception as e:
+            print(f"Error al leer la caché de tasas: {e}")
+
+    table = await fetch_rate_table(client)
+    if table is not None:
+        # Mismo TTL que le dio `fetch_rate_table` en memoria
+        entry = memory_cache.peek(RATES_BASE_CURRENCY)
+        try:
+            await backend.set(CACHE_NAMESPACE, RATES_BASE_CURRENCY, table, entry.expires_at - entry.stored_at, stored_at=entry.stored_at)
+        except Exception as e:
+            print(f"Error al guardar la caché de tasas: {e}")
+    return table
+
+
+async def fetch_rate_table(client: Optional[httpx.AsyncClient] = None) -> Optional[Dict[str, float]]:
+
+    url = f"{settings.EXCHANGE_RATE_BASE_URL}/{settings.EXCHANGE_RATE_API_KEY}/latest/{RATES_BASE_CURRENCY}"
+
+    if not rate_budget.try_acquire(EXCHANGE_RATE):
+        print("Presupuesto de llamadas a exchangerate-api agotado: se usa la tabla en caché.")
+        return None
+
+    client = get_http_client(EXCHANGE_RATE, client)
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
+        
+        data = response.json()
+        
+        if data.get("result") == "success":
+            table = data["conversion_rates"]
+            get_cache(CACHE_NAMESPACE).set(RATES_BASE_CURRENCY, table, _table_ttl(data))
+            return table
+        
+        print(f"Error de la API al obtener la tabla de tasas: {data.get('error-type')}")
+        return None
+
+    except httpx.HTTPStatusError as e:
+        print(f"Error HTTP al obtener la tasa de cambio: {e}")
+        return None
             
-            if data.get("result") == "success":
-                rate = data["conversion_rates"].get(TARGET_CURRENCY)
-                return rate
+    except httpx.RequestError as e:
+        print(f"Error de red al obtener la tasa de cambio: {e}")
+        return None
+
 
-        except httpx.HTTPStatusError as e:
-            print(f"Error HTTP al obtener la tasa de cambio: {e}")
-            return None
-                
-        except httpx.RequestError as e:
-            print(f"Error de red al obtener la tasa de cambio: {e}")
-            return None
+def _table_ttl(data: dict) -> float:
+    # No tiene sentido guardar la tabla más allá de su próxima actualización en la API
+    ttl = settings.CURRENCY_CACHE_TTL_SECONDS
+    next_update = data.get("time_next_update_unix")
+    if next_update:
+        ttl = min(ttl, max(next_update - time.time(), 60))
+    return ttl
+
+
+def cross_rate(table: Dict[str, float], from_currency: str, to_currency: str = TARGET_CURRENCY) -> Optional[float]:
+    """
+    Calcula la tasa from→to a partir de una tabla con base RATES_BASE_CURRENCY:
+    (BASE→to) / (BASE→from).
+    """
+    base_to_target = 1.0 if to_currency == RATES_BASE_CURRENCY else table.get(to_currency)
+    base_to_source = 1.0 if from_currency == RATES_BASE_CURRENCY else table.get(from_currency)
+
+    if not base_to_target or not base_to_source:
+        return None
+    return base_to_target / base_to_source
+
+
+async def get_conversion_rate(from_currency: str, client: Optional[httpx.AsyncClient] = None) -> Optional[float]:
+    
+    table = await get_rate_table(client)
+    if table is None:
+        return None
+
+    return cross_rate(table, from_currency.upper())
 
 
 async def convert_currency(amount: float, from_currency: str) -> Optional[CurrencyConversionResponse]:
-    rate = await get_conversion_rate(from_currency)
+    table = await get_rate_table_entry()
+    if table is None:
+        return None
+
+    rate = cross_rate(table.value, from_currency.upper())
     if rate is None:
         return None
 
@@ -44,5 +165,92 @@ async def convert_currency(amount: float, from_currency: str) -> Optional[Curren
             amount=amount,
             converted_amount=round(converted_amount, 2),
             rate=rate,
-            timestamp=datetime.now()
-        )
\ No newline at end of file
+            timestamp=datetime.now(),
+            stale=not table.is_fresh(),
+        )
+
+# --- Conversión por lotes ---
+
+async def compute_batch_conversion(
+    from_currencies: Sequence[str],
+    amounts: Sequence[float],
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Convierte un lote completo con una sola tabla de tasas.
+    Agrupa por moneda (cada tasa se resuelve una sola vez) y calcula todos los
+    montos en una sola operación vectorizada.
+
+    Devuelve (códigos, tasas, montos convertidos); las monedas desconocidas
+    quedan con NaN. `None` si no se pudo obtener la tabla de tasas.
+    """
+    table = await get_rate_table()
+    if table is None:
+        return None
+
+    codes = np.char.upper(np.asarray(from_currencies, dtype="U3"))
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+
+    unique_rates = np.array(
+        [cross_rate(table, str(code)) or np.nan for code in unique_codes],
+        dtype=np.float64,
+    )
+    rates = unique_rates[inverse]
+    converted = np.round(np.asarray(amounts, dtype=np.float64) * rates, 2)
+
+    return codes, rates, converted
+
+
+def _batch_rows(codes: np.ndarray, amounts: Sequence[float], rates: np.ndarray, converted: np.ndarray) -> Iterator[dict]:
+    # NaN (moneda desconocida) se devuelve como null
+    for code, amount, rate, value in zip(codes.tolist(), amounts, rates.tolist(), converted.tolist()):
+        valid = rate == rate
+        yield {
+            "source_currency": code,
+            "amount": amount,
+            "converted_amount": value if valid else None,
+            "rate": rate if valid else None,
+        }
+
+
+async def convert_currency_batch(
+    from_currencies: Sequence[str],
+    amounts: Sequence[float],
+) -> Optional[CurrencyBatchConversionResponse]:
+    batch = await compute_batch_conversion(from_currencies, amounts)
+    if batch is None:
+        return None
+
+    codes, rates, converted = batch
+    return CurrencyBatchConversionResponse(
+        target_currency=TARGET_CURRENCY,
+        count=len(codes),
+        results=list(_batch_rows(codes, amounts, rates, converted)),
+        timestamp=datetime.now(),
+    )
+
+
+async def stream_currency_batch(
+    from_currencies: Sequence[str],
+    amounts: Sequence[float],
+) -> Optional[Iterator[bytes]]:
+    """
+    Igual que `convert_currency_batch`, pero devuelve las conversiones como
+    NDJSON (una línea JSON por conversión), en bloques de BATCH_STREAM_CHUNK_SIZE líneas.
+    """
+    batch = await compute_batch_conversion(from_currencies, amounts)
+    if batch is None:
+        return None
+
+    codes, rates, converted = batch
+
+    def generate() -> Iterator[bytes]:
+        lines = []
+        for row in _batch_rows(codes, amounts, rates, converted):
+            lines.append(orjson.dumps(row) + b"\n")
+            if len(lines) >= BATCH_STREAM_CHUNK_SIZE:
+                yield b"".join(lines)
+                lines = []
+        if lines:
+            yield b"".join(lines)
+
+    return generate()
@@ -0,0 +1,48 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.core.spatial import GridIndex
+
+# Capitales de los 17 departamentos, Asunción y ciudades principales
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "paraguay_gazetteer.json")
+
+
+@dataclass(frozen=True)
+class Place:
+    """Lugar del gazetteer: cada uno es una estación con su clima en caché."""
+    key: str
+    name: str
+    department: str
+    kind: str
+    lat: float
+    lon: float
+
+    @property
+    def coords(self) -> dict:
+        # Mismo formato que `weather.DEPARTMENTS`
+        return {"lat": self.lat, "lon": self.lon, "name": self.name}
+
+
+places: Dict[str, Place] = {}
+_index: Optional[GridIndex[Place]] = None
+
+
+def load_gazetteer(path: str = GAZETTEER_PATH) -> int:
+    """Lee el gazetteer y arma el índice espacial. Devuelve la cantidad de lugares."""
+    global _index
+    with open(path, encoding="utf-8") as f:
+        loaded = [Place(**place) for place in json.load(f)]
+
+    places.clear()
+    places.update((place.key, place) for place in loaded)
+    _index = GridIndex((place.lat, place.lon, place) for place in loaded)
+    return len(places)
+
+
+def nearest_place(lat: float, lon: float, max_km: Optional[float] = None) -> Optional[Tuple[Place, float]]:
+    """Lugar más cercano a las coordenadas y su distancia en km; None si está a más de `max_km`."""
+    if _index is None:
+        load_gazetteer()
+    return _index.nearest(lat, lon, max_km)
@@ -1,11 +1,18 @@
+import asyncio
 import httpx
-from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import partial
+from typing import Dict, List, Optional
 from fastapi import HTTPException
 
 from app.core.config import settings
-from app.core.database import database
+from app.core.http_client import get_http_client, OPENWEATHERMAP
+from app.core import rate_budget
+from app.core import snapshot
+from app.core.cache import CacheEntry, get_cache, get_or_load_entry, needs_refresh, revalidate
+from app.core.cache_backend import CacheBackend, MongoBackend, get_backend
+from app.core.singleflight import SingleFlight
 from app.models import schemas
+from app.services import gazetteer
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 WEATHER_API_KEY = settings.OPENWEATHERMAP_API_KEY
@@ -17,91 +24,76 @@ DEPARTMENTS = {
     "ITAPUA": {"lat": -27.3333, "lon": -56.0000, "name": "Encarnación (Itapúa)"},
 }
 
-COLLECTION_NAME = "weather_cache"
-CACHE_TTL_HOURS = 1
+CACHE_NAMESPACE = "weather"
+snapshot.register(CACHE_NAMESPACE, schemas.WeatherResponse)
 
-# --- Funciones de MongoDB (Cache) ---
-async def get_cached_weather(department: str, db: AsyncIOMotorDatabase) -> Optional[schemas.WeatherResponse]:
+# Cargas (caché L2 + API externa) en curso, por departamento
+_inflight_loads = SingleFlight()
 
-    cache_doc = await db[COLLECTION_NAME].find_one({"department": department})
-    
-    if cache_doc:
-        last_updated = cache_doc.get("last_updated")
-
-        if last_updated.tzinfo is None or last_updated.tzinfo.utcoffset(last_updated) is None:
-            last_updated = last_updated.replace(tzinfo=timezone.utc)
+# --- Caché persistente (L2) ---
+def _cache_entry(entry: CacheEntry) -> CacheEntry:
+    # La validación corre una vez por carga desde L2 (no por petición): los
+    # aciertos de L1 ya devuelven el modelo armado
+    return CacheEntry(schemas.WeatherResponse.model_validate(entry.value), entry.stored_at, entry.expires_at)
 
-        expiration_time = last_updated + timedelta(hours=CACHE_TTL_HOURS)
 
-        if datetime.now(timezone.utc) < expiration_time:
-            print("✅ Usando datos de la caché para el departamento:", department)
-            return schemas.WeatherResponse(**cache_doc)
-        else:
-            print("❌ Datos de la caché para el departamento:", department, "han expirado.")
-            return None    
-    
+async def get_cached_weather(department_key: str, backend: CacheBackend) -> Optional[CacheEntry]:
+    entry = await backend.get(CACHE_NAMESPACE, department_key)
+    if entry is not None:
+        print("✅ Usando datos de la caché para el departamento:", department_key)
+        return _cache_entry(entry)
     return None
 
-async def update_weather_cache(weather_data: schemas.WeatherResponse, db: AsyncIOMotorDatabase):
 
+async def get_cached_weather_many(department_keys: List[str], backend: CacheBackend) -> Dict[str, CacheEntry]:
+    """Versión por lotes de `get_cached_weather`: una sola consulta al backend."""
+    entries = await backend.get_many(CACHE_NAMESPACE, department_keys)
+    return {key: _cache_entry(entry) for key, entry in entries.items()}
 
-    department = weather_data.department
 
-    filter_query = {"department": department}
+async def update_weather_cache(department_key: str, weather_data: schemas.WeatherResponse, backend: CacheBackend):
+    await backend.set(
+        CACHE_NAMESPACE,
+        department_key,
+        weather_data.model_dump(mode="json", exclude={"stale"}),
+        settings.WEATHER_CACHE_TTL_SECONDS,
+    )
+    print(f"✅ Datos de clima actualizados en la caché para el departamento: {weather_data.department}")
 
-    update_operation = {
-        "$set": {
-            **weather_data.model_dump(),
-            "last_updated": datetime.now(timezone.utc)
-        }
-    }
-    
-    
 
-    await db[COLLECTION_NAME].update_one(
-        filter_query,
-        update_operation,
-        upsert=True
+async def update_weather_cache_many(weathers: Dict[str, schemas.WeatherResponse], backend: CacheBackend):
+    """Versión por lotes de `update_weather_cache`: una sola escritura al backend."""
+    if not weathers:
+        return
+    await backend.set_many(
+        CACHE_NAMESPACE,
+        {key: weather.model_dump(mode="json", exclude={"stale"}) for key, weather in weathers.items()},
+        settings.WEATHER_CACHE_TTL_SECONDS,
     )
-    print(f"✅ Datos de clima actualizados en la caché para el departamento: {weather_data.department}")
+    print(f"✅ Datos de clima actualizados en la caché para: {', '.join(weathers)}")
 
 
-async def fetch_weather_from_api(department: str, lat: float, lon: float) -> Optional[schemas.WeatherResponse]:
+def _flag_stale(entry: CacheEntry) -> schemas.WeatherResponse:
+    """Devuelve el dato de la entrada, marcado con `stale=True` si ya venció."""
+    if entry.is_fresh():
+        return entry.value
+    return entry.value.model_copy(update={"stale": True})
 
-    params = {
-        "lat": lat,
-        "lon": lon,
-        "appid": WEATHER_API_KEY,
-        "units": "metric",
-        "lang": "es",
-    }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get("https://api.openweathermap.org/data/2.5/weather", params=params, timeout=10)
-            response.raise_for_status()
-            
-
-            data = response.json()
-
-            weater_response = schemas.WeatherResponse(
-                department=department,
-                temp_celsius=data["main"]["temp"],
-                description=data["weather"][0]["description"],
-                humidity=data["main"]["humidity"],
-                wind_speed_kmh=data["wind"]["speed"] * 3.6,
-                timestamp=datetime.now(),
-            )
+def _resolve_backend(db: Optional[AsyncIOMotorDatabase]) -> CacheBackend:
+    # Una base de MongoDB explícita tiene prioridad sobre el backend configurado
+    return MongoBackend(db) if db is not None else get_backend()
 
-            return weater_response
-        
-        except (httpx.HTTPStatusError, httpx.RequestError) as e:
-            print(f"❌ Error al consultar la API de clima: {e}")
-            return None
-        
-async def get_weather_data(department: str) -> Optional[schemas.WeatherResponse]:
+
+async def get_weather_data(
+    department: str,
+    db: Optional[AsyncIOMotorDatabase] = None,
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Optional[schemas.WeatherResponse]:
     """
-    Obtiene los datos del clima para un departamento específico usando la API externa.
+    Obtiene los datos del clima para un departamento específico.
+    Primero consulta la caché (L1 y luego L2) y, si no hay datos vigentes, la API externa.
     """
     
     # 1. Validar y obtener coordenadas
@@ -113,6 +105,230 @@ async def get_weather_data(department: str) -> Optional[schemas.WeatherResponse]
         )
         
     coords = DEPARTMENTS[department_key]
+
+    # 2. Caché en memoria (L1), sin I/O. Si el dato expiró se sirve igual y se
+    #    revalida en segundo plano; si no hay dato, una sola carga por departamento
+    #    (caché L2 + API externa) es compartida por las peticiones concurrentes.
+    #    Si la API externa falla, se sirve el último dato conocido marcado como `stale`.
+    entry = await get_or_load_entry(
+        get_cache(CACHE_NAMESPACE),
+        department_key,
+        lambda: _load_weather(department_key, coords, _resolve_backend(db), client),
+        _inflight_loads,
+    )
+    return _flag_stale(entry) if entry is not None else None
+
+
+async def get_nearest_weather(
+    lat: float,
+    lon: float,
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Optional[schemas.NearestWeatherResponse]:
+    """
+    Clima del lugar del gazetteer más cercano a unas coordenadas.
+    Cada lugar es una estación con su propia entrada en la caché: la API
+    externa se consulta por lugar y no por cada par de coordenadas.
+    """
+    nearest = gazetteer.nearest_place(lat, lon, settings.WEATHER_NEAREST_MAX_DISTANCE_KM)
+    if nearest is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No hay lugares soportados a menos de {settings.WEATHER_NEAREST_MAX_DISTANCE_KM:g} km de las coordenadas indicadas."
+        )
+    place, distance_km = nearest
+
+    # Los departamentos comparten la entrada de caché con /weather/{department}
+    coords = DEPARTMENTS.get(place.key, place.coords)
+    entry = await get_or_load_entry(
+        get_cache(CACHE_NAMESPACE),
+        place.key,
+        lambda: _load_weather(place.key, coords, get_backend(), client),
+        _inflight_loads,
+    )
+    if entry is None:
+        return None
+
+    return schemas.NearestWeatherResponse(
+        place=place.name,
+        department=place.department,
+        latitude=place.lat,
+        longitude=place.lon,
+        distance_km=round(distance_km, 1),
+        weather=_flag_stale(entry),
+    )
+
+
+async def get_weather_many(
+    departments: List[str],
+    db: Optional[AsyncIOMotorDatabase] = None,
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+) -> List[schemas.WeatherResponse]:
+    """
+    Obtiene el clima de varios departamentos en una sola llamada:
+    1. Caché en memoria (L1).
+    2. Una sola consulta a la caché L2 (CACHE_BACKEND) para lo que falte.
+    3. Consultas concurrentes a la API externa (máximo WEATHER_BATCH_CONCURRENCY a la vez),
+       guardadas en la caché L2 con una sola escritura por lotes.
+
+    Los departamentos que no se pudieron obtener se omiten del resultado.
+    """
+
+    # 1. Validar y normalizar (sin duplicados, respetando el orden pedido)
+    department_keys = list(dict.fromkeys(department.upper() for department in departments))
+    unsupported = [key for key in department_keys if key not in DEPARTMENTS]
+    if unsupported:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Departamentos no encontrados o no soportados: {', '.join(unsupported)}."
+        )
+
+    memory_cache = get_cache(CACHE_NAMESPACE)
+    results: Dict[str, schemas.WeatherResponse] = {}
+    backend = _resolve_backend(db)
+
+    # 2. Caché en memoria (L1); lo expirado se sirve y se revalida en segundo plano
+    for key in department_keys:
+        entry = memory_cache.get_entry(key, settings.CACHE_MAX_STALE_SECONDS)
+        if entry is None:
+            continue
+        if not entry.is_fresh():
+            revalidate(key, partial(_load_weather, key, DEPARTMENTS[key], backend, client), _inflight_loads)
+        results[key] = _flag_stale(entry)
+
+    # 3. Caché persistente (L2): una sola consulta para todos los faltantes
+    missing = [key for key in department_keys if key not in results]
+    if missing:
+        try:
+            cached = await get_cached_weather_many(missing, backend)
+            for key, entry in cached.items():
+                memory_cache.set(key, entry.value, entry.expires_at - entry.stored_at, stored_at=entry.stored_at)
+                results[key] = entry.value
+        except Exception as e:
+            print(f"❌ Error al leer la caché de clima: {e}")
+
+    # 4. API externa para el resto, con paralelismo acotado
+    missing = [key for key in department_keys if key not in results]
+    if missing:
+        fetched = await _fetch_many(missing, client)
+        for key in missing:
+            if key in fetched:
+                results[key] = fetched[key]
+                continue
+            # Último dato conocido, por viejo que sea
+            last_good = memory_cache.peek(key)
+            if last_good is not None:
+                results[key] = _flag_stale(last_good)
+
+        try:
+            await update_weather_cache_many(fetched, backend)
+        except Exception as e:
+            print(f"❌ Error al actualizar la caché de clima: {e}")
+
+    return [results[key] for key in department_keys if key in results]
+
+
+async def _fetch_many(department_keys: List[str], client: Optional[httpx.AsyncClient]) -> Dict[str, schemas.WeatherResponse]:
+    """
+    Consulta la API externa para varios departamentos (máximo
+    WEATHER_BATCH_CONCURRENCY a la vez) y actualiza la caché en memoria.
+    La caché L2 la escribe quien llama, en un solo lote.
+    """
+    semaphore = asyncio.Semaphore(settings.WEATHER_BATCH_CONCURRENCY)
+
+    async def load(key: str):
+        async with semaphore:
+            return await _inflight_loads.do(
+                key,
+                lambda: _load_weather(key, DEPARTMENTS[key], None, client, use_db_cache=False),
+            )
+
+    loaded = await asyncio.gather(*(load(key) for key in department_keys), return_exceptions=True)
+    fetched = {}
+    for key, weather in zip(department_keys, loaded):
+        if isinstance(weather, Exception):
+            print(f"❌ Error al obtener el clima de {key}: {weather!r}")
+            continue
+        fetched[key] = weather
+    return fetched
+
+
+async def refresh_weather() -> Optional[float]:
+    """
+    Refresca el clima de todos los departamentos antes de que expire (lo usa
+    el planificador): los que están por vencer se consultan en paralelo y se
+    guardan en la caché L2 con una sola escritura por lotes.
+    Devuelve el momento (epoch) en que expira el primero de los datos en caché,
+    o `None` si algún departamento no se pudo refrescar (para reintentar pronto).
+    """
+    backend = get_backend()
+    memory_cache = get_cache(CACHE_NAMESPACE)
+
+    # Al arrancar, reutilizar lo que haya en la caché L2 antes de ir a la API externa
+    empty = [key for key in DEPARTMENTS if memory_cache.peek(key) is None]
+    if empty:
+        try:
+            for key, entry in (await get_cached_weather_many(empty, backend)).items():
+                memory_cache.set(key, entry.value, entry.expires_at - entry.stored_at, stored_at=entry.stored_at)
+        except Exception as e:
+            print(f"❌ Error al leer la caché de clima: {e}")
+
+    due = [key for key in DEPARTMENTS if needs_refresh(memory_cache.peek(key))]
+    if due:
+        fetched = await _fetch_many(due, None)
+        await update_weather_cache_many(fetched, backend)
+        if len(fetched) < len(due):
+            # Los que fallaron se reintentan en CACHE_REFRESH_RETRY_SECONDS, no al vencer el resto
+            return None
+
+    entries = [memory_cache.peek(key) for key in DEPARTMENTS]
+    expirations = [entry.expires_at for entry in entries if entry is not None and entry.is_fresh()]
+    return min(expirations) if expirations else None
+
+
+async def _load_weather(
+    department_key: str,
+    coords: dict,
+    backend: Optional[CacheBackend],
+    client: Optional[httpx.AsyncClient],
+    use_db_cache: bool = True,
+) -> schemas.WeatherResponse:
+    """
+    Carga el clima desde la caché L2 o la API externa y rellena las cachés.
+    Sin `backend` solo se consulta la API externa y se llena la caché en memoria.
+    """
+    
+    memory_cache = get_cache(CACHE_NAMESPACE)
+
+    # a) Consultar la caché persistente (L2)
+    if use_db_cache and backend is not None:
+        try:
+            cached = await get_cached_weather(department_key, backend)
+            if cached is not None:
+                # La entrada L1 expira al mismo tiempo que la de L2
+                memory_cache.set(department_key, cached.value, cached.expires_at - cached.stored_at, stored_at=cached.stored_at)
+                return cached.value
+        except Exception as e:
+            print(f"❌ Error al leer la caché de clima: {e}")
+
+    # b) Consultar la API externa y guardar el resultado
+    weather = await fetch_department_weather(coords, client=client)
+    memory_cache.set(department_key, weather, settings.WEATHER_CACHE_TTL_SECONDS)
+
+    if backend is not None:
+        try:
+            await update_weather_cache(department_key, weather, backend)
+        except Exception as e:
+            print(f"❌ Error al actualizar la caché de clima: {e}")
+
+    return weather
+
+
+async def fetch_department_weather(coords: dict, *, client: Optional[httpx.AsyncClient] = None) -> schemas.WeatherResponse:
+    """
+    Consulta el clima actual de unas coordenadas en OpenWeatherMap.
+    """
     
     params = {
         "lat": coords["lat"],
@@ -122,48 +338,55 @@ async def get_weather_data(department: str) -> Optional[schemas.WeatherResponse]
         "lang": "es"       # Para obtener la descripción en español
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get("https://api.openweathermap.org/data/2.5/weather", params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # 2. Extracción y Formateo
-            temp = data["main"]["temp"]
-            humidity = data["main"]["humidity"]
-            description = data["weather"][0]["description"]
-            wind_speed = data["wind"]["speed"] # Velocidad en m/s
-            
-            # Conversión de m/s a km/h (multiplicar por 3.6)
-            wind_speed_kmh = wind_speed * 3.6
-            
-            # 3. Devolver el esquema de respuesta
-            return schemas.WeatherResponse(
-                department=coords["name"],
-                temp_celsius=round(temp, 1),
-                description=description,
-                humidity=humidity,
-                wind_speed_kmh=round(wind_speed_kmh, 1)
-            )
+    if not rate_budget.try_acquire(OPENWEATHERMAP):
+        # Se trata como un error del upstream: el servicio sirve el último dato conocido
+        raise HTTPException(
+            status_code=503,
+            detail="Se agotó el presupuesto de llamadas al servicio de clima."
+        )
 
-        except httpx.HTTPStatusError as e:
-            print(f"Error HTTP al obtener el clima: {e}")
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail="Error de la API externa de clima."
-            )
-        except httpx.RequestError as e:
-            print(f"Error de conexión al obtener el clima: {e}")
-            raise HTTPException(
-                status_code=503,
-                detail="No se pudo conectar con el servicio de clima."
-            )
-        except (KeyError, IndexError) as e:
-            print(f"Error de formato inesperado de la API: {e}")
-            raise HTTPException(
-                status_code=500,
-                detail="Error al procesar la respuesta del clima."
-            )
+    client = get_http_client(OPENWEATHERMAP, client)
+    try:
+        response = await client.get(f"{settings.OPENWEATHERMAP_BASE_URL}/data/2.5/weather", params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        # 2. Extracción y Formateo
+        temp = data["main"]["temp"]
+        humidity = data["main"]["humidity"]
+        description = data["weather"][0]["description"]
+        wind_speed = data["wind"]["speed"] # Velocidad en m/s
+        
+        # Conversión de m/s a km/h (multiplicar por 3.6)
+        wind_speed_kmh = wind_speed * 3.6
+        
+        # 3. Devolver el esquema de respuesta
+        return schemas.WeatherResponse(
+            department=coords["name"],
+            temp_celsius=round(temp, 1),
+            description=description,
+            humidity=humidity,
+            wind_speed_kmh=round(wind_speed_kmh, 1)
+        )
+
+    except httpx.HTTPStatusError as e:
+        print(f"Error HTTP al obtener el clima: {e}")
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail="Error de la API externa de clima."
+        )
+    except httpx.RequestError as e:
+        print(f"Error de conexión al obtener el clima: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="No se pudo conectar con el servicio de clima."
+        )
+    except (KeyError, IndexError) as e:
+        print(f"Error de formato inesperado de la API: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error al procesar la respuesta del clima."
+        )
     
 
-        
\ No newline at end of file
+    
\ No newline at end of file
@@ -0,0 +1,197 @@
+import httpx
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core import rate_budget
+from app.core import snapshot
+from app.core.http_client import get_http_client, OPENWEATHERMAP
+from app.core.cache import CacheEntry, get_cache, get_or_load_entry
+from app.core.cache_backend import CacheBackend, get_backend
+from app.core.singleflight import SingleFlight
+from app.models import schemas
+from app.services.weather import DEPARTMENTS, WEATHER_API_KEY
+
+# Pronóstico de 5 días en bloques de 3 horas (/data/2.5/forecast de OpenWeatherMap)
+FORECAST_STEP_SECONDS = 3 * 3600
+FORECAST_MAX_HOURS = 120
+FORECAST_MAX_DAYS = 5
+
+CACHE_NAMESPACE = "weather_forecast"
+snapshot.register(CACHE_NAMESPACE)
+
+# Un documento por departamento con arreglos paralelos (un elemento por bloque):
+# `ts` (inicio del bloque, epoch) y un arreglo por cada variable
+FORECAST_FIELDS = ("temp_celsius", "description", "humidity", "wind_speed_kmh", "pop")
+
+# Descargas del pronóstico en curso, por departamento
+_inflight_forecasts = SingleFlight()
+
+# Respuestas ya armadas, por departamento: (stored_at de la entrada, {(lo, hi, stale): respuesta}).
+# Mientras la entrada no cambia, los recortes repetidos no vuelven a validar los bloques.
+_responses: Dict[str, Tuple[float, Dict[tuple, schemas.WeatherForecastResponse]]] = {}
+
+
+def forecast_ttl(now: Optional[float] = None) -> float:
+    """
+    OpenWeatherMap emite un pronóstico nuevo cada WEATHER_FORECAST_ISSUE_SECONDS:
+    la entrada vence en el próximo corte (no antes de un minuto).
+    """
+    now = now if now is not None else time.time()
+    period = settings.WEATHER_FORECAST_ISSUE_SECONDS
+    return max(period - now % period, 60)
+
+
+async def fetch_forecast(coords: dict, *, client: Optional[httpx.AsyncClient] = None) -> Optional[Dict[str, Any]]:
+    """Descarga el pronóstico de unas coordenadas y lo arma como arreglos paralelos."""
+
+    params = {
+        "lat": coords["lat"],
+        "lon": coords["lon"],
+        "appid": WEATHER_API_KEY,
+        "units": "metric",
+        "lang": "es",
+    }
+
+    if not rate_budget.try_acquire(OPENWEATHERMAP):
+        print("Presupuesto de llamadas a OpenWeatherMap agotado: se usa el pronóstico en caché.")
+        return None
+
+    client = get_http_client(OPENWEATHERMAP, client)
+    try:
+        response = await client.get(f"{settings.OPENWEATHERMAP_BASE_URL}/data/2.5/forecast", params=params)
+        response.raise_for_status()
+        blocks = sorted(response.json()["list"], key=lambda block: block["dt"])
+
+        return {
+            "department": coords["name"],
+            "issued_at": time.time(),
+            "ts": [int(block["dt"]) for block in blocks],
+            "temp_celsius": [round(block["main"]["temp"], 1) for block in blocks],
+            "description": [block["weather"][0]["description"] for block in blocks],
+            "humidity": [int(block["main"]["humidity"]) for block in blocks],
+            "wind_speed_kmh": [round(block["wind"]["speed"] * 3.6, 1) for block in blocks],
+            "pop": [float(block.get("pop", 0.0)) for block in blocks],
+        }
+    except httpx.HTTPError as e:
+        print(f"❌ Error al consultar el pronóstico: {e}")
+        return None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        print(f"❌ Error de formato inesperado del pronóstico: {e}")
+        return None
+
+
+async def _load_forecast(
+    department_key: str,
+    backend: CacheBackend,
+    client: Optional[httpx.AsyncClient],
+) -> Optional[Dict[str, Any]]:
+    """Carga el pronóstico desde la caché L2 o la API externa y rellena las cachés."""
+
+    memory_cache = get_cache(CACHE_NAMESPACE)
+
+    try:
+        cached = await backend.get(CACHE_NAMESPACE, department_key)
+        if cached is not None:
+            memory_cache.set(department_key, cached.value, cached.expires_at - cached.stored_at, stored_at=cached.stored_at)
+            return cached.value
+    except Exception as e:
+        print(f"❌ Error al leer la caché del pronóstico: {e}")
+
+    forecast = await fetch_forecast(DEPARTMENTS[department_key], client=client)
+    if forecast is None:
+        return None
+
+    ttl = forecast_ttl()
+    memory_cache.set(department_key, forecast, ttl)
+    try:
+        await backend.set(CACHE_NAMESPACE, department_key, forecast, ttl)
+    except Exception as e:
+        print(f"❌ Error al actualizar la caché del pronóstico: {e}")
+    return forecast
+
+
+async def get_forecast_entry(department_key: str, *, client: Optional[httpx.AsyncClient] = None) -> Optional[CacheEntry]:
+    """
+    Pronóstico completo del departamento desde la caché: la API externa se
+    consulta a lo sumo una vez por departamento en cada ventana de emisión.
+    """
+    return await get_or_load_entry(
+        get_cache(CACHE_NAMESPACE),
+        department_key,
+        lambda: _load_forecast(department_key, get_backend(), client),
+        _inflight_forecasts,
+    )
+
+
+def slice_bounds(ts: list, start: float, end: Optional[float] = None) -> Tuple[int, int]:
+    """
+    Índices [lo, hi) de los bloques que se solapan con [start, end): se incluye
+    el bloque en curso (empezó hace menos de FORECAST_STEP_SECONDS).
+    """
+    lo = bisect_right(ts, start - FORECAST_STEP_SECONDS)
+    hi = bisect_left(ts, end) if end is not None else len(ts)
+    return lo, hi
+
+
+def slice_forecast(forecast: Dict[str, Any], start: float, end: Optional[float] = None) -> Dict[str, Any]:
+    """Bloques del pronóstico que se solapan con [start, end)."""
+    lo, hi = slice_bounds(forecast["ts"], start, end)
+    return {field: forecast[field][lo:hi] for field in ("ts", *FORECAST_FIELDS)}
+
+
+def _build_response(forecast: Dict[str, Any], lo: int, hi: int, stale: bool) -> schemas.WeatherForecastResponse:
+    points = [
+        schemas.WeatherForecastPoint(
+            timestamp=datetime.fromtimestamp(forecast["ts"][i], timezone.utc),
+            **{field: forecast[field][i] for field in FORECAST_FIELDS},
+        )
+        for i in range(lo, hi)
+    ]
+    return schemas.WeatherForecastResponse(
+        department=forecast["department"],
+        issued_at=datetime.fromtimestamp(forecast["issued_at"], timezone.utc),
+        points=points,
+        stale=stale,
+    )
+
+
+async def get_weather_forecast(
+    department: str,
+    hours: Optional[int] = None,
+    days: Optional[int] = None,
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+) -> Optional[schemas.WeatherForecastResponse]:
+    """
+    Pronóstico de un departamento desde ahora hasta `hours` horas o `days`
+    días (si se indican los dos se usa el menor; sin ninguno, todo el pronóstico).
+    El recorte se hace sobre la caché, sin volver a consultar la API externa.
+    """
+    department_key = department.upper()
+    if department_key not in DEPARTMENTS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Departamento '{department}' no encontrado o no soportado."
+        )
+
+    entry = await get_forecast_entry(department_key, client=client)
+    if entry is None:
+        return None
+
+    now = time.time()
+    horizons = [seconds for seconds in (hours and hours * 3600, days and days * 86400) if seconds]
+    lo, hi = slice_bounds(entry.value["ts"], now, now + min(horizons) if horizons else None)
+    window = (lo, hi, not entry.is_fresh())
+
+    stored_at, built = _responses.get(department_key, (None, {}))
+    if stored_at != entry.stored_at:
+        built = {}
+        _responses[department_key] = (entry.stored_at, built)
+    if window not in built:
+        built[window] = _build_response(entry.value, *window)
+    return built[window]
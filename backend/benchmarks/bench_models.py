@@ -0,0 +1,132 @@
+"""
+Costo de CPU por petición de armar y devolver respuestas con datos internos
+(ya validados): el camino de FastAPI con `response_model` (dump → validación
+→ serialización) contra devolver `FastJSONResponse` directamente, y el
+pronóstico armado en cada petición contra el memo por entrada de caché.
+
+También compara la construcción validada (`Model(**datos)`) contra
+`Model.model_construct(**datos)`: con pydantic 2 la validación corre en
+pydantic-core y sale más barata que `model_construct`, por eso la app no lo usa.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_models [--number 20000]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.cache import CacheEntry
+from app.core.responses import FastJSONResponse
+from app.models import schemas
+from app.services import weather_forecast
+from benchmarks.upstreams import forecast_payload
+
+
+def build_payloads():
+    now = datetime.now(timezone.utc)
+    currency = dict(
+        source_currency="USD", target_currency="PYG", amount=100.0, converted_amount=745000.0,
+        rate=7450.0, timestamp=now, stale=False,
+    )
+    bitcoin = dict(
+        source_currency="BTC", target_currency="PYG", amount=0.5, converted_amount=241000000.0,
+        btc_rate_usd=65000.0, btc_rate_pyg=482000000.0, usd_rate_pyg=7450.0, btc_high_24h=490000000.0,
+        btc_low_24h=470000000.0, btc_change_24h=1.25, timestamp=now, stale=False,
+    )
+    weather = dict(department="Asunción", temp_celsius=30.5, description="cielo claro", humidity=60, wind_speed_kmh=12.3)
+    return [
+        ("POST /currency/convert", schemas.CurrencyConversionResponse, currency),
+        ("POST /bitcoin/convert", schemas.BitcoinConversionResponse, bitcoin),
+        ("GET /weather/{department}", schemas.WeatherResponse, weather),
+    ]
+
+
+def forecast_entry() -> CacheEntry:
+    blocks = forecast_payload(-25.2637, -57.5759)["list"]
+    forecast = {
+        "department": "Asunción",
+        "issued_at": time.time(),
+        "ts": [block["dt"] for block in blocks],
+        "temp_celsius": [block["main"]["temp"] for block in blocks],
+        "description": [block["weather"][0]["description"] for block in blocks],
+        "humidity": [block["main"]["humidity"] for block in blocks],
+        "wind_speed_kmh": [round(block["wind"]["speed"] * 3.6, 1) for block in blocks],
+        "pop": [block["pop"] for block in blocks],
+    }
+    return CacheEntry(value=forecast, stored_at=time.time(), expires_at=time.time() + 3600)
+
+
+def measure(fn: Callable[[], Any], number: int) -> float:
+    """Microsegundos por llamada."""
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - start) / number * 1e6
+
+
+async def measure_async(fn: Callable[[], Awaitable[Any]], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await fn()
+    return (time.perf_counter() - start) / number * 1e6
+
+
+async def run(number: int):
+    print(f"{'respuesta':32} {'validado':>10} {'construct':>10} {'resp_model':>11} {'directo':>10} {'ahorro':>8}")
+    for name, model, data in build_payloads():
+        validated = measure(lambda: model(**data), number)
+        constructed = measure(lambda: model.model_construct(**data), number)
+
+        instance = model(**data)
+        field = create_model_field(name="Response", type_=model, mode="serialization")
+
+        async def through_response_model():
+            return FastJSONResponse(await serialize_response(field=field, response_content=instance)).body
+
+        async def direct():
+            return FastJSONResponse(instance).body
+
+        slow = await measure_async(through_response_model, number)
+        fast = await measure_async(direct, number)
+        print(f"{name:32} {validated:8.2f}µs {constructed:8.2f}µs {slow:9.2f}µs {fast:8.2f}µs {slow - fast:6.2f}µs")
+
+    # Pronóstico: 40 bloques armados en cada petición contra el memo por entrada
+    entry = forecast_entry()
+    forecast_number = max(number // 20, 1)
+
+    async def get_entry(department_key, client=None):
+        return entry
+
+    weather_forecast.get_forecast_entry, original = get_entry, weather_forecast.get_forecast_entry
+    try:
+        field = create_model_field(name="Response", type_=schemas.WeatherForecastResponse, mode="serialization")
+
+        async def before():
+            forecast = weather_forecast._build_response(entry.value, 0, len(entry.value["ts"]), False)
+            return FastJSONResponse(await serialize_response(field=field, response_content=forecast)).body
+
+        async def after():
+            return FastJSONResponse(await weather_forecast.get_weather_forecast("ASUNCION")).body
+
+        slow = await measure_async(before, forecast_number)
+        fast = await measure_async(after, forecast_number)
+        print(f"{'GET /weather/{dep}/forecast':32} {'':>10} {'':>10} {slow:9.2f}µs {fast:8.2f}µs {slow - fast:6.2f}µs")
+    finally:
+        weather_forecast.get_forecast_entry = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.number))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Costo de serialización por endpoint: camino por defecto de FastAPI
+(`response_model` → `serialize_response` → `json.dumps`) contra `FastJSONResponse`
+(orjson) y contra la serialización directa de los modelos, más el tamaño con gzip/brotli.
+
+Uso (desde backend/):
+    python -m benchmarks.bench_serialization [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import gzip
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.models import schemas
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_payloads():
+    now = datetime.now(timezone.utc)
+    weather = [
+        schemas.WeatherResponse(department=name, temp_celsius=30.5, description="cielo claro", humidity=60, wind_speed_kmh=12.3)
+        for name in ("Asunción", "Central", "Alto Paraná", "Itapúa")
+    ]
+    history = [
+        schemas.BitcoinHistoryPoint(date=(now - timedelta(days=i)).strftime("%Y-%m-%d"), price_usd=60000.0 + i)
+        for i in range(settings.BITCOIN_HISTORY_MAX_DAYS, 0, -1)
+    ]
+    ohlc = [
+        schemas.BitcoinOHLCPoint(timestamp=now - timedelta(hours=i), open=60000.0, high=60100.5, low=59900.25, close=60050.0 + i)
+        for i in range(settings.BITCOIN_HISTORY_HOURLY_DAYS * 24, 0, -1)
+    ]
+    batch = schemas.CurrencyBatchConversionResponse(
+        target_currency="PYG",
+        count=10000,
+        results=[
+            schemas.CurrencyBatchResult(source_currency="USD", amount=float(i + 1), converted_amount=7300.5 * (i + 1), rate=7300.5)
+            for i in range(10000)
+        ],
+        timestamp=now,
+    )
+    return [
+        ("GET /weather/all", List[schemas.WeatherResponse], weather),
+        ("GET /bitcoin/history?days=3650", List[schemas.BitcoinHistoryPoint], history),
+        ("GET /bitcoin/history?resolution=hour&days=90", List[schemas.BitcoinOHLCPoint], ohlc),
+        ("POST /currency/convert/batch (10k)", schemas.CurrencyBatchConversionResponse, batch),
+    ]
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> float:
+    """Mejor tiempo en milisegundos de `repeat` ejecuciones."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+
+    def through_response_model(field, payload, response_class):
+        content = loop.run_until_complete(serialize_response(field=field, response_content=payload))
+        return response_class(content).body
+
+    print(f"{'endpoint':45} {'default':>9} {'orjson':>9} {'directo':>9} {'bytes':>9} {'gzip':>8} {'br':>8}")
+    for name, model, payload in build_payloads():
+        field = create_model_field(name="Response", type_=model, mode="serialization")
+        before = measure(lambda: through_response_model(field, payload, JSONResponse), args.repeat)
+        orjson_ms = measure(lambda: through_response_model(field, payload, FastJSONResponse), args.repeat)
+        direct = measure(lambda: FastJSONResponse(payload).body, args.repeat)
+
+        body = FastJSONResponse(payload).body
+        gzip_size = len(gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL))
+        br_size = len(brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)) if brotli else float("nan")
+        print(f"{name:45} {before:8.2f}ms {orjson_ms:8.2f}ms {direct:8.2f}ms {len(body):9} {gzip_size:8} {br_size:8}")
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Servidor local que reemplaza a las APIs externas para hacer pruebas de carga
+sin red: OpenWeatherMap `/data/2.5/weather` y `/data/2.5/forecast`, CoinGecko
+`/simple/price`, `/coins/markets` y `/coins/bitcoin/market_chart`, y
+exchangerate-api `/latest/{base}`, con las mismas formas de respuesta que
+parsean los servicios.
+
+Latencia, errores, timeouts y respuestas 429 se configuran por línea de
+comandos y se pueden cambiar en caliente con `PUT /_faults` (JSON con los
+mismos nombres, p. ej. `{"error_rate": 0.5}`). `GET /_stats` devuelve las
+llamadas recibidas y `POST /_reset` las pone en cero.
+
+Uso (desde backend/):
+    python -m benchmarks.fake_upstream [--port 8900] [--latency-ms 80 --latency-dist exponential]
+                                       [--error-rate 0.05] [--rate-limit-rate 0.01] [--timeout-rate 0.01]
+
+Y la app apuntando al servidor:
+    OPENWEATHERMAP_BASE_URL=http://127.0.0.1:8900 \\
+    COINGECKO_BASE_URL=http://127.0.0.1:8900/api/v3 \\
+    EXCHANGE_RATE_BASE_URL=http://127.0.0.1:8900/v6 \\
+    uvicorn app.main:app
+"""
+
+import argparse
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.upstreams import LATENCY_DISTRIBUTIONS, StubUpstreams
+
+# Parámetros que se pueden cambiar con PUT /_faults
+FAULT_FIELDS = ("latency_ms", "jitter_ms", "latency_dist", "error_rate", "rate_limit_rate", "timeout_rate", "timeout_seconds")
+
+
+def create_app(stubs: StubUpstreams) -> Starlette:
+
+    async def upstream(request: Request) -> Response:
+        # Las peticiones se resuelven con el mismo handler que usa el MockTransport de load_test
+        stub_request = httpx.Request(request.method, str(request.url), headers=request.headers.raw)
+        stub_response = await stubs(stub_request)
+        return Response(
+            stub_response.content,
+            status_code=stub_response.status_code,
+            headers={
+                key: value for key, value in stub_response.headers.items()
+                if key not in ("content-length", "content-encoding")
+            },
+        )
+
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse({
+            "calls": dict(stubs.calls),
+            "faults": {f"{upstream}:{kind}": count for (upstream, kind), count in stubs.faults.items()},
+        })
+
+    async def reset(request: Request) -> Response:
+        stubs.reset()
+        return Response(status_code=204)
+
+    async def faults(request: Request) -> JSONResponse:
+        if request.method == "PUT":
+            changes = await request.json()
+            unknown = set(changes) - set(FAULT_FIELDS)
+            if unknown or changes.get("latency_dist", stubs.latency_dist) not in LATENCY_DISTRIBUTIONS:
+                return JSONResponse({"error": f"Parámetros no válidos: {sorted(unknown) or changes['latency_dist']}"}, status_code=422)
+            for field, value in changes.items():
+                setattr(stubs, field, value)
+        return JSONResponse({field: getattr(stubs, field) for field in FAULT_FIELDS})
+
+    return Starlette(routes=[
+        Route("/_stats", stats, methods=["GET"]),
+        Route("/_reset", reset, methods=["POST"]),
+        Route("/_faults", faults, methods=["GET", "PUT"]),
+        Route("/{path:path}", upstream, methods=["GET"]),
+    ])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latencia media de las respuestas")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Desvío (normal) o amplitud (uniform) de la latencia")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default="normal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proporción de respuestas 5xx")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Proporción de respuestas 429")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Proporción de peticiones que no responden a tiempo")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="Demora de las peticiones que no responden a tiempo")
+    args = parser.parse_args()
+
+    stubs = StubUpstreams(**{field: getattr(args, field) for field in FAULT_FIELDS})
+    uvicorn.run(create_app(stubs), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,194 @@
+"""
+Prueba de carga de punta a punta: levanta `app.main:app` en el mismo proceso
+(httpx.ASGITransport) con las APIs externas simuladas (httpx.MockTransport) y
+mide cada endpoint con concurrencia configurable.
+
+Por escenario informa:
+  - llamadas a upstreams de una petición en frío (caché vacía) y de una
+    ráfaga en frío de `concurrency` peticiones simultáneas (single-flight);
+  - RPS y latencias p50/p95/p99 con la caché caliente, y las llamadas a
+    upstreams por petición en ese régimen.
+
+Si una petición en frío hace más llamadas que las esperadas (p. ej. una
+llamada extra en `convert_bitcoin_to_pyg`) el script termina con código 1,
+así sirve como chequeo de regresiones.
+
+Uso (desde backend/):
+    python -m benchmarks.load_test [--requests 2000] [--concurrency 50] [--latency-ms 50]
+                                   [--endpoints weather,bitcoin_convert]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from app.core import cache, cache_backend, http_client
+from app.core.config import settings
+from app.core.http_client import MetricsTransport
+from app.main import app
+from benchmarks.upstreams import StubUpstreams
+
+API = settings.API_V1_STR
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # Llamadas a upstreams que debería hacer una petición con la caché vacía
+    expected_upstream: int
+    json: Optional[Any] = None
+
+
+SCENARIOS = [
+    Scenario("weather", "GET", f"{API}/weather/ASUNCION", 1),
+    Scenario("weather_all", "GET", f"{API}/weather/all", 4),
+    Scenario("weather_forecast", "GET", f"{API}/weather/ASUNCION/forecast?days=2", 1),
+    Scenario("weather_nearest", "GET", f"{API}/weather/nearest?lat=-25.27&lon=-57.49", 1),
+    Scenario("currency", "POST", f"{API}/currency/convert", 1, {"from_currency": "USD", "amount": 100}),
+    Scenario(
+        "currency_batch", "POST", f"{API}/currency/convert/batch", 1,
+        [{"from_currency": code, "amount": i + 1} for i, code in enumerate(["USD", "EUR", "BRL", "ARS"] * 25)],
+    ),
+    Scenario("bitcoin_convert", "POST", f"{API}/bitcoin/convert", 2, {"amount": 0.5}),
+    Scenario("bitcoin_history", "GET", f"{API}/bitcoin/history?days=30", 1),
+]
+
+
+def install_stubs(stubs: StubUpstreams):
+    """Reemplaza los clientes compartidos por clientes que hablan con los stubs."""
+    for upstream in http_client.UPSTREAMS:
+        transport = MetricsTransport(httpx.MockTransport(stubs), upstream)
+        http_client.clients[upstream] = httpx.AsyncClient(transport=transport)
+    # El presupuesto de llamadas cortaría la prueba: se mide la app, no las API keys
+    settings.RATE_BUDGET_ENABLED = False
+
+
+async def reset_caches():
+    """
+    Vacía la caché en memoria (L1) y arranca un backend L2 vacío, para que las
+    mediciones en frío no encuentren nada de los escenarios anteriores.
+    """
+    cache.clear_caches()
+    await cache_backend.close_backend()
+    if settings.CACHE_BACKEND == "sqlite":
+        settings.CACHE_SQLITE_PATH = os.path.join(_sqlite_dir.name, f"{time.monotonic_ns()}.sqlite3")
+    elif settings.CACHE_BACKEND != "memory":
+        # No se borran colecciones de una base de MongoDB real
+        print(f"CACHE_BACKEND={settings.CACHE_BACKEND}: se mide con el backend 'memory'.")
+        settings.CACHE_BACKEND = "memory"
+
+
+# Archivos SQLite temporales (uno por medición en frío)
+_sqlite_dir = tempfile.TemporaryDirectory(prefix="load_test_")
+
+
+async def send(client: httpx.AsyncClient, scenario: Scenario) -> httpx.Response:
+    return await client.request(scenario.method, scenario.path, json=scenario.json)
+
+
+async def run_load(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await send(client, scenario)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return {"rps": requests / elapsed, "p50": p50, "p95": p95, "p99": p99, "errors": errors}
+
+
+async def run_scenario(client: httpx.AsyncClient, stubs: StubUpstreams, scenario: Scenario, requests: int, concurrency: int) -> Dict[str, Any]:
+    # Una petición en frío: cuántas llamadas a upstreams cuesta un miss
+    await reset_caches()
+    stubs.reset()
+    response = await send(client, scenario)
+    cold_calls = stubs.total()
+    cold_status = response.status_code
+
+    # Ráfaga en frío: con single-flight debería costar lo mismo que una sola petición
+    await reset_caches()
+    stubs.reset()
+    await asyncio.gather(*(send(client, scenario) for _ in range(concurrency)))
+    burst_calls = stubs.total()
+
+    # Carga con la caché caliente
+    stubs.reset()
+    result = await run_load(client, scenario, requests, concurrency)
+    result.update(
+        name=scenario.name,
+        status=cold_status,
+        cold_calls=cold_calls,
+        expected=scenario.expected_upstream,
+        burst_calls=burst_calls,
+        calls_per_request=stubs.total() / requests,
+    )
+    return result
+
+
+async def main(requests: int, concurrency: int, latency_ms: float, endpoints: Optional[List[str]]) -> int:
+    # Una línea de log por petición distorsiona las latencias
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    stubs = StubUpstreams(latency_ms=latency_ms, jitter_ms=latency_ms / 10)
+    install_stubs(stubs)
+
+    scenarios = [scenario for scenario in SCENARIOS if not endpoints or scenario.name in endpoints]
+    print(f"{requests} peticiones por escenario, concurrencia {concurrency}, latencia de upstreams {latency_ms} ms\n")
+    header = f"{'escenario':<18}{'estado':>7}{'frío':>9}{'ráfaga':>8}{'RPS':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errores':>9}{'llam/pet':>10}"
+    print(header)
+    print("-" * len(header))
+
+    regressions = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for scenario in scenarios:
+            r = await run_scenario(client, stubs, scenario, requests, concurrency)
+            print(
+                f"{r['name']:<18}{r['status']:>7}{r['cold_calls']:>5}/{r['expected']:<3}{r['burst_calls']:>8}"
+                f"{r['rps']:>10.0f}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['p99']:>9.2f}{r['errors']:>9}{r['calls_per_request']:>10.3f}"
+            )
+            if r["cold_calls"] > r["expected"] or r["burst_calls"] > r["expected"]:
+                regressions.append(r["name"])
+
+    await http_client.close_http_clients()
+
+    if regressions:
+        print(f"\n❌ Más llamadas a upstreams que las esperadas en: {', '.join(regressions)}")
+        return 1
+    print("\n✅ Llamadas a upstreams dentro de lo esperado.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones por escenario con la caché caliente")
+    parser.add_argument("--concurrency", type=int, default=50, help="Peticiones simultáneas")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Latencia simulada de las APIs externas")
+    parser.add_argument("--endpoints", type=lambda value: value.split(","), default=None,
+                        help=f"Escenarios separados por coma ({', '.join(s.name for s in SCENARIOS)})")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.requests, args.concurrency, args.latency_ms, args.endpoints)))
@@ -0,0 +1,193 @@
+"""
+Upstreams simulados para los benchmarks: las mismas formas de respuesta que
+parsean los servicios (OpenWeatherMap, CoinGecko y exchangerate-api).
+"""
+
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Optional
+
+import httpx
+
+from app.core.http_client import COINGECKO, EXCHANGE_RATE, OPENWEATHERMAP
+
+
+# --- Respuestas ---
+def weather_payload(lat: float, lon: float) -> dict:
+    return {
+        "coord": {"lat": lat, "lon": lon},
+        "weather": [{"id": 800, "main": "Clear", "description": "cielo claro"}],
+        "main": {"temp": round(random.uniform(18, 38), 1), "humidity": random.randint(40, 90)},
+        "wind": {"speed": round(random.uniform(0, 10), 2)},
+        "name": "Paraguay",
+    }
+
+
+def forecast_payload(lat: float, lon: float) -> dict:
+    """40 bloques de 3 horas desde el bloque en curso, como /data/2.5/forecast."""
+    step = 3 * 3600
+    start = int(time.time()) // step * step
+    blocks = [
+        {
+            "dt": start + i * step,
+            "main": {"temp": round(random.uniform(18, 38), 1), "humidity": random.randint(40, 90)},
+            "weather": [{"id": 800, "main": "Clear", "description": "cielo claro"}],
+            "wind": {"speed": round(random.uniform(0, 10), 2)},
+            "pop": round(random.random(), 2),
+        }
+        for i in range(40)
+    ]
+    return {"cod": "200", "cnt": len(blocks), "list": blocks, "city": {"coord": {"lat": lat, "lon": lon}}}
+
+
+def markets_payload() -> list:
+    price = round(random.uniform(60000, 70000), 2)
+    return [{
+        "id": "bitcoin",
+        "symbol": "btc",
+        "current_price": price,
+        "high_24h": round(price * 1.02, 2),
+        "low_24h": round(price * 0.98, 2),
+        "price_change_percentage_24h": round(random.uniform(-5, 5), 2),
+    }]
+
+
+def simple_price_payload(vs_currencies: str = "usd") -> dict:
+    return {"bitcoin": {currency: round(random.uniform(60000, 70000), 2) for currency in vs_currencies.split(",")}}
+
+
+def market_chart_payload(days: int, interval: Optional[str] = None) -> dict:
+    """Un punto por día (interval=daily) o por hora, más el precio actual, como CoinGecko."""
+    step = 86400 if interval == "daily" else 3600
+    now = time.time()
+    start = now - days * 86400
+    prices = [
+        [int(ts * 1000), round(60000 + 5000 * random.random(), 2)]
+        for ts in range(int(start // step * step), int(now), step)
+    ]
+    prices.append([int(now * 1000), round(60000 + 5000 * random.random(), 2)])
+    return {"prices": prices, "market_caps": [], "total_volumes": []}
+
+
+def rates_payload(base: str) -> dict:
+    now = int(time.time())
+    return {
+        "result": "success",
+        "base_code": base,
+        "time_last_update_unix": now - now % 86400,
+        "time_next_update_unix": now - now % 86400 + 86400,
+        "conversion_rates": {
+            base: 1.0, "USD": 1.0, "PYG": 7450.0, "EUR": 0.92, "BRL": 5.4, "ARS": 980.0, "GBP": 0.79, "JPY": 150.0,
+        },
+    }
+
+
+def route_upstream(request: httpx.Request) -> Optional[tuple]:
+    """
+    Devuelve (upstream, payload) para una petición a cualquiera de las APIs
+    simuladas (por host real o por ruta, para el servidor local), o `None`.
+    """
+    path = request.url.path
+    params = request.url.params
+    if path.endswith("/data/2.5/weather"):
+        return OPENWEATHERMAP, weather_payload(float(params.get("lat", 0)), float(params.get("lon", 0)))
+    if path.endswith("/data/2.5/forecast"):
+        return OPENWEATHERMAP, forecast_payload(float(params.get("lat", 0)), float(params.get("lon", 0)))
+    if path.endswith("/coins/markets"):
+        return COINGECKO, markets_payload()
+    if path.endswith("/simple/price"):
+        return COINGECKO, simple_price_payload(params.get("vs_currencies", "usd"))
+    if path.endswith("/market_chart"):
+        return COINGECKO, market_chart_payload(int(params.get("days", 1)), params.get("interval"))
+    if "/latest/" in path:
+        return EXCHANGE_RATE, rates_payload(path.rsplit("/", 1)[-1].upper())
+    return None
+
+
+LATENCY_DISTRIBUTIONS = ("fixed", "normal", "uniform", "exponential")
+
+
+class StubUpstreams:
+    """
+    Handler para `httpx.MockTransport` (y para el servidor de
+    `benchmarks.fake_upstream`) que responde como las APIs externas y cuenta
+    las llamadas recibidas por upstream.
+
+    Inyección de fallas, como proporción de las peticiones:
+      - error_rate: respuestas 500/502/503;
+      - rate_limit_rate: respuestas 429 con `Retry-After`;
+      - timeout_rate: se responde 504 recién después de `timeout_seconds`
+        (más que HTTP_TIMEOUT_SECONDS, así el cliente corta por timeout).
+
+    La latencia se sortea con `latency_dist`: fixed (siempre `latency_ms`),
+    normal (desvío `jitter_ms`), uniform (±`jitter_ms`) o exponential (media `latency_ms`).
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        latency_dist: str = "normal",
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        timeout_seconds: float = 30.0,
+    ):
+        if latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Distribución de latencia no soportada: {latency_dist}")
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.latency_dist = latency_dist
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+        self.calls: Counter = Counter()
+        self.faults: Counter = Counter()
+
+    def reset(self):
+        self.calls.clear()
+        self.faults.clear()
+
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+    def latency(self) -> float:
+        """Latencia de una respuesta, en segundos."""
+        if self.latency_dist == "normal":
+            delay = random.gauss(self.latency_ms, self.jitter_ms) if self.jitter_ms else self.latency_ms
+        elif self.latency_dist == "uniform":
+            delay = random.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        elif self.latency_dist == "exponential":
+            delay = random.expovariate(1 / self.latency_ms) if self.latency_ms else 0.0
+        else:
+            delay = self.latency_ms
+        return max(delay, 0.0) / 1000
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        routed = route_upstream(request)
+        if routed is None:
+            return httpx.Response(404, json={"error": "not found"})
+
+        upstream, payload = routed
+        self.calls[upstream] += 1
+        delay = self.latency()
+        if delay:
+            await asyncio.sleep(delay)
+
+        roll = random.random()
+        if roll < self.timeout_rate:
+            self.faults[upstream, "timeout"] += 1
+            await asyncio.sleep(self.timeout_seconds)
+            return httpx.Response(504, json={"error": "gateway timeout"})
+        roll -= self.timeout_rate
+        if roll < self.rate_limit_rate:
+            self.faults[upstream, "rate_limit"] += 1
+            return httpx.Response(429, headers={"Retry-After": "60"}, json={"error": "rate limit exceeded"})
+        roll -= self.rate_limit_rate
+        if roll < self.error_rate:
+            self.faults[upstream, "error"] += 1
+            return httpx.Response(random.choice((500, 502, 503)), json={"error": "upstream error"})
+        return httpx.Response(200, json=payload)
@@ -9,7 +9,9 @@ import pytest
 import pytest_asyncio
 from httpx import Response, Request
 from app.main import app
-from app.core import database
+from app.core import cache_backend, database, rate_budget
+from app.core.config import settings
+from app.core.cache import clear_caches
 from unittest.mock import patch, MagicMock
 
 # 📌 Simulación de Datos de Éxito para APIs Externas
@@ -36,6 +38,17 @@ MOCK_BTC_RATE_DATA = {
     }
 }
 
+# Simulación para CoinGecko /coins/markets - cotización de BTC en USD
+MOCK_BTC_MARKET_DATA = [
+    {
+        "id": "bitcoin",
+        "current_price": 65000.00,
+        "high_24h": 66000.00,
+        "low_24h": 64000.00,
+        "price_change_percentage_24h": 1.5
+    }
+]
+
 # Simulación para ExchangeRate-API (Moneda) - BTC a PYG
 MOCK_USD_TO_PYG_RATE = {
     "result": "success",
@@ -67,6 +80,17 @@ def mock_db_connection():
         yield mock_db
 
 
+# 💡 Vaciar las cachés (L1 y L2 en memoria) y los presupuestos de llamadas entre pruebas para que no se filtren datos
+@pytest.fixture(autouse=True)
+def reset_memory_cache():
+    clear_caches()
+    rate_budget.budgets.clear()
+    with patch.object(settings, "CACHE_BACKEND", "memory"), patch.object(cache_backend, "_backend", None):
+        yield
+    clear_caches()
+    rate_budget.budgets.clear()
+
+
 # 💡 Fixture para el cliente de prueba de FastAPI
 @pytest_asyncio.fixture(scope="module")
 async def client():
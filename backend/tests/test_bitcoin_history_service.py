@@ -0,0 +1,152 @@
+# tests/test_bitcoin_history_service.py
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from app.services.bitcoin_history import (
+    COLLECTION_NAME,
+    DAILY,
+    HOURLY,
+    backfill_history,
+    get_bitcoin_history_data,
+    get_bitcoin_ohlc,
+)
+
+
+class FakeHistoryCollection:
+    """Colección en memoria con lo mínimo que usa el servicio de historial."""
+
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.inserted = 0
+
+    def _match(self, query):
+        ts_filter = query.get("ts", {})
+        for doc in self.docs:
+            if doc["resolution"] != query["resolution"]:
+                continue
+            if "$gte" in ts_filter and doc["ts"] < ts_filter["$gte"]:
+                continue
+            if "$lt" in ts_filter and doc["ts"] >= ts_filter["$lt"]:
+                continue
+            yield doc
+
+    async def find_one(self, query, projection=None, sort=None):
+        docs = sorted(self._match(query), key=lambda d: d["ts"], reverse=True)
+        return docs[0] if docs else None
+
+    def find(self, query, projection=None, sort=None):
+        docs = sorted(self._match(query), key=lambda d: d["ts"])
+
+        async def cursor():
+            for doc in docs:
+                yield doc
+        return cursor()
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+        self.inserted += len(docs)
+
+
+def _today():
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _chart_response(mock_httpx_success, days):
+    """Respuesta simulada de /market_chart con `days` días completos más el precio actual."""
+    today = _today()
+    prices = [
+        [(today - timedelta(days=i)).timestamp() * 1000, 60000.0 + i]
+        for i in range(days, 0, -1)
+    ]
+    prices.append([datetime.now(timezone.utc).timestamp() * 1000, 99999.0])
+    return mock_httpx_success({"prices": prices})
+
+
+@pytest.mark.asyncio
+async def test_backfill_only_fetches_missing_days(mock_httpx_success):
+    today = _today()
+    # Serie guardada hasta hace 3 días
+    stored = [
+        {"ts": today - timedelta(days=i), "resolution": DAILY, "price_usd": 50000.0}
+        for i in range(10, 2, -1)
+    ]
+    collection = FakeHistoryCollection(stored)
+    db = {COLLECTION_NAME: collection}
+
+    with patch("httpx.AsyncClient.get") as mock_get:
+        mock_get.return_value = _chart_response(mock_httpx_success, 3)
+
+        added = await backfill_history(db)
+
+        assert mock_get.call_args.kwargs["params"]["days"] == 3
+        # Solo anteayer y ayer; el precio de hoy (día incompleto) no se guarda
+        assert added == 2
+        assert collection.inserted == 2
+
+        # Ya está completa: no se vuelve a llamar a CoinGecko
+        assert await backfill_history(db) == 0
+        mock_get.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_history_is_served_from_store_without_upstream_call():
+    today = _today()
+    stored = [
+        {"ts": today - timedelta(days=i), "resolution": DAILY, "price_usd": 60000.0 + i}
+        for i in range(30, 0, -1)
+    ]
+    db = {COLLECTION_NAME: FakeHistoryCollection(stored)}
+
+    with patch("httpx.AsyncClient.get") as mock_get:
+        history = await get_bitcoin_history_data(7, db)
+
+        mock_get.assert_not_called()
+        assert len(history) == 7
+        assert history[0].date == (today - timedelta(days=7)).strftime("%Y-%m-%d")
+        assert history[-1].price_usd == 60001.0
+
+
+@pytest.mark.asyncio
+async def test_ohlc_rollup_is_computed_once_and_sliced_per_request():
+    today = _today()
+    daily = [
+        {"ts": today - timedelta(days=i), "resolution": DAILY, "price_usd": 60000.0 + i}
+        for i in range(60, 0, -1)
+    ]
+    # Serie horaria de los últimos 2 días completos: sube de 100 en 100 dentro de cada día
+    hourly = [
+        {"ts": today - timedelta(days=d) + timedelta(hours=h), "resolution": HOURLY, "price_usd": 70000.0 + 100 * h}
+        for d in (2, 1) for h in range(24)
+    ]
+    hourly.extend(
+        {"ts": today + timedelta(hours=h), "resolution": HOURLY, "price_usd": 70000.0}
+        for h in range(datetime.now(timezone.utc).hour)
+    )
+    collection = FakeHistoryCollection(daily + hourly)
+    db = {COLLECTION_NAME: collection}
+
+    with patch("httpx.AsyncClient.get") as mock_get, \
+            patch.object(collection, "find", wraps=collection.find) as mock_find:
+        candles = await get_bitcoin_ohlc(7, "day", db)
+
+        mock_get.assert_not_called()
+        assert len(candles) == 7
+        # Los días cubiertos por la serie horaria tienen máximo y mínimo reales
+        assert candles[-1].timestamp == today - timedelta(days=1)
+        assert (candles[-1].open, candles[-1].high, candles[-1].low, candles[-1].close) == (70000.0, 72300.0, 70000.0, 72300.0)
+        # Los anteriores solo tienen el precio de cierre
+        assert candles[0].open == candles[0].close == 60007.0
+
+        # Otro rango y un máximo de puntos salen del mismo rollup, sin volver a MongoDB
+        queries = mock_find.call_count
+        merged = await get_bitcoin_ohlc(30, "day", db, max_points=10)
+        assert mock_find.call_count == queries
+        assert len(merged) == 10
+        assert merged[-1].high == 72300.0
+
+        history = await get_bitcoin_history_data(60, db, max_points=20)
+        assert len(history) == 20
+        assert history[0].price_usd == 60060.0
+        assert history[-1].price_usd == 60001.0
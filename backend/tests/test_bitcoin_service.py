@@ -2,60 +2,74 @@
 
 import pytest
 from unittest.mock import patch
-import asyncio # Necesario para usar patch.object con asyncio.gather
-from httpx import Response
 from app.services.bitcoin import convert_bitcoin_to_pyg
 from tests.conftest import (
-    MOCK_BTC_RATE_DATA, 
+    MOCK_BTC_MARKET_DATA,
     MOCK_USD_TO_PYG_RATE 
 )
 
 # Nota: Asumimos que mock_httpx_success es inyectado como fixture.
 
+
+def _route_by_url(mock_httpx_success, market_data, rates_data):
+    """Devuelve la respuesta simulada según la API externa consultada."""
+    def _get(url, *args, **kwargs):
+        if "coingecko" in str(url):
+            return mock_httpx_success(market_data)
+        return mock_httpx_success(rates_data)
+    return _get
+
+
 @pytest.mark.asyncio
 async def test_convert_bitcoin_success(mock_httpx_success):
     """
     Prueba que la conversión de BTC a PYG sea exitosa, mockeando 
-    las dos llamadas a APIs externas.
+    las dos llamadas a APIs externas (CoinGecko y ExchangeRate-API).
     """
     
     amount_btc = 0.5
     
-    # 📌 1. Mockear la función interna httpx.AsyncClient.get
-    # Como el servicio de bitcoin hace dos llamadas GET, debemos mockear la 
-    # función get para que devuelva respuestas diferentes en orden.
-    
     with patch("httpx.AsyncClient.get") as mock_get:
+        mock_get.side_effect = _route_by_url(mock_httpx_success, MOCK_BTC_MARKET_DATA, MOCK_USD_TO_PYG_RATE)
         
-        # Configuramos los valores de retorno secuenciales:
-        # 1. Tasa de BTC a USD (CoinGecko)
-        # 2. Tasa de USD a PYG (ExchangeRate-API)
-        mock_get.side_effect = [
-            mock_httpx_success(MOCK_BTC_RATE_DATA),
-            mock_httpx_success(MOCK_USD_TO_PYG_RATE)
-        ]
-        
-        # 2. Ejecutar la función a probar
         result = await convert_bitcoin_to_pyg(amount_btc=amount_btc)
         
-        # 3. Assertions (Verificaciones)
-        
         # Fórmulas y valores esperados basados en los Mocks:
         BTC_Rate_USD_MOCK = 65000.00
         PYG_Rate_USD = 7450.00
 
-        amount_btc = 0.5
         # Resultado Esperado: 0.5 * 65000.00 * 7450.00 = 242,125,000.00
-        expected_conversion = 3725.00
+        expected_conversion = 242125000.00
         
         assert result is not None
         assert result.source_currency == "BTC"
         assert result.target_currency == "PYG"
         assert result.amount == amount_btc
         assert result.btc_rate_usd == BTC_Rate_USD_MOCK
-        assert result.btc_rate_pyg == PYG_Rate_USD
+        assert result.usd_rate_pyg == PYG_Rate_USD
+        assert result.btc_rate_pyg == BTC_Rate_USD_MOCK * PYG_Rate_USD
+        assert result.btc_high_24h == 66000.00 * PYG_Rate_USD
+        assert result.btc_low_24h == 64000.00 * PYG_Rate_USD
+        assert result.btc_change_24h == 1.5
         assert result.converted_amount == expected_conversion
 
+        # Solo dos llamadas externas: /coins/markets y la tabla de tasas
+        assert mock_get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_convert_bitcoin_uses_cached_quote(mock_httpx_success):
+    """Una segunda conversión se resuelve con la cotización en caché, sin llamadas externas."""
+    
+    with patch("httpx.AsyncClient.get") as mock_get:
+        mock_get.side_effect = _route_by_url(mock_httpx_success, MOCK_BTC_MARKET_DATA, MOCK_USD_TO_PYG_RATE)
+        
+        await convert_bitcoin_to_pyg(amount_btc=1.0)
+        result = await convert_bitcoin_to_pyg(amount_btc=2.0)
+
+        assert mock_get.call_count == 2
+        assert result.converted_amount == 2.0 * 65000.00 * 7450.00
+
 
 @pytest.mark.asyncio
 async def test_convert_bitcoin_api_failure(mock_httpx_success):
@@ -65,16 +79,10 @@ async def test_convert_bitcoin_api_failure(mock_httpx_success):
     
     with patch("httpx.AsyncClient.get") as mock_get:
         
-        # Configuramos side_effect para que la primera llamada (BTC/USD) falle
-        mock_get.side_effect = [
-            # Simular un fallo de red o un JSON vacío (lo que resulte en None)
-            mock_httpx_success({}), 
-            # La segunda llamada no importa, porque el proceso fallará con la primera
-            mock_httpx_success(MOCK_USD_TO_PYG_RATE) 
-        ]
+        # CoinGecko devuelve un JSON vacío (lo que resulte en None)
+        mock_get.side_effect = _route_by_url(mock_httpx_success, {}, MOCK_USD_TO_PYG_RATE)
         
-        # 2. Ejecutar la función a probar
         result = await convert_bitcoin_to_pyg(amount_btc=amount_btc)
         
-        # 3. Assertion: Esperamos que retorne None
-        assert result is None
\ No newline at end of file
+        # Assertion: Esperamos que retorne None
+        assert result is None
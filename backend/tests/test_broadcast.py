@@ -0,0 +1,56 @@
+# tests/test_broadcast.py
+
+import asyncio
+import pytest
+
+from app.core.broadcast import Broadcaster, Subscription
+
+
+@pytest.mark.asyncio
+async def test_single_poller_fans_out_to_all_subscribers():
+    polls = 0
+
+    async def poll():
+        nonlocal polls
+        polls += 1
+        return {"btc_rate_usd": 65000.0 + polls}
+
+    broadcaster = Broadcaster("test", poll, interval=0.01)
+    subscriptions = [broadcaster.subscribe() for _ in range(50)]
+
+    values = await asyncio.gather(*(s.next(timeout=1) for s in subscriptions))
+    assert all(v == {"btc_rate_usd": 65001.0} for v in values)
+
+    # Un solo sondeo para los 50 clientes
+    assert polls <= 2
+
+    for subscription in subscriptions:
+        broadcaster.unsubscribe(subscription)
+    assert len(broadcaster) == 0
+    await broadcaster.close()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_only_gets_latest_value():
+    subscription = Subscription()
+
+    for price in (1.0, 2.0, 3.0):
+        subscription.offer(price)
+
+    assert await subscription.next(timeout=1) == 3.0
+    assert subscription.dropped == 2
+    # Sin valores nuevos: vence el timeout (heartbeat)
+    assert await subscription.next(timeout=0.01) is None
+
+
+@pytest.mark.asyncio
+async def test_new_subscriber_receives_latest_value_immediately():
+    async def poll():
+        return None
+
+    broadcaster = Broadcaster("test", poll, interval=10)
+    broadcaster.publish("ultimo")
+
+    subscription = broadcaster.subscribe()
+    assert await subscription.next(timeout=1) == "ultimo"
+    await broadcaster.close()
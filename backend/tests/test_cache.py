@@ -0,0 +1,109 @@
+# tests/test_cache.py
+
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+
+from app.core.cache import TTLCache, get_cache, get_or_load, refresh_entry
+from app.core.config import settings
+from app.core.scheduler import next_refresh_delay
+from app.core.singleflight import SingleFlight
+
+
+def test_cache_hit_and_miss_counters():
+    cache = TTLCache("test", maxsize=4)
+
+    assert cache.get("ASUNCION") is None
+    cache.set("ASUNCION", {"temp_celsius": 30.0}, ttl=60)
+    assert cache.get("ASUNCION") == {"temp_celsius": 30.0}
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_entry_expires_after_ttl():
+    cache = TTLCache("test", maxsize=4)
+    now = time.time()
+
+    # Una entrada guardada hace 2 minutos con TTL de 1 minuto ya expiró
+    cache.set("USD", 7450.0, ttl=60, stored_at=now - 120)
+    assert cache.get("USD") is None
+
+    with patch("app.core.cache.time.time", return_value=now + 30):
+        cache.set("EUR", 8100.0, ttl=60, stored_at=now)
+        assert cache.get("EUR") == 8100.0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache("test", maxsize=2)
+
+    cache.set("A", 1, ttl=60)
+    cache.set("B", 2, ttl=60)
+    cache.get("A")  # "A" pasa a ser la más reciente
+    cache.set("C", 3, ttl=60)
+
+    assert cache.get("B") is None
+    assert cache.get("A") == 1
+    assert cache.get("C") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_get_cache_uses_namespace_capacity():
+    with patch("app.core.cache.settings.L1_CACHE_MAX_ENTRIES", {"capacity-test": 3}):
+        assert get_cache("capacity-test").maxsize == 3
+    assert get_cache("capacity-test") is get_cache("capacity-test")
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_serves_stale_and_revalidates_in_background():
+    cache = TTLCache("test", maxsize=4)
+    flights = SingleFlight()
+    cache.set("quote", "vieja", ttl=60, stored_at=time.time() - 120)
+
+    async def loader():
+        cache.set("quote", "nueva", ttl=60)
+        return "nueva"
+
+    # Se sirve el valor expirado sin esperar a la carga
+    assert await get_or_load(cache, "quote", loader, flights) == "vieja"
+    assert cache.stats()["stale_hits"] == 1
+
+    # La revalidación en segundo plano actualiza la caché
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert await get_or_load(cache, "quote", loader, flights) == "nueva"
+
+
+@pytest.mark.asyncio
+async def test_refresh_entry_only_reloads_close_to_expiry():
+    cache = TTLCache("test", maxsize=4)
+    flights = SingleFlight()
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        cache.set("rates", {"PYG": 7450.0}, ttl=3600)
+
+    expires_at = await refresh_entry(cache, "rates", loader, flights)
+    assert loads == 1
+    assert expires_at == cache.peek("rates").expires_at
+
+    # Todavía lejos de expirar: no se vuelve a cargar
+    await refresh_entry(cache, "rates", loader, flights)
+    assert loads == 1
+
+    # Dentro de la ventana de refresco: se recarga
+    cache.set("rates", {"PYG": 7450.0}, ttl=5)
+    await refresh_entry(cache, "rates", loader, flights)
+    assert loads == 2
+
+
+def test_next_refresh_delay():
+    now = time.time()
+    lead = settings.CACHE_REFRESH_LEAD_SECONDS
+
+    assert next_refresh_delay(now + 3600, now=now) == 3600 - lead
+    assert next_refresh_delay(now, now=now) == settings.CACHE_REFRESH_MIN_INTERVAL_SECONDS
+    assert next_refresh_delay(None) == settings.CACHE_REFRESH_RETRY_SECONDS
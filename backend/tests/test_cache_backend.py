@@ -0,0 +1,123 @@
+# tests/test_cache_backend.py
+
+import time
+import pytest
+from unittest.mock import ANY, AsyncMock, patch
+
+from app.core import cache_backend
+from app.core.cache_backend import MemoryBackend, MongoBackend, SQLiteBackend, build_backend, content_hash
+from app.core.config import settings
+from app.services.currency import convert_currency
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    else:
+        backend = MemoryBackend()
+    yield backend
+
+
+@pytest.mark.asyncio
+async def test_backend_set_get_and_delete(backend):
+    await backend.set("currency", "USD", {"PYG": 7450.0}, ttl=60)
+
+    entry = await backend.get("currency", "USD")
+    assert entry.value == {"PYG": 7450.0}
+    assert entry.is_fresh()
+    # Los namespaces no se mezclan
+    assert await backend.get("weather", "USD") is None
+
+    await backend.delete("currency", "USD")
+    assert await backend.get("currency", "USD") is None
+
+
+@pytest.mark.asyncio
+async def test_backend_get_many_skips_expired_and_missing(backend):
+    now = time.time()
+    await backend.set_many("weather", {"ASUNCION": {"temp_celsius": 30.0}, "CENTRAL": {"temp_celsius": 31.0}}, ttl=60)
+    await backend.set("weather", "ITAPUA", {"temp_celsius": 25.0}, ttl=60, stored_at=now - 120)
+
+    found = await backend.get_many("weather", ["ASUNCION", "CENTRAL", "ITAPUA", "ALTO_PARANA"])
+
+    assert set(found) == {"ASUNCION", "CENTRAL"}
+    assert found["CENTRAL"].value == {"temp_celsius": 31.0}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = SQLiteBackend(path)
+    await first.set("bitcoin", "quote", {"price_usd": 65000.0}, ttl=60)
+    await first.close()
+
+    second = SQLiteBackend(path)
+    entry = await second.get("bitcoin", "quote")
+    assert entry.value == {"price_usd": 65000.0}
+    await second.close()
+
+
+def test_build_backend_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        build_backend("redis")
+
+
+@pytest.mark.asyncio
+async def test_currency_uses_configured_backend(tmp_path):
+    with patch.object(settings, "CACHE_BACKEND", "sqlite"), \
+         patch.object(settings, "CACHE_SQLITE_PATH", str(tmp_path / "cache.sqlite3")):
+        backend = cache_backend.get_backend()
+        assert isinstance(backend, SQLiteBackend)
+        await backend.set("currency", settings.CURRENCY_RATES_BASE, {"USD": 1.0, "PYG": 7450.0}, ttl=60)
+
+        with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+            result = await convert_currency(amount=10.0, from_currency="USD")
+
+            # La tabla sale de la caché L2, sin llamar a la API externa
+            mock_get.assert_not_called()
+            assert result.converted_amount == 74500.0
+
+        await cache_backend.close_backend()
+
+
+@pytest.mark.asyncio
+async def test_mongo_backend_bulk_write_compares_stored_hash():
+    collection = AsyncMock()
+    backend = MongoBackend({"cache_weather": collection})
+    items = {"ASUNCION": {"temp_celsius": 30.0}, "CENTRAL": {"temp_celsius": 31.0}}
+
+    await backend.set_many("weather", items, ttl=60)
+
+    collection.bulk_write.assert_called_once()
+    ops = collection.bulk_write.call_args.args[0]
+    assert collection.bulk_write.call_args.kwargs["ordered"] is False
+    assert all(op._upsert for op in ops)
+
+    # Pipeline: el valor solo se reescribe si el `hash` guardado es distinto
+    [stage] = ops[0]._doc
+    update = stage["$set"]
+    digest = content_hash({"temp_celsius": 30.0})
+    assert update["hash"] == digest
+    assert update["value"]["$cond"] == [{"$eq": ["$hash", digest]}, "$value", {"$literal": {"temp_celsius": 30.0}}]
+
+    # Con el mismo valor, el TTL solo se renueva en la segunda mitad de su vida
+    renew = {"$or": [{"$ne": ["$hash", digest]}, {"$lte": ["$expires_at", ANY]}]}
+    for field in ("stored_at", "expires_at"):
+        assert update[field]["$cond"] == [renew, ANY, f"${field}"]
+    renew_before = update["expires_at"]["$cond"][0]["$or"][1]["$lte"][1]
+    assert (update["expires_at"]["$cond"][1] - renew_before).total_seconds() == 30
+
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+
+
+def test_incomplete_backend_fails_on_creation():
+    class ReadOnlyBackend(cache_backend.CacheBackend):
+        async def get_many(self, namespace, keys):
+            return {}
+
+    with pytest.raises(TypeError):
+        ReadOnlyBackend()
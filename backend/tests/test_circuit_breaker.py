@@ -0,0 +1,65 @@
+# tests/test_circuit_breaker.py
+
+import time
+import httpx
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+from app.core.cache import get_cache
+from app.core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerTransport, CircuitOpenError
+from app.models.schemas import BitcoinQuote
+from app.services import bitcoin as bitcoin_service
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_fails_fast_and_closes_after_probe():
+    upstream_calls = []
+    healthy = False
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream_calls.append(request.url.path)
+        return httpx.Response(200 if healthy else 503)
+
+    transport = CircuitBreakerTransport(httpx.MockTransport(handler), "test-breaker")
+    transport.breaker = CircuitBreaker("test-breaker", failure_rate=0.5, minimum_calls=4, window=60, open_seconds=30)
+    client = httpx.AsyncClient(transport=transport)
+
+    for _ in range(4):
+        await client.get("https://upstream.test/")
+    assert transport.breaker.state == OPEN
+
+    # Abierto: no se llama al upstream
+    with pytest.raises(CircuitOpenError):
+        await client.get("https://upstream.test/")
+    assert len(upstream_calls) == 4
+    assert transport.breaker.rejected == 1
+
+    # Pasado open_seconds, una sola prueba (half-open); al responder bien se cierra
+    healthy = True
+    transport.breaker.opened_at -= 30
+    assert transport.breaker.allow() and transport.breaker.state == HALF_OPEN
+    assert not transport.breaker.allow()
+    transport.breaker.release()
+    await client.get("https://upstream.test/")
+    assert transport.breaker.state == CLOSED
+    assert len(upstream_calls) == 5
+
+
+@pytest.mark.asyncio
+async def test_convert_serves_last_known_good_quote_flagged_stale():
+    quote = BitcoinQuote(
+        price_usd=65000.0, high_24h_usd=66000.0, low_24h_usd=64000.0,
+        change_24h_pct=1.5, usd_rate_pyg=7450.0, timestamp=datetime(2025, 1, 1),
+    )
+    # Vencida hace más de CACHE_MAX_STALE_SECONDS: no se sirve como stale-while-revalidate
+    get_cache(bitcoin_service.CACHE_NAMESPACE).set(
+        bitcoin_service.QUOTE_CACHE_KEY, quote, ttl=60, stored_at=time.time() - 10 * 86400
+    )
+
+    with patch("httpx.AsyncClient.get", side_effect=httpx.ConnectError("caído")):
+        result = await bitcoin_service.convert_bitcoin_to_pyg(amount_btc=1.0)
+
+    assert result is not None
+    assert result.stale is True
+    assert result.converted_amount == round(65000.0 * 7450.0, 2)
@@ -1,8 +1,10 @@
+import orjson
 import pytest
 import pytest_asyncio
 from unittest.mock import patch, AsyncMock
 
-from app.services.currency import convert_currency
+from app.services.currency import convert_currency, fetch_rate_table
+from app.core.config import settings
 from tests.conftest import MOCK_CURRENCY_DATA
 from app.core import database
 
@@ -52,4 +54,70 @@ async def test_convert_currency_api_failure(mock_httpx_success):
         
         assert result is None
         
-        
\ No newline at end of file
+        
+@pytest.mark.asyncio
+async def test_convert_currency_cross_rate_uses_single_table(mock_httpx_success):
+    MOCK_TABLE_DATA = {
+        "result": "success",
+        "base_code": "USD",
+        "conversion_rates": {"USD": 1, "PYG": 7450.00, "EUR": 0.92, "BRL": 5.0}
+    }
+
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = mock_httpx_success(MOCK_TABLE_DATA)
+
+        eur = await convert_currency(amount=10.0, from_currency="EUR")
+        brl = await convert_currency(amount=10.0, from_currency="brl")
+
+        # Una sola llamada externa sirve a todas las monedas
+        mock_get.assert_called_once()
+
+        assert eur.rate == pytest.approx(7450.00 / 0.92)
+        assert brl.rate == pytest.approx(7450.00 / 5.0)
+        assert brl.converted_amount == round(10.0 * 7450.00 / 5.0, 2)
+
+        # Moneda inexistente en la tabla
+        assert await convert_currency(amount=10.0, from_currency="XXX") is None
+
+
+@pytest.mark.asyncio
+async def test_convert_currency_batch_groups_by_currency(mock_httpx_success):
+    from app.services.currency import convert_currency_batch, stream_currency_batch
+
+    MOCK_TABLE_DATA = {
+        "result": "success",
+        "conversion_rates": {"USD": 1, "PYG": 7450.00, "EUR": 0.92}
+    }
+
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = mock_httpx_success(MOCK_TABLE_DATA)
+
+        currencies = ["USD", "eur", "USD", "XXX"]
+        amounts = [100.0, 10.0, 2.5, 1.0]
+        result = await convert_currency_batch(currencies, amounts)
+
+        mock_get.assert_called_once()
+        assert result.count == 4
+        assert [r.source_currency for r in result.results] == ["USD", "EUR", "USD", "XXX"]
+        assert result.results[0].converted_amount == 745000.00
+        assert result.results[1].rate == pytest.approx(7450.00 / 0.92)
+        assert result.results[2].converted_amount == round(2.5 * 7450.00, 2)
+        # Moneda desconocida: sin tasa ni monto convertido
+        assert result.results[3].rate is None
+        assert result.results[3].converted_amount is None
+
+        lines = b"".join(await stream_currency_batch(currencies, amounts)).splitlines()
+        assert len(lines) == 4
+        assert [orjson.loads(line) for line in lines] == [row.model_dump() for row in result.results]
+        assert b'"converted_amount":null' in lines[3]
+
+
+@pytest.mark.asyncio
+async def test_fetch_rate_table_uses_configured_base_url(mock_httpx_success):
+    with patch.object(settings, "EXCHANGE_RATE_BASE_URL", "http://127.0.0.1:8900/v6"), \
+         patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = mock_httpx_success(MOCK_CURRENCY_DATA)
+
+        await fetch_rate_table()
+
+        assert mock_get.call_args.args[0].startswith("http://127.0.0.1:8900/v6/")
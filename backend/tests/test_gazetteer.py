@@ -0,0 +1,87 @@
+# tests/test_gazetteer.py
+
+import random
+import time
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch, AsyncMock
+
+from app.core.spatial import GridIndex, haversine_km
+from app.services import gazetteer
+from app.services.weather import DEPARTMENTS, get_nearest_weather
+
+MOCK_WEATHER_DATA = {
+    "main": {"temp": 28.4, "humidity": 70},
+    "weather": [{"description": "nubes dispersas"}],
+    "wind": {"speed": 3.0},
+}
+
+
+def test_grid_index_matches_brute_force():
+    rng = random.Random(7)
+    points = [(rng.uniform(-27.6, -19.3), rng.uniform(-62.6, -54.3), i) for i in range(200)]
+    index = GridIndex(points, cell_km=40)
+
+    for _ in range(500):
+        lat, lon = rng.uniform(-30, -17), rng.uniform(-65, -52)
+        expected = min(haversine_km(lat, lon, point[0], point[1]) for point in points)
+        item, distance = index.nearest(lat, lon)
+        # La proyección plana puede elegir un punto casi empatado
+        assert distance == pytest.approx(expected, rel=0.01, abs=0.5)
+        assert distance == haversine_km(lat, lon, points[item][0], points[item][1])
+
+
+def test_gazetteer_covers_all_departments():
+    gazetteer.load_gazetteer()
+
+    departments = {place.department for place in gazetteer.places.values() if place.kind == "department"}
+    assert len(departments) == 18  # 17 departamentos + Asunción
+
+    # Las estaciones de DEPARTMENTS comparten clave y coordenadas con el gazetteer
+    for key, coords in DEPARTMENTS.items():
+        assert gazetteer.places[key].coords == coords
+
+    place, distance = gazetteer.nearest_place(-22.36, -60.03)
+    assert place.key == "BOQUERON"
+    assert distance < 5
+
+
+def test_nearest_place_far_away_is_rejected_quickly():
+    gazetteer.load_gazetteer()
+
+    # Sin tope la búsqueda recorrería todos los anillos de la grilla
+    start = time.perf_counter()
+    for lat, lon in [(90, 180), (-90, -180), (35.68, 139.69), (-25.3, 120.0)]:
+        assert gazetteer.nearest_place(lat, lon, max_km=150) is None
+    assert time.perf_counter() - start < 0.01
+
+    # Dentro del radio sigue encontrando el lugar
+    place, distance = gazetteer.nearest_place(-22.36, -60.03, max_km=150)
+    assert place.key == "BOQUERON"
+    assert gazetteer.nearest_place(-22.36, -61.0, max_km=150) is not None
+    assert gazetteer.nearest_place(-22.36, -61.0, max_km=5) is None
+
+
+@pytest.mark.asyncio
+async def test_nearest_weather_reuses_station_cache(mock_httpx_success):
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = mock_httpx_success(MOCK_WEATHER_DATA)
+
+        # Dos coordenadas distintas cerca de Luque: una sola llamada externa
+        first = await get_nearest_weather(-25.27, -57.49)
+        second = await get_nearest_weather(-25.26, -57.48)
+
+        mock_get.assert_called_once()
+        assert mock_get.call_args.kwargs["params"]["lat"] == gazetteer.places["LUQUE"].lat
+
+    assert first.place == second.place == "Luque"
+    assert first.department == "Central"
+    assert second.weather.temp_celsius == 28.4
+    assert second.distance_km < 2
+
+
+@pytest.mark.asyncio
+async def test_nearest_weather_outside_paraguay():
+    with pytest.raises(HTTPException) as error:
+        await get_nearest_weather(35.68, 139.69)
+    assert error.value.status_code == 404
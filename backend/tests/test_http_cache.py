@@ -0,0 +1,67 @@
+# tests/test_http_cache.py
+
+import time
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+
+from app.core.cache import get_cache
+from app.main import app
+from app.models.schemas import WeatherResponse
+from app.services import weather as weather_service
+
+client = TestClient(app)
+
+ASUNCION = WeatherResponse(
+    department="Asunción", temp_celsius=30.0, description="cielo claro", humidity=60, wind_speed_kmh=10.0
+)
+
+
+def test_weather_etag_and_304_fast_path():
+    get_cache(weather_service.CACHE_NAMESPACE).set("ASUNCION", ASUNCION, ttl=600)
+
+    response = client.get("/api/v1/weather/asuncion")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('"')
+    assert response.headers["last-modified"].endswith("GMT")
+    max_age = int(response.headers["cache-control"].split("max-age=")[1])
+    assert 590 <= max_age <= 600
+
+    # Con el ETag vigente no se consulta el servicio ni se arma el cuerpo
+    with patch.object(weather_service, "get_weather_data", new=AsyncMock()) as mock_service:
+        not_modified = client.get("/api/v1/weather/ASUNCION", headers={"If-None-Match": etag})
+        mock_service.assert_not_called()
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    not_modified = client.get(
+        "/api/v1/weather/ASUNCION", headers={"If-Modified-Since": response.headers["last-modified"]}
+    )
+    assert not_modified.status_code == 304
+
+    # Al recargarse la entrada cambia la versión
+    get_cache(weather_service.CACHE_NAMESPACE).set("ASUNCION", ASUNCION, ttl=600, stored_at=time.time() - 1)
+    changed = client.get("/api/v1/weather/ASUNCION", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_weather_etag_changes_when_entry_goes_stale():
+    cache = get_cache(weather_service.CACHE_NAMESPACE)
+    stored_at = time.time() - 10
+    cache.set("ASUNCION", ASUNCION, ttl=600, stored_at=stored_at)
+    fresh = client.get("/api/v1/weather/ASUNCION")
+    assert fresh.json()["stale"] is False
+
+    # Misma carga, ya vencida: se sirve como último valor conocido
+    cache.set("ASUNCION", ASUNCION, ttl=5, stored_at=stored_at)
+    with patch.object(weather_service, "_load_weather", new=AsyncMock(return_value=None)):
+        stale = client.get("/api/v1/weather/ASUNCION", headers={"If-None-Match": fresh.headers["etag"]})
+        assert stale.status_code == 200
+        assert stale.json()["stale"] is True
+        assert stale.headers["etag"] != fresh.headers["etag"]
+        assert "last-modified" not in stale.headers
+
+        by_date = client.get("/api/v1/weather/ASUNCION", headers={"If-Modified-Since": fresh.headers["last-modified"]})
+        assert by_date.status_code == 200
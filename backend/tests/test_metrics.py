@@ -0,0 +1,67 @@
+# tests/test_metrics.py
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.cache import get_cache
+from app.core.http_client import MetricsTransport
+from app.main import app
+from app.models.schemas import WeatherResponse
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_latency_seconds", "Latencia de prueba.", ("route",), (0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(3.0, "/a")
+
+    text = histogram.render()
+    assert '# TYPE test_latency_seconds histogram' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum{route="/a"} 3.55' in text
+    assert 'test_latency_seconds_count{route="/a"} 3' in text
+
+
+def test_metrics_endpoint_reports_routes_and_cache_hits():
+    get_cache("weather").set("ASUNCION", WeatherResponse(
+        department="Asunción", temp_celsius=30.0, description="cielo claro", humidity=60, wind_speed_kmh=10.0
+    ), ttl=600)
+    route = "/api/v1/weather/{department_name}"
+    before = metrics.http_request_duration.count("GET", route)
+
+    client = TestClient(app)
+    assert client.get("/api/v1/weather/asuncion").status_code == 200
+
+    # La ruta se etiqueta con su plantilla, no con el valor del parámetro
+    assert metrics.http_request_duration.count("GET", route) == before + 1
+    assert metrics.http_requests.value("GET", route, "200") >= 1
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'cache_lookups_total{cache="weather",result="hit"} 1' in response.text
+    assert 'http_requests_in_progress{method="GET"} 0' in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_transport_counts_upstream_latency_and_errors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/timeout":
+            raise httpx.ConnectTimeout("timeout", request=request)
+        return httpx.Response(503 if request.url.path == "/down" else 200)
+
+    client = httpx.AsyncClient(transport=MetricsTransport(httpx.MockTransport(handler), "test-upstream"))
+    requests = metrics.upstream_request_duration.count("test-upstream")
+
+    await client.get("https://upstream.test/ok")
+    await client.get("https://upstream.test/down")
+    with pytest.raises(httpx.ConnectTimeout):
+        await client.get("https://upstream.test/timeout")
+
+    assert metrics.upstream_request_duration.count("test-upstream") == requests + 3
+    assert metrics.upstream_errors.value("test-upstream", "http_5xx") >= 1
+    assert metrics.upstream_errors.value("test-upstream", "timeout") >= 1
+    assert metrics.upstream_requests_in_progress.value("test-upstream") == 0
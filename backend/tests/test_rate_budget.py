@@ -0,0 +1,78 @@
+# tests/test_rate_budget.py
+
+import time
+import pytest
+from unittest.mock import patch
+
+from app.core import rate_budget
+from app.core.cache import get_cache
+from app.core.http_client import EXCHANGE_RATE
+from app.core.rate_budget import MONTH_SECONDS, RateBudget
+from app.services import currency as currency_service
+
+
+def test_budget_limits_per_minute_and_spreads_the_month():
+    now = [1000.0]
+    with patch("app.core.rate_budget.time.monotonic", side_effect=lambda: now[0]):
+        budget = RateBudget("test", per_minute=2, per_month=300)
+
+        assert budget.try_acquire() and budget.try_acquire()
+        assert not budget.try_acquire()
+        assert budget.rejected == 1
+
+        # Un minuto después se repone el cupo por minuto
+        now[0] += 60
+        assert budget.try_acquire()
+
+        # El cupo mensual acumula como máximo un día (300 / 30 = 10 llamadas)
+        now[0] += MONTH_SECONDS
+        assert sum(budget.try_acquire() for _ in range(100)) == 2  # limitado por minuto
+        assert budget.month.available() <= 10
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_serves_cached_rates_without_calling_out():
+    # Tabla vencida hace tiempo: sin presupuesto solo queda el último valor conocido
+    get_cache(currency_service.CACHE_NAMESPACE).set(
+        currency_service.RATES_BASE_CURRENCY, {"PYG": 7450.0}, ttl=60, stored_at=time.time() - 10 * 86400
+    )
+    budget = rate_budget.get_budget(EXCHANGE_RATE)
+    budget.minute.tokens = 0
+
+    with patch("httpx.AsyncClient.get") as mock_get:
+        result = await currency_service.convert_currency(amount=10.0, from_currency="USD")
+
+        mock_get.assert_not_called()
+    assert result.converted_amount == 74500.0
+    assert result.stale is True
+    assert budget.rejected == 1
+
+
+def test_open_circuit_does_not_spend_budget():
+    from app.core.circuit_breaker import get_breaker
+
+    breaker = get_breaker(EXCHANGE_RATE)
+    breaker._open()
+    try:
+        budget = rate_budget.get_budget(EXCHANGE_RATE)
+        before = budget.minute.available()
+
+        # La petición fallará en el CircuitBreakerTransport sin salir: no gasta fichas
+        assert rate_budget.try_acquire(EXCHANGE_RATE)
+        assert budget.minute.available() == pytest.approx(before, abs=0.01)
+    finally:
+        breaker._close()
+
+
+def test_btc_quote_ttl_fits_the_coingecko_budget():
+    from app.core.config import settings
+    from app.core.http_client import COINGECKO
+    from app.services.bitcoin import quote_ttl
+
+    limits = {COINGECKO: {"per_minute": 30, "per_month": 10000}}
+    with patch.object(settings, "UPSTREAM_RATE_LIMITS", limits):
+        # Refrescos por mes dentro de la proporción reservada para la cotización
+        assert MONTH_SECONDS / quote_ttl() <= 10000 * settings.BITCOIN_QUOTE_BUDGET_SHARE
+
+    with patch.object(settings, "UPSTREAM_RATE_LIMITS", {}):
+        assert quote_ttl() == settings.BITCOIN_CACHE_TTL_SECONDS
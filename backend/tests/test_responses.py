@@ -0,0 +1,93 @@
+# tests/test_responses.py
+
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core import http_cache
+from app.core.compression import CompressionMiddleware, negotiate_encoding
+from app.core.responses import FastJSONResponse
+from app.models.schemas import BitcoinHistoryPoint
+
+app = FastAPI(default_response_class=FastJSONResponse)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+HISTORY = [BitcoinHistoryPoint(date=f"2025-01-{day:02d}", price_usd=60000.0 + day) for day in range(1, 32)] * 10
+
+
+@app.get("/history")
+async def history():
+    return FastJSONResponse(HISTORY)
+
+
+VALIDATORS = {"ETag": '"v1"', "Cache-Control": "public, max-age=60"}
+
+
+@app.get("/versioned")
+async def versioned(request: Request):
+    not_modified = http_cache.not_modified(request, VALIDATORS)
+    if not_modified is not None:
+        return not_modified
+    return FastJSONResponse(HISTORY, headers=VALIDATORS)
+
+
+@app.get("/small")
+async def small():
+    return {"ok": True}
+
+
+client = TestClient(app)
+
+
+def test_fast_json_response_serializes_models_directly():
+    body = FastJSONResponse(HISTORY[:2]).body
+    assert json.loads(body) == [point.model_dump() for point in HISTORY[:2]]
+    assert FastJSONResponse({"points": HISTORY[:1]}).body == b'{"points":[{"date":"2025-01-01","price_usd":60001.0}]}'
+
+
+def test_negotiate_encoding_respects_quality_values():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+    assert negotiate_encoding("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert negotiate_encoding("*") == "br"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("") is None
+
+
+def test_compression_is_negotiated_with_a_size_threshold():
+    expected = [point.model_dump() for point in HISTORY]
+
+    # TestClient (httpx) descomprime brotli y gzip de forma transparente
+    response = client.get("/history", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(FastJSONResponse(HISTORY).body) / 5
+    assert response.json() == expected
+
+    response = client.get("/history", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == expected
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+
+def test_compressed_responses_get_their_own_etag():
+    identity = client.get("/versioned", headers={"Accept-Encoding": "identity"})
+    brotli = client.get("/versioned", headers={"Accept-Encoding": "br"})
+    gzip = client.get("/versioned", headers={"Accept-Encoding": "gzip"})
+    assert identity.headers["etag"] == '"v1"'
+    assert brotli.headers["etag"] == '"v1-br"'
+    assert gzip.headers["etag"] == '"v1-gz"'
+
+    # Cada variante valida la misma versión y el 304 devuelve el ETag recibido
+    for response, encoding in [(identity, "identity"), (brotli, "br"), (gzip, "gzip")]:
+        etag = response.headers["etag"]
+        not_modified = client.get("/versioned", headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+
+    changed = client.get("/versioned", headers={"Accept-Encoding": "br", "If-None-Match": '"v0-br"'})
+    assert changed.status_code == 200
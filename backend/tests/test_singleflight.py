@@ -0,0 +1,57 @@
+# tests/test_singleflight.py
+
+import asyncio
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 7450.0
+
+    results = await asyncio.gather(*(flights.do("USD", fetch) for _ in range(10)))
+
+    assert results == [7450.0] * 10
+    assert calls == 1
+    # La clave se libera al terminar: la siguiente llamada vuelve a ejecutar
+    await flights.do("USD", fetch)
+    assert calls == 2
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_error_is_propagated_to_every_waiter():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("API externa caída")
+
+    results = await asyncio.gather(*(flights.do("ASUNCION", fetch) for _ in range(5)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(flights) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_other_waiters():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    first = asyncio.ensure_future(flights.do("BTC", fetch))
+    second = asyncio.ensure_future(flights.do("BTC", fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "ok"
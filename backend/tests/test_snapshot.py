@@ -0,0 +1,105 @@
+# tests/test_snapshot.py
+
+import time
+import orjson
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from app.core import database, snapshot
+from app.core.cache import clear_caches, get_cache
+from app.core.config import settings
+from app.models import schemas
+from app.services import bitcoin, currency, weather
+
+
+def _fill_caches(now: float):
+    cached = schemas.CachedWeather(
+        department="ASUNCION", temp_celsius=30.5, description="cielo claro", humidity=60, wind_speed_kmh=12.3,
+        last_updated=datetime.fromtimestamp(now - 600, timezone.utc),
+    )
+    get_cache(weather.CACHE_NAMESPACE).set("ASUNCION", cached, ttl=3600, stored_at=now - 600)
+    get_cache(currency.CACHE_NAMESPACE).set("USD", {"USD": 1.0, "PYG": 7450.0}, ttl=60, stored_at=now - 120)
+    quote = schemas.BitcoinQuote(
+        price_usd=65000.0, high_24h_usd=66000.0, low_24h_usd=64000.0, change_24h_pct=1.5, usd_rate_pyg=7450.0,
+        timestamp=datetime.fromtimestamp(now, timezone.utc),
+    )
+    get_cache(bitcoin.CACHE_NAMESPACE).set(bitcoin.QUOTE_CACHE_KEY, quote, ttl=60)
+
+
+def test_snapshot_round_trip_keeps_values_and_timestamps(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    now = time.time()
+    _fill_caches(now)
+
+    assert snapshot.save_snapshot(path) == 3
+    clear_caches()
+    assert snapshot.load_snapshot(path) == 3
+
+    entry = get_cache(weather.CACHE_NAMESPACE).peek("ASUNCION")
+    assert type(entry.value) is schemas.WeatherResponse
+    assert entry.value.temp_celsius == 30.5
+    assert entry.stored_at == pytest.approx(now - 600)
+    assert entry.is_fresh()
+
+    # La tabla de tasas ya había expirado: se carga igual y se sirve como stale
+    rates = get_cache(currency.CACHE_NAMESPACE).get_entry("USD", settings.CACHE_MAX_STALE_SECONDS)
+    assert rates.value["PYG"] == 7450.0
+    assert not rates.is_fresh()
+
+    quote = get_cache(bitcoin.CACHE_NAMESPACE).get(bitcoin.QUOTE_CACHE_KEY)
+    assert quote.price_usd == 65000.0
+
+
+def test_load_snapshot_does_not_overwrite_newer_entries(tmp_path):
+    path = str(tmp_path / "snapshot.json")
+    _fill_caches(time.time())
+    snapshot.save_snapshot(path)
+
+    get_cache(currency.CACHE_NAMESPACE).set("USD", {"USD": 1.0, "PYG": 7500.0}, ttl=60)
+    snapshot.load_snapshot(path)
+
+    assert get_cache(currency.CACHE_NAMESPACE).get("USD")["PYG"] == 7500.0
+
+
+def test_load_snapshot_ignores_missing_or_corrupt_file(tmp_path):
+    path = tmp_path / "snapshot.json"
+    assert snapshot.load_snapshot(str(path)) == 0
+
+    path.write_bytes(b"{no es json")
+    assert snapshot.load_snapshot(str(path)) == 0
+
+
+def test_load_snapshot_skips_malformed_entries(tmp_path):
+    path = tmp_path / "snapshot.json"
+    now = time.time()
+    path.write_bytes(orjson.dumps({
+        "version": snapshot.SNAPSHOT_VERSION,
+        "namespaces": {
+            currency.CACHE_NAMESPACE: [
+                ["EUR", now],                              # faltan campos
+                [["USD"], now, now + 60, {"PYG": 1.0}],    # clave no válida
+                ["BRL", "ayer", now + 60, {"PYG": 1.0}],   # marca de tiempo no válida
+                ["USD", now, now + 60, {"USD": 1.0, "PYG": 7450.0}],
+            ],
+        },
+    }))
+
+    assert snapshot.load_snapshot(str(path)) == 1
+    assert get_cache(currency.CACHE_NAMESPACE).get("USD")["PYG"] == 7450.0
+
+    path.write_bytes(b"[1, 2, 3]")
+    assert snapshot.load_snapshot(str(path)) == 0
+
+
+@pytest.mark.asyncio
+async def test_connect_to_mongo_failure_closes_client():
+    mock_client = MagicMock()
+    mock_client.admin.command.side_effect = Exception("sin conexión")
+
+    with patch.object(database, "AsyncIOMotorClient", return_value=mock_client), \
+         patch.object(database, "client", None):
+        await database.connect_to_mongo()
+        assert database.client is None
+
+    mock_client.close.assert_called_once()
@@ -0,0 +1,49 @@
+# tests/test_timeseries.py
+
+import numpy as np
+
+from app.core.timeseries import DAY, HOUR, WEEK, WEEK_ORIGIN, lttb, merge_ohlc, ohlc_buckets, resample_ohlc
+
+
+def test_ohlc_buckets_aggregates_each_interval():
+    # Dos días con 3 precios horarios cada uno
+    ts = np.array([0, HOUR, 2 * HOUR, DAY, DAY + HOUR, DAY + 2 * HOUR])
+    price = np.array([10.0, 15.0, 12.0, 20.0, 18.0, 25.0])
+
+    ohlc = ohlc_buckets(ts, price, DAY)
+
+    assert ohlc["ts"].tolist() == [0, DAY]
+    assert ohlc["open"].tolist() == [10.0, 20.0]
+    assert ohlc["high"].tolist() == [15.0, 25.0]
+    assert ohlc["low"].tolist() == [10.0, 18.0]
+    assert ohlc["close"].tolist() == [12.0, 25.0]
+
+
+def test_weekly_buckets_start_on_monday_and_merge_keeps_extremes():
+    # 14 días desde el lunes 1970-01-05
+    ts = WEEK_ORIGIN + np.arange(14) * DAY
+    price = np.arange(14, dtype=float)
+
+    weekly = ohlc_buckets(ts, price, WEEK, WEEK_ORIGIN)
+    assert weekly["ts"].tolist() == [WEEK_ORIGIN, WEEK_ORIGIN + WEEK]
+
+    merged = merge_ohlc(resample_ohlc(weekly, WEEK, WEEK_ORIGIN), 2)
+    assert merged["open"].tolist() == [0.0]
+    assert merged["high"].tolist() == [13.0]
+    assert merged["low"].tolist() == [0.0]
+    assert merged["close"].tolist() == [13.0]
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000)
+    y = np.zeros(1000)
+    y[500] = 100.0  # Un pico aislado
+
+    selected = lttb(x, y, 50)
+
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert 500 in selected
+    assert np.all(np.diff(selected) > 0)
+    # Si ya hay pocos puntos, no se reduce nada
+    assert lttb(x[:10], y[:10], 50).tolist() == list(range(10))
@@ -0,0 +1,75 @@
+# tests/test_weather_forecast_service.py
+
+import time
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch, AsyncMock
+
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.services import weather_forecast
+from app.services.weather_forecast import FORECAST_STEP_SECONDS, forecast_ttl, get_weather_forecast
+
+
+def _mock_forecast_data(start: int, blocks: int = 40) -> dict:
+    return {
+        "list": [
+            {
+                "dt": start + i * FORECAST_STEP_SECONDS,
+                "main": {"temp": 20.0 + i, "humidity": 60},
+                "weather": [{"description": "cielo claro"}],
+                "wind": {"speed": 5.0},
+                "pop": 0.1,
+            }
+            for i in range(blocks)
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_forecast_is_fetched_once_and_sliced_from_cache(mock_httpx_success):
+    # El primer bloque es el que está en curso
+    start = int(time.time()) // FORECAST_STEP_SECONDS * FORECAST_STEP_SECONDS
+
+    with patch("httpx.AsyncClient.get", new_callable=AsyncMock) as mock_get:
+        mock_get.return_value = mock_httpx_success(_mock_forecast_data(start))
+
+        full = await get_weather_forecast("asuncion")
+        one_day = await get_weather_forecast("ASUNCION", days=1)
+        six_hours = await get_weather_forecast("ASUNCION", hours=6, days=2)
+        # Mismo recorte sobre la misma entrada: la respuesta ya armada se reutiliza
+        assert await get_weather_forecast("ASUNCION", days=1) is one_day
+
+        # Una sola llamada externa sirve a todos los recortes
+        mock_get.assert_called_once()
+        assert mock_get.call_args.args[0].endswith("/data/2.5/forecast")
+
+    assert full.department == "Asunción"
+    assert len(full.points) == 40
+    assert full.points[0].temp_celsius == 20.0
+    assert full.points[0].wind_speed_kmh == 18.0
+    assert int(full.points[0].timestamp.timestamp()) == start
+
+    # Bloque en curso + los que empiezan dentro del horizonte
+    assert len(one_day.points) == 9
+    assert len(six_hours.points) == 3
+
+    # Arreglos paralelos, un documento por departamento
+    stored = get_cache(weather_forecast.CACHE_NAMESPACE).peek("ASUNCION").value
+    assert len(stored["ts"]) == len(stored["temp_celsius"]) == len(stored["pop"]) == 40
+
+
+@pytest.mark.asyncio
+async def test_forecast_unsupported_department():
+    with pytest.raises(HTTPException) as error:
+        await get_weather_forecast("MARTE")
+    assert error.value.status_code == 404
+
+
+def test_forecast_ttl_ends_at_next_issuance():
+    period = settings.WEATHER_FORECAST_ISSUE_SECONDS
+    issued = 1_700_000_000 // period * period
+
+    assert forecast_ttl(issued + 600) == period - 600
+    # Justo antes del corte no se guarda por menos de un minuto
+    assert forecast_ttl(issued + period - 5) == 60
@@ -1,10 +1,10 @@
 # tests/test_weather_service.py
 
 import pytest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from datetime import datetime, timedelta, timezone
 
-from app.services.weather import get_weather_data
+from app.services.weather import get_weather_data, DEPARTMENTS
 from app.core import database # Importamos el módulo para acceder al 'database'
 from app.core.config import settings
 from tests.conftest import MOCK_WEATHER_DATA
@@ -53,8 +53,8 @@ from app.core.config import settings
 from tests.conftest import MOCK_WEATHER_DATA # Asegúrate de que este MOCK_WEATHER_DATA esté disponible
 
 
-# 💡 La constante COLLECTION_NAME está bien definida aquí
-COLLECTION_NAME = "weather_cache"
+# 💡 Colección del namespace "weather" en MongoBackend (caché L2)
+COLLECTION_NAME = "cache_weather"
 
 
 # ⚠️ IMPORTANTE: EL FIXTURE setup_and_teardown_db FUE ELIMINADO PARA EVITAR CONFLICTOS.
@@ -99,8 +99,8 @@ async def test_weather_cache_miss_and_fetch(mock_httpx_success):
         mock_collection.find_one.assert_called_once()
         # c) Debe haber llamado a update_one (para guardar el resultado)
         mock_collection.update_one.assert_called_once() 
-        # d) Verificar el resultado
-        assert result.department == department
+        # d) Verificar el resultado (el servicio devuelve el nombre del departamento)
+        assert result.department == DEPARTMENTS[department]["name"]
         assert result.temp_celsius == 28.5
 
 
@@ -117,12 +117,16 @@ async def test_weather_cache_hit(mock_httpx_success):
     fresh_time = datetime.now(timezone.utc) - timedelta(minutes=1)
     
     MOCK_CACHED_DOC = {
-        "department": department,
-        "temp_celsius": 32.0,
-        "description": "Soleado",
-        "humidity": 45,
-        "wind_speed_kmh": 10.0,
-        "last_updated": fresh_time # Clave para que sea un Cache Hit
+        "_id": department,
+        "value": {
+            "department": department,
+            "temp_celsius": 32.0,
+            "description": "Soleado",
+            "humidity": 45,
+            "wind_speed_kmh": 10.0,
+        },
+        "stored_at": fresh_time,
+        "expires_at": fresh_time + timedelta(seconds=settings.WEATHER_CACHE_TTL_SECONDS) # Clave para que sea un Cache Hit
     }
 
     # 📌 2. Configurar Mocks
@@ -203,12 +207,16 @@ async def test_weather_cache_hit():
     fresh_time = datetime.now(timezone.utc) - timedelta(minutes=1)
     
     MOCK_CACHED_DOC = {
-        "department": department,
-        "temp_celsius": 32.0,
-        "description": "Soleado",
-        "humidity": 45,
-        "wind_speed_kmh": 10.0,
-        "last_updated": fresh_time # Clave para que sea un Cache Hit
+        "_id": department,
+        "value": {
+            "department": department,
+            "temp_celsius": 32.0,
+            "description": "Soleado",
+            "humidity": 45,
+            "wind_speed_kmh": 10.0,
+        },
+        "stored_at": fresh_time,
+        "expires_at": fresh_time + timedelta(seconds=settings.WEATHER_CACHE_TTL_SECONDS) # Clave para que sea un Cache Hit
     }
 
     # 📌 2. Configurar Mocks
@@ -242,3 +250,97 @@ async def test_weather_cache_hit():
             # b) Verificar el resultado debe ser de la caché
             assert result.department == department
             assert result.temp_celsius == 32.0
+
+
+@pytest.mark.asyncio
+async def test_weather_many_uses_single_db_query_and_fetches_misses(mock_httpx_success):
+    """
+    Prueba la consulta por lotes:
+    1. Una sola consulta `$in` a MongoDB para todos los departamentos.
+    2. Solo los que no están en caché se consultan a la API externa.
+    """
+    from app.services.weather import get_weather_many, DEPARTMENTS
+
+    fresh_time = datetime.now(timezone.utc) - timedelta(minutes=1)
+    cached_doc = {
+        "_id": "ITAPUA",
+        "value": {
+            "department": DEPARTMENTS["ITAPUA"]["name"],
+            "temp_celsius": 32.0,
+            "description": "Soleado",
+            "humidity": 45,
+            "wind_speed_kmh": 10.0,
+        },
+        "stored_at": fresh_time,
+        "expires_at": fresh_time + timedelta(seconds=settings.WEATHER_CACHE_TTL_SECONDS),
+    }
+
+    mock_cursor = AsyncMock()
+    mock_cursor.to_list.return_value = [cached_doc]
+    mock_collection = AsyncMock()
+    mock_collection.find = MagicMock(return_value=mock_cursor)
+    mock_db_object = {COLLECTION_NAME: mock_collection}
+
+    with patch("httpx.AsyncClient.get") as mock_get:
+        mock_get.return_value = mock_httpx_success(MOCK_WEATHER_DATA)
+
+        results = await get_weather_many(["itapua", "CENTRAL", "ITAPUA"], mock_db_object)
+
+        mock_collection.find.assert_called_once()
+        assert mock_collection.find.call_args.args[0]["_id"]["$in"] == ["ITAPUA", "CENTRAL"]
+        # Solo CENTRAL se consulta a la API externa
+        mock_get.assert_called_once()
+        # Lo descargado se guarda con un solo bulk_write
+        mock_collection.bulk_write.assert_called_once()
+        ops = mock_collection.bulk_write.call_args.args[0]
+        assert [op._filter for op in ops] == [{"_id": "CENTRAL"}]
+        mock_collection.update_one.assert_not_called()
+
+        assert [r.department for r in results] == [DEPARTMENTS["ITAPUA"]["name"], DEPARTMENTS["CENTRAL"]["name"]]
+        assert results[0].temp_celsius == 32.0
+        assert results[1].temp_celsius == 28.5
+
+
+@pytest.mark.asyncio
+async def test_refresh_weather_fetches_all_departments_with_one_bulk_write(mock_httpx_success):
+    """El refresco programado descarga los departamentos por vencer y los guarda en un solo lote."""
+    from app.core import cache_backend
+    from app.services.weather import refresh_weather, DEPARTMENTS
+
+    backend = cache_backend.get_backend()
+
+    with patch("httpx.AsyncClient.get") as mock_get, \
+         patch.object(backend, "set_many", wraps=backend.set_many) as mock_set_many:
+        mock_get.return_value = mock_httpx_success(MOCK_WEATHER_DATA)
+
+        expires_at = await refresh_weather()
+
+        assert mock_get.call_count == len(DEPARTMENTS)
+        mock_set_many.assert_called_once()
+        assert set(mock_set_many.call_args.args[1]) == set(DEPARTMENTS)
+        assert expires_at > datetime.now().timestamp()
+
+        # Nada por vencer: ni llamadas externas ni escrituras
+        await refresh_weather()
+        assert mock_get.call_count == len(DEPARTMENTS)
+        mock_set_many.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_refresh_weather_retries_soon_when_a_department_fails(mock_httpx_success):
+    """Si un departamento falla, el refresco devuelve None para reintentar pronto."""
+    import httpx
+    from app.core.cache import get_cache
+    from app.services.weather import refresh_weather, CACHE_NAMESPACE
+
+    async def fake_get(url, params=None, **kwargs):
+        if params["lat"] == -27.3333:  # ITAPUA
+            request = httpx.Request("GET", url)
+            raise httpx.HTTPStatusError("500", request=request, response=httpx.Response(500, request=request))
+        return mock_httpx_success(MOCK_WEATHER_DATA)
+
+    with patch("httpx.AsyncClient.get", side_effect=fake_get):
+        assert await refresh_weather() is None
+
+    assert get_cache(CACHE_NAMESPACE).peek("ITAPUA") is None
+    assert get_cache(CACHE_NAMESPACE).peek("ASUNCION") is not None